@@ -0,0 +1,522 @@
+'''
+Column lists and data helpers for the Streamlit dashboard. This module does
+not import streamlit, so the typed data and the aggregate tables the app
+shows can be prepared offline:
+
+    python Dashboard/dashboard_data.py StreamlitData.csv .
+
+writes StreamlitData.parquet and DashboardAggregates.parquet into that folder.
+'''
+
+import hashlib
+import json
+import os
+import sys
+from functools import lru_cache
+import numpy as np
+import pandas as pd 
+
+# Creating a list of numerical columns
+num_cols = ['Age', 'Asthma Onset', 'Arthritis Onset', 'Heart Failure Onset', 'Heart Disease Onset', 
+'Angina Onset', 'Heart Attack Onset', 'Stroke Onset', 'Emphysema Onset', 'Bronchitis Onset', 
+'Liver Condition Onset', 'Thyroid Problem Onset', 'Cancer Onset', 'Weight', 'Height', 'BMI', 
+'Pulse', 'Systolic', 'Diastolic', 'Total Cholesterol', 'HDL', 'Triglycerides', 'LDL', 'Albumin', 
+'ALT', 'AST', 'ALP', 'BUN', 'Calcium', 'CO2', 'Creatinine', 'GGT', 'Glucose', 'Iron', 'LHD', 
+'Phosphorus', 'Bilirubin', 'Total Protein', 'Uric Acid', 'Sodium', 'Potassium', 'Chloride', 
+'Osmolality', 'Globulin', 'White BCC', 'Lymphocyte Percent', 'Monocyte Percent', 'Neutrophils Percent', 
+'Eosinophils Percent', 'Basophils Percent', 'Lymphocyte Count', 'Monocyte Count', 'Neutrophils Count', 
+'Eosinophils Count', 'Basophils Count', 'RBC Count', 'Hemoglobin', 'Hematocrit', 'MCV', 'MCH', 'MCHC', 
+'RDW', 'Platelet Count', 'MPV', 'Time In Current Job', 'Sleep Hours', 'Sedentary Time', 
+'Drinks Per Occasion', 'Drinks Past Year', 'Marijuana Per Month', 'Cocaine Per Month', 'Heronine Per Month', 
+'Meth Per Month', 'Start Smoking Age', 'Previous Cigarettes Per Day', 'Current Cigarettes Per Day', 
+'Days Quit Smoking']
+
+# Creating a list of categorical columns with a "None" option included
+none_included = ['None','Gender', 'Race', 'Citizenship', 'Education Level', 'Marital Status', 'Pregnant', 'Birth Place', 
+'Veteran', 'Household Income', 'Asthma', 'Asthma Currently', 'Asthma Emergency', 'Anemia', 'Ever Overweight', 
+'Blood Transfusion', 'Arthritis', 'Heart Failure', 'Heart Disease', 'Angina', 'Heart Attack', 'Stroke', 
+'Emphysema', 'Bronchitis', 'Liver Condition', 'Thyroid Problem', 'Bronchitis Currently', 
+'Liver Condition Currently', 'Thyroid Problem Currently', 'Cancer', 'First Cancer Type', 'Second Cancer Type', 
+'Third Cancer Type', 'Fourth Cancer Count', 'Heart Attack Relative', 'Asthma Relative', 'Diabetes Relative', 
+'Hay Fever', 'Arthritis Type', 'First Cancer Count', 'Second Cancer Count', 'Third Cancer Count', 
+'Irregular Pulse', 'Full Time Work', 'Work Type', 'Out Of Work', 'Trouble Sleeping History', 
+'Vigorous Recreation', 'Moderate Recreation', 'Vigorous Work', 'Moderate Work', 'Lifetime Alcohol Consumption', 
+'Cant Work', 'Limited Work', 'Walking Equipment', 'Memory Problems', 'Limitations', 'Healthcare Equipment', 
+'Health Problem Other Impairment', 'Health Problem Bone Or Joint', 'Health Problem Weight', 
+'Health Problem Back Or Neck', 'Health Problem Arthritis', 'Health Problem Cancer', 'Health Problem Other Injury', 
+'Health Problem Breathing', 'Health Problem Stroke', 'Health Problem Emotional', 'Health Problem Blood Pressure', 
+'Health Problem Mental Retardation', 'Health Problem Hearing', 'Health Problem Heart', 'Health Problem Vision', 
+'Health Problem Diabetes', 'Health Problem Birth Defect', 'Health Problem Senility', 
+'Health Problem Other Developmental', 'Marijuana Use', 'Cocaine Use', 'Cocaine Number Uses', 'Heroine Use', 
+'Meth Use', 'Meth Number Uses', 'Inject Drugs', 'Rehab Program', 'Current Smoker', 'Household Smokers', 
+'Household Size']
+
+# Creating a list of regular categorical columns without "None"
+cat_cols = none_included.copy()
+cat_cols.remove('None')
+
+# Creating a list of prescription related columns
+Rx_cols = ['Tiotropium', 'Famotidine', 'Warfarin', 'Insulin Aspart', 'Verapamil', 'Potassium Chloride', 
+'Lorazepam', 'Conjugated Estrogens', 'Gemfibrozil', 'Prednisolone', 'Drospirenone, Ethinyl Estradiol', 
+'Zolpidem', 'Finasteride', 'Ethinyl Estradiol, Levonorgestrel', 'Triamcinolone Topical', 'Raloxifene', 
+'Budesonide, Formoterol', 'Acetaminophen, Codeine', 'Hydrochlorothiazide, Lisinopril', 'Sitagliptin', 
+'Allopurinol', 'Ropinirole', 'Ciprofloxacin', 'Levalbuterol', 'Amiodarone', 'Niacin', 'Oxycodone', 
+'Pantoprazole', 'Prednisone', 'Lansoprazole', 'Levothyroxine', 'Fluticasone Nasal', 'Timolol Ophthalmic', 
+'Nifedipine', 'Isosorbide', 'Diphenhydramine', 'Colchicine', 'Furosemide', 'Fenofibrate', 'Diazepam', 
+'Lovastatin', 'Nitroglycerin', 'Albuterol', 'Acetaminophen, Oxycodone', 'Doxazosin', 'Lisinopril', 
+'Olmesartan', 'Ipratropium', 'Pravastatin', 'Insulin Glargine', 'Gabapentin', 'Hydrochlorothiazide, Losartan', 
+'Cephalexin', 'Celecoxib', 'Simvastatin', 'Diclofenac', 'Alprazolam', 'Montelukast', 'Valsartan', 'Doxycycline', 
+'Pioglitazone', 'Clonazepam', 'Amphetamine, Dextroamphetamine', 'Ondansetron', 'Insulin Lispro', 'Naproxen', 
+'Hydrochlorothiazide, Olmesartan', 'Sumatriptan', 'Memantine', 'Fluticasone, Salmeterol', 'Digoxin', 
+'Levetiracetam', 'Hydrocodone', 'Albuterol, Ipratropium', 'Diltiazem', 'Hydrochlorothiazide', 'Glimepiride', 
+'Ethinyl Estradiol, Norethindrone', 'Benazepril', 'Meloxicam', 'Fluticasone', 'Azithromycin', 'Hydroxyzine', 
+'Spironolactone', 'Esomeprazole', 'Metformin', 'Hydralazine', 'Penicillin', 'Fexofenadine', 'Metoclopramide', 
+'Isosorbide Mononitrate', 'Temazepam', 'Tizanidine', 'Propranolol', 'Tolterodine', 'Methotrexate', 'Promethazine', 
+'Triamterene', 'Alendronate', 'Enalapril', 'Methylphenidate', 'Amoxicillin, Clavulanate', 'Docusate', 'Ibuprofen', 
+'Cyclobenzaprine', 'Tamsulosin', 'Risedronate', 'Insulin Detemir', 'Baclofen', 'Glyburide, Metformin', 'Tramadol', 
+'Acyclovir', 'Omeprazole', 'Amlodipine, Benazepril', 'Minocycline', 'Quinapril', 'Sulfamethoxazole, Trimethoprim', 
+'Ramipril', 'Irbesartan', 'Atenolol', 'Clopidogrel', 'Glipizide', 'Nitrofurantoin', 'Brimonidine Ophthalmic', 
+'Glyburide', 'Latanoprost Ophthalmic', 'Cefdinir', 'Acetaminophen, Propoxyphene', 'Metoprolol', 'Hydroxychloroquine', 
+'Amoxicillin', 'Lisdexamfetamine', 'Donepezil', 'Ethinyl Estradiol, Norgestimate', 'Terazosin', 
+'Hydrochlorothiazide, Valsartan', 'Aspirin', 'Methocarbamol', 'Atorvastatin', 'Rosuvastatin', 'Buspirone', 
+'Meclizine', 'Phenytoin', 'Mometasone Nasal', 'Ezetimibe, Simvastatin', 'Ranitidine', 'Budesonide', 'Pregabalin', 
+'Oxybutynin', 'Insulin Isophane, Insulin Regular', 'Polyethylene Glycol 3350', 'Cetirizine', 'Carvedilol', 
+'Amlodipine', 'Estradiol', 'Insulin Regular', 'Clonidine', 'Hydrochlorothiazide, Triamterene', 'Rabeprazole', 
+'Losartan', 'Ezetimibe', 'Acetaminophen, Hydrocodone', 'Beclomethasone']
+
+
+def data_schema(columns):
+    '''
+    Dtypes for the dashboard columns: categoricals for the categorical and
+    prescription columns and float32 for the numerical columns and the days
+    prescribed. Columns not in the lists keep their inferred dtype.
+
+    Args:
+        columns (list): Columns present in the data.
+
+    Returns:
+        Dictionary of each column and its dtype.
+
+    Example:
+        schema = data_schema(df.columns)
+    '''
+    schema = {}
+    for col in cat_cols:
+        schema[col] = 'category'
+    for col in num_cols:
+        schema[col] = 'float32'
+    for col in Rx_cols:
+        schema[f'Rx {col}'] = 'category'
+        schema[f'Rx Days {col}'] = 'float32'
+    return {col: schema[col] for col in columns if col in schema}
+
+
+@lru_cache(maxsize=4)
+def load_data(path):
+    '''
+    Reads the dashboard data with the explicit schema. CSV, Parquet and
+    Feather files are supported, picked by the file extension. The frame is
+    read once per process and the same one is returned to every rerun and
+    every session, so it must not be changed in place.
+
+    Args:
+        path (str): Location of the .csv, .parquet or .feather file.
+
+    Returns:
+        DataFrame of the dashboard data.
+
+    Example:
+        df = load_data('StreamlitData.parquet')
+    '''
+    extension = os.path.splitext(path)[1].lower()
+
+    # The CSV header is read first so the float columns are parsed straight
+    # to float32, the categoricals are cast after as the parser is much
+    # slower at building them
+    if extension == '.csv':
+        schema = data_schema(pd.read_csv(path, nrows=0).columns)
+        df = pd.read_csv(path, dtype={col: dtype for col, dtype 
+                                      in schema.items() if dtype != 'category'})
+    elif extension in ('.parquet', '.pq'):
+        df = pd.read_parquet(path)
+    elif extension in ('.feather', '.ftr'):
+        df = pd.read_feather(path)
+    else:
+        raise ValueError(f'Unsupported data file: {path}')
+
+    # Files written from a typed frame already match, this only casts the
+    # columns that do not
+    schema = data_schema(df.columns)
+    schema = {col: dtype for col, dtype in schema.items() 
+              if str(df[col].dtype) != dtype}
+    return df.astype(schema) if schema else df
+
+
+def convert_data(path, out_path):
+    '''
+    Reads the dashboard data with the schema and writes it to a Parquet or
+    Feather file, which the app loads much faster than the CSV.
+
+    Args:
+        path (str): Location of the data to convert.
+        out_path (str): Location of the .parquet or .feather file to write.
+
+    Returns:
+        The location of the written file.
+
+    Example:
+        convert_data('StreamlitData.csv', 'StreamlitData.parquet')
+    '''
+    df = load_data(path)
+    if out_path.lower().endswith(('.feather', '.ftr')):
+        df.reset_index(drop=True).to_feather(out_path)
+    else:
+        df.to_parquet(out_path, index=False)
+    return out_path
+
+
+def percentage_table(df, col, target='Depression'):
+    '''
+    Percent of each target value within each value of a column, rounded to
+    one decimal like the dashboard shows it.
+
+    Args:
+        df (DataFrame): Dashboard data.
+        col (str): Column to group by.
+        target (str): Target column.
+
+    Returns:
+        DataFrame with the column, the target and a 'Percent' column.
+
+    Example:
+        temp_df = percentage_table(df, 'Gender')
+    '''
+    temp_df = df.groupby(col, observed=True)[target].value_counts(
+        normalize=True)
+    temp_df = temp_df.mul(100).rename('Percent').reset_index()
+    temp_df['Percent'] = temp_df['Percent'].round(decimals=1)
+    return temp_df
+
+
+def class_proportions(df, target='Depression'):
+    '''
+    Percent of the rows in each target class, rounded to one decimal.
+
+    Args:
+        df (DataFrame): Dashboard data.
+        target (str): Target column.
+
+    Returns:
+        Series of the percent of each class.
+
+    Example:
+        class_proportions(df)
+    '''
+    return df[target].value_counts(normalize=True).mul(100).round(1)
+
+
+@lru_cache(maxsize=4)
+def data_proportions(path, target='Depression'):
+    '''
+    Percent of the rows in each target class of the data at path, worked out
+    once per process like load_data so reruns do not scan the data again.
+
+    Args:
+        path (str): Location of the dashboard data.
+        target (str): Target column.
+
+    Returns:
+        Series of the percent of each class.
+
+    Example:
+        data_proportions('StreamlitData.parquet')
+    '''
+    return class_proportions(load_data(path), target)
+
+
+def sample_by_class(df, budget, target='Depression', seed=0):
+    '''
+    Draws at most budget rows, split between the target classes in
+    proportion to their size so the sample keeps the class balance of the
+    full data. Within each class every row has the same chance of being
+    kept: each row gets a random key and the rows with the smallest keys
+    are kept, which gives the same sample as reservoir sampling. Every class
+    keeps at least one row and the rows stay in their original order.
+
+    Args:
+        df (DataFrame): Dashboard data.
+        budget (int): Largest number of rows to return.
+        target (str): Target column.
+        seed (int): Seed for the random keys, so reruns draw the same rows.
+
+    Returns:
+        DataFrame of the sampled rows, or df itself when it fits the budget.
+
+    Example:
+        plot_df = sample_by_class(df, 5000)
+    '''
+    if len(df) <= budget:
+        return df
+
+    codes, classes = pd.factorize(df[target])
+    sizes = np.bincount(codes[codes >= 0], minlength=len(classes))
+
+    # Largest remainder split of the budget across the classes
+    shares = sizes * budget / sizes.sum()
+    quotas = np.floor(shares).astype('int64')
+    leftover = budget - quotas.sum()
+    quotas[np.argsort(quotas - shares)[:leftover]] += 1
+    quotas = np.clip(quotas, 1, sizes)
+
+    keys = np.random.default_rng(seed).random(len(df))
+    positions = []
+    for code, quota in enumerate(quotas):
+        members = np.flatnonzero(codes == code)
+        if quota < len(members):
+            members = members[np.argpartition(keys[members], quota)[:quota]]
+        positions.append(members)
+    return df.iloc[np.sort(np.concatenate(positions))]
+
+
+def binned_counts(df, cols, target='Depression', bins=60):
+    '''
+    Aggregates the rows into bins instead of points. Numerical columns are
+    cut into equal width bins and replaced by the bin middles, other columns
+    are kept as they are, and the rows are counted for each combination of
+    bins and target class. The result has at most a few thousand rows no
+    matter how large the data is.
+
+    Args:
+        df (DataFrame): Dashboard data.
+        cols (list): Columns to bin, one for a strip plot or two for a
+            scatter plot.
+        target (str): Target column.
+        bins (int): Number of bins for each numerical column.
+
+    Returns:
+        DataFrame with the binned columns, the target, a 'Count' column and
+        a 'Percent' column with the percent of the class in each bin.
+
+    Example:
+        temp_df = binned_counts(df, ['Age', 'BMI'])
+    '''
+    cols = list(dict.fromkeys(cols))
+    temp_df = df[cols + [target]].dropna()
+
+    binned = {}
+    for col in cols:
+        values = temp_df[col]
+        if pd.api.types.is_numeric_dtype(values):
+            values = values.to_numpy(dtype='float64')
+            edges = np.histogram_bin_edges(values, bins=bins)
+            codes = np.clip(np.searchsorted(edges, values, side='right') - 1,
+                            0, len(edges) - 2)
+            middles = (edges[:-1] + edges[1:]) / 2
+            binned[col] = middles[codes]
+        else:
+            binned[col] = values.to_numpy()
+    binned[target] = temp_df[target].to_numpy()
+
+    counts = pd.DataFrame(binned).groupby(cols + [target], observed=True, 
+                                          sort=True).size()
+    counts = counts.rename('Count').reset_index()
+    totals = counts.groupby(target, observed=True)['Count'].transform('sum')
+    counts['Percent'] = (counts['Count'] / totals).mul(100).round(2)
+    return counts
+
+
+def data_fingerprint(df):
+    '''
+    Hash of the values, column names and dtypes of the dashboard data, which
+    changes whenever the data does. The same data gives the same hash
+    whether it was read from CSV, Parquet or Feather with load_data.
+
+    Args:
+        df (DataFrame): Dashboard data.
+
+    Returns:
+        String of the hash.
+
+    Example:
+        data_fingerprint(load_data('StreamlitData.parquet'))
+    '''
+    digest = hashlib.sha1()
+    digest.update(repr(list(df.columns)).encode('utf-8'))
+    digest.update(repr([str(dtype) for dtype in df.dtypes]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False)
+                  .to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def precompute_aggregates(df, target='Depression'):
+    '''
+    Computes the percentage table of every categorical and prescription
+    column and stacks them into one long table with a 'feature' column.
+    Each value is kept with its own type, numbers in 'value_number' and text
+    in 'value_text', and categorical columns keep their categories as JSON,
+    so load_aggregates gives back the same tables as percentage_table. The
+    'source' column holds the data_fingerprint of df, so tables built from
+    other data can be told apart.
+
+    Args:
+        df (DataFrame): Dashboard data.
+        target (str): Target column.
+
+    Returns:
+        DataFrame with the feature, dtype, categories, kind, value_number,
+        value_text, target, Percent and source columns.
+
+    Example:
+        aggregates = precompute_aggregates(pd.read_csv('StreamlitData.csv'))
+    '''
+    features = cat_cols + [f'Rx {col}' for col in Rx_cols]
+
+    tables = []
+    for feature in features:
+        temp_df = percentage_table(df, feature, target)
+        values = temp_df.pop(feature)
+        categories = None
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = json.dumps(values.cat.categories.tolist())
+            values = values.astype(values.cat.categories.dtype)
+
+        # Bools are stored as numbers and turned back with the dtype
+        numeric = (pd.api.types.is_numeric_dtype(values)
+                   or pd.api.types.is_bool_dtype(values))
+        temp_df.insert(0, 'feature', feature)
+        temp_df.insert(1, 'dtype', str(df[feature].dtype))
+        temp_df.insert(2, 'categories', categories)
+        temp_df.insert(3, 'kind', 'number' if numeric else 'text')
+        temp_df.insert(4, 'value_number', (values.astype('float64') 
+                                           if numeric else np.nan))
+        temp_df.insert(5, 'value_text', (None if numeric 
+                                         else values.astype(str)))
+        tables.append(temp_df)
+    aggregates = pd.concat(tables, ignore_index=True)
+    aggregates['value_text'] = aggregates['value_text'].astype(object)
+    aggregates['source'] = data_fingerprint(df)
+    for col in ['feature', 'dtype', 'categories', 'kind', 'source']:
+        aggregates[col] = aggregates[col].astype('category')
+    return aggregates
+
+
+def save_aggregates(df, path, target='Depression'):
+    '''
+    Precomputes the percentage tables and writes them to a Parquet file.
+
+    Args:
+        df (DataFrame): Dashboard data.
+        path (str): Location of the Parquet file to write.
+        target (str): Target column.
+
+    Returns:
+        The location of the written file.
+
+    Example:
+        save_aggregates(df, 'DashboardAggregates.parquet')
+    '''
+    precompute_aggregates(df, target).to_parquet(path, index=False)
+    return path
+
+
+def _aggregate_tables(aggregates):
+    '''
+    Splits the long table of precompute_aggregates into a dictionary of each
+    feature and its percentage table, with the values of their own type.
+    '''
+    tables = {}
+    for feature, temp_df in aggregates.groupby('feature', observed=True, 
+                                               sort=False):
+        dtype = temp_df['dtype'].iloc[0]
+        categories = temp_df['categories'].iloc[0]
+        if temp_df['kind'].iloc[0] == 'number':
+            values = temp_df['value_number']
+        else:
+            values = temp_df['value_text']
+
+        if not pd.isna(categories):
+            values = pd.Categorical(values, 
+                                    categories=json.loads(categories))
+        else:
+            values = values.astype(dtype)
+        temp_df = temp_df.drop(columns=['feature', 'dtype', 'categories', 
+                                        'kind', 'value_number', 
+                                        'value_text', 'source'])
+        temp_df.insert(0, feature, values)
+        tables[feature] = temp_df.reset_index(drop=True)
+    return tables
+
+
+@lru_cache(maxsize=None)
+def load_aggregates(path, data_path=None):
+    '''
+    Reads the precomputed percentage tables into a dictionary so each one can
+    be looked up directly by its feature. When the data they are for is
+    given and they were built from different data, they are rebuilt from it
+    and the file is rewritten. The file is only read once per process, so
+    reruns of the app and other sessions reuse the tables.
+
+    Args:
+        path (str): Location of the Parquet file.
+        data_path (str): Location of the dashboard data the tables are for,
+            not checked when None.
+
+    Returns:
+        Dictionary of each feature and its percentage table, empty if the
+        file does not exist.
+
+    Example:
+        aggregates = load_aggregates('DashboardAggregates.parquet',
+                                     'StreamlitData.parquet')
+        temp_df = aggregates['Gender']
+    '''
+    if not os.path.exists(path):
+        return {}
+    aggregates = pd.read_parquet(path)
+
+    # Rebuilding tables that were made from other data, so changed data is
+    # never shown with stale percentages
+    if data_path is not None:
+        df = load_data(data_path)
+        if aggregates['source'].iloc[0] != data_fingerprint(df):
+            aggregates = precompute_aggregates(df)
+            temp = f'{path}.{os.getpid()}.tmp'
+            try:
+                aggregates.to_parquet(temp, index=False)
+                os.replace(temp, path)
+            except OSError:
+                # A read only deployment still gets the fresh tables
+                pass
+    return _aggregate_tables(aggregates)
+
+
+def lookup_percentages(aggregates, df, col, target='Depression'):
+    '''
+    Returns the precomputed percentage table for a column, computing it from
+    the data only if it was not precomputed.
+
+    Args:
+        aggregates (dict): Tables from load_aggregates.
+        df (DataFrame): Dashboard data, used when the table is missing.
+        col (str): Column to get the table for.
+        target (str): Target column.
+
+    Returns:
+        DataFrame with the column, the target and a 'Percent' column.
+
+    Example:
+        temp_df = lookup_percentages(aggregates, df, 'Gender')
+    '''
+    if col in aggregates:
+        return aggregates[col]
+    return percentage_table(df, col, target)
+
+
+if __name__ == '__main__':
+    data_path = sys.argv[1] if len(sys.argv) > 1 else 'StreamlitData.csv'
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else '.'
+    for out_path in [convert_data(data_path, os.path.join(
+                         out_dir, 'StreamlitData.parquet')),
+                     save_aggregates(load_data(data_path), os.path.join(
+                         out_dir, 'DashboardAggregates.parquet'))]:
+        print(f'Wrote {out_path}')
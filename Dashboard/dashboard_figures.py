@@ -0,0 +1,168 @@
+'''
+Figure builders for the Streamlit dashboard. Each builder takes only
+hashable arguments, the data file and the user's selections, and returns the
+figure as Plotly JSON. The results are kept in a bounded least recently used
+cache for the whole server process, so going back to an earlier selection in
+any session does not rebuild the figure.
+'''
+
+import json
+from functools import lru_cache
+import pandas as pd
+import plotly.express as px
+from dashboard_data import (load_data, load_aggregates, lookup_percentages,
+                            sample_by_class, binned_counts)
+
+# Number of built figures kept for each builder
+FIGURE_CACHE_SIZE = 128
+
+# Colors of the two Depression classes
+COLORS = ['#268d87', '#d26a3e']
+
+
+def _class_order(df, target='Depression'):
+    '''
+    Keeps the classes in the order they first appear in the full data, so the
+    colors do not change when the rows are sampled or binned.
+    '''
+    return {target: list(pd.unique(df[target]))}
+
+
+def _point_data(df, cols, budget, binned):
+    '''
+    Returns the frame to plot and the number of people it shows: binned
+    counts of all rows, or a class-stratified sample when there are more
+    rows than the budget.
+    '''
+    if binned and len(df) > budget:
+        return binned_counts(df, cols), len(df)
+    plot_df = sample_by_class(df, budget)
+    return plot_df, len(plot_df)
+
+
+def to_figure(figure_json):
+    '''
+    Turns cached figure JSON into the dictionary st.plotly_chart takes. A new
+    dictionary is made every time so the cached figure cannot be changed.
+
+    Args:
+        figure_json (str): JSON from one of the figure builders.
+
+    Returns:
+        Dictionary of the figure.
+
+    Example:
+        st.plotly_chart(to_figure(percentage_figure(path, agg_path, 'Gender')))
+    '''
+    return json.loads(figure_json)
+
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def percentage_figure(data_path, aggregates_path, col, name=None):
+    '''
+    Bar chart of the percent depressed for each value of a categorical or
+    prescription column.
+
+    Args:
+        data_path (str): Location of the dashboard data.
+        aggregates_path (str): Location of the precomputed percentage tables.
+        col (str): Column to plot.
+        name (str): Name to use in the title, the column if not given.
+
+    Returns:
+        JSON of the figure.
+
+    Example:
+        fig = percentage_figure('StreamlitData.parquet',
+                                'DashboardAggregates.parquet', 'Rx Warfarin',
+                                'Warfarin')
+    '''
+    temp_df = lookup_percentages(load_aggregates(aggregates_path, data_path),
+                                 load_data(data_path), col)
+    fig = px.bar(temp_df[temp_df['Depression']=='Depressed'], x=col,
+                 y='Percent', color='Percent', barmode="group",
+                 text='Percent', color_continuous_scale='geyser',
+                 title=f"Percent Depression By {name or col}")
+    return fig.to_json()
+
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def scatter_figure(data_path, x, y, budget, binned):
+    '''
+    Scatter plot of two numerical columns colored by depression, drawn from
+    at most budget sampled people, or from binned counts when binned is True
+    and there are more people than the budget.
+
+    Args:
+        data_path (str): Location of the dashboard data.
+        x (str): Column for the x axis.
+        y (str): Column for the y axis.
+        budget (int): Most points to draw.
+        binned (bool): Whether to plot binned counts above the budget.
+
+    Returns:
+        JSON of the figure and the number of people it shows.
+
+    Example:
+        fig, shown = scatter_figure('StreamlitData.parquet', 'Age', 'BMI',
+                                    5000, False)
+    '''
+    df = load_data(data_path)
+    plot_df, shown = _point_data(df, [x, y], budget, binned)
+    if 'Count' in plot_df:
+        fig = px.scatter(plot_df, x=x, y=y, size='Count', color="Depression",
+                         category_orders=_class_order(df),
+                         color_discrete_sequence=COLORS,
+                         title=f"{y} vs {x} and Depression (binned counts)")
+    else:
+        fig = px.scatter(plot_df, x=x, y=y, color="Depression",
+                         category_orders=_class_order(df),
+                         color_discrete_sequence=COLORS,
+                         title=f"{y} vs {x} and Depression")
+    return fig.to_json(), shown
+
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def strip_figure(data_path, x, y, budget, binned, title):
+    '''
+    Strip plot of a numerical column colored by depression, optionally split
+    by a categorical column. Above the budget it is drawn from a sample, or
+    from binned counts when binned is True: the percent of each class in
+    each bin without a categorical column, and bubbles sized by count with
+    one.
+
+    Args:
+        data_path (str): Location of the dashboard data.
+        x (str): Numerical column for the x axis.
+        y (str): Categorical column for the y axis, or 'None'.
+        budget (int): Most points to draw.
+        binned (bool): Whether to plot binned counts above the budget.
+        title (str): Title of the plot.
+
+    Returns:
+        JSON of the figure and the number of people it shows.
+
+    Example:
+        fig, shown = strip_figure('StreamlitData.parquet', 'Age', 'Gender',
+                                  5000, False, 'Age with Gender and Depression')
+    '''
+    df = load_data(data_path)
+    cols = [x] if y == 'None' else [x, y]
+    plot_df, shown = _point_data(df, cols, budget, binned)
+
+    if 'Count' not in plot_df:
+        fig = px.strip(plot_df, x=x, y=None if y == 'None' else y,
+                       orientation="h", color="Depression",
+                       category_orders=_class_order(df),
+                       color_discrete_sequence=COLORS, title=title)
+    elif y == 'None':
+        fig = px.line(plot_df, x=x, y='Percent', color="Depression",
+                      category_orders=_class_order(df),
+                      color_discrete_sequence=COLORS,
+                      title=f'{title} (percent of each class)')
+    else:
+        fig = px.scatter(plot_df, x=x, y=y, size='Count', color='Depression',
+                         category_orders=_class_order(df),
+                         color_discrete_sequence=COLORS,
+                         title=f'{title} (binned counts)')
+    return fig.to_json(), shown
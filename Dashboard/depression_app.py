@@ -1,9 +1,12 @@
 # Import packages
+import os
 import streamlit as st
-import pandas as pd 
-import plotly.express as px
 import plotly.io as pio
 from PIL import Image
+from dashboard_data import (num_cols, none_included, cat_cols, Rx_cols, 
+                            load_data, data_proportions)
+from dashboard_figures import (to_figure, percentage_figure, scatter_figure, 
+                               strip_figure)
 
 # Set the plotly template
 pio.templates.default = "plotly_white"
@@ -28,76 +31,28 @@ st.markdown('There is evidence that an integrated approach where physicians regu
 st.markdown('Using data from the [CDC National Health and Examination Survey](https://wwwn.cdc.gov/nchs/nhanes/default.aspx), machine learning was applied to predict patients who may have depression based on information that could typically be found in a medical file. These predictions could be used to put patients in touch with experienced mental health professionals sooner and easier.')
 st.markdown("This dashboard provides an interactive tool for users to explore more of the data from the machine learning project. It is meant to be a companion piece to the larger project which can be found [here](https://github.com/HeyThatsViv/Predicting-Depression). These plots are interactive with hover text and zooming capabilities. The figures may take a moment to update when changed.<hr style='height:2px;border-width:0;color:gray;background-color:gray'>", unsafe_allow_html=True)
 
-# Add the data
-df = pd.read_csv('StreamlitData.csv')
-
-# Creating a list of numerical columns
-num_cols = ['Age', 'Asthma Onset', 'Arthritis Onset', 'Heart Failure Onset', 'Heart Disease Onset', 
-'Angina Onset', 'Heart Attack Onset', 'Stroke Onset', 'Emphysema Onset', 'Bronchitis Onset', 
-'Liver Condition Onset', 'Thyroid Problem Onset', 'Cancer Onset', 'Weight', 'Height', 'BMI', 
-'Pulse', 'Systolic', 'Diastolic', 'Total Cholesterol', 'HDL', 'Triglycerides', 'LDL', 'Albumin', 
-'ALT', 'AST', 'ALP', 'BUN', 'Calcium', 'CO2', 'Creatinine', 'GGT', 'Glucose', 'Iron', 'LHD', 
-'Phosphorus', 'Bilirubin', 'Total Protein', 'Uric Acid', 'Sodium', 'Potassium', 'Chloride', 
-'Osmolality', 'Globulin', 'White BCC', 'Lymphocyte Percent', 'Monocyte Percent', 'Neutrophils Percent', 
-'Eosinophils Percent', 'Basophils Percent', 'Lymphocyte Count', 'Monocyte Count', 'Neutrophils Count', 
-'Eosinophils Count', 'Basophils Count', 'RBC Count', 'Hemoglobin', 'Hematocrit', 'MCV', 'MCH', 'MCHC', 
-'RDW', 'Platelet Count', 'MPV', 'Time In Current Job', 'Sleep Hours', 'Sedentary Time', 
-'Drinks Per Occasion', 'Drinks Past Year', 'Marijuana Per Month', 'Cocaine Per Month', 'Heronine Per Month', 
-'Meth Per Month', 'Start Smoking Age', 'Previous Cigarettes Per Day', 'Current Cigarettes Per Day', 
-'Days Quit Smoking']
-
-# Creating a list of categorical columns with a "None" option included
-none_included = ['None','Gender', 'Race', 'Citizenship', 'Education Level', 'Marital Status', 'Pregnant', 'Birth Place', 
-'Veteran', 'Household Income', 'Asthma', 'Asthma Currently', 'Asthma Emergency', 'Anemia', 'Ever Overweight', 
-'Blood Transfusion', 'Arthritis', 'Heart Failure', 'Heart Disease', 'Angina', 'Heart Attack', 'Stroke', 
-'Emphysema', 'Bronchitis', 'Liver Condition', 'Thyroid Problem', 'Bronchitis Currently', 
-'Liver Condition Currently', 'Thyroid Problem Currently', 'Cancer', 'First Cancer Type', 'Second Cancer Type', 
-'Third Cancer Type', 'Fourth Cancer Count', 'Heart Attack Relative', 'Asthma Relative', 'Diabetes Relative', 
-'Hay Fever', 'Arthritis Type', 'First Cancer Count', 'Second Cancer Count', 'Third Cancer Count', 
-'Irregular Pulse', 'Full Time Work', 'Work Type', 'Out Of Work', 'Trouble Sleeping History', 
-'Vigorous Recreation', 'Moderate Recreation', 'Vigorous Work', 'Moderate Work', 'Lifetime Alcohol Consumption', 
-'Cant Work', 'Limited Work', 'Walking Equipment', 'Memory Problems', 'Limitations', 'Healthcare Equipment', 
-'Health Problem Other Impairment', 'Health Problem Bone Or Joint', 'Health Problem Weight', 
-'Health Problem Back Or Neck', 'Health Problem Arthritis', 'Health Problem Cancer', 'Health Problem Other Injury', 
-'Health Problem Breathing', 'Health Problem Stroke', 'Health Problem Emotional', 'Health Problem Blood Pressure', 
-'Health Problem Mental Retardation', 'Health Problem Hearing', 'Health Problem Heart', 'Health Problem Vision', 
-'Health Problem Diabetes', 'Health Problem Birth Defect', 'Health Problem Senility', 
-'Health Problem Other Developmental', 'Marijuana Use', 'Cocaine Use', 'Cocaine Number Uses', 'Heroine Use', 
-'Meth Use', 'Meth Number Uses', 'Inject Drugs', 'Rehab Program', 'Current Smoker', 'Household Smokers', 
-'Household Size']
-
-# Creating a list of regular categorical columns without "None"
-cat_cols = none_included.copy()
-cat_cols.remove('None')
-
-# Creating a list of prescription related columns
-Rx_cols = ['Tiotropium', 'Famotidine', 'Warfarin', 'Insulin Aspart', 'Verapamil', 'Potassium Chloride', 
-'Lorazepam', 'Conjugated Estrogens', 'Gemfibrozil', 'Prednisolone', 'Drospirenone, Ethinyl Estradiol', 
-'Zolpidem', 'Finasteride', 'Ethinyl Estradiol, Levonorgestrel', 'Triamcinolone Topical', 'Raloxifene', 
-'Budesonide, Formoterol', 'Acetaminophen, Codeine', 'Hydrochlorothiazide, Lisinopril', 'Sitagliptin', 
-'Allopurinol', 'Ropinirole', 'Ciprofloxacin', 'Levalbuterol', 'Amiodarone', 'Niacin', 'Oxycodone', 
-'Pantoprazole', 'Prednisone', 'Lansoprazole', 'Levothyroxine', 'Fluticasone Nasal', 'Timolol Ophthalmic', 
-'Nifedipine', 'Isosorbide', 'Diphenhydramine', 'Colchicine', 'Furosemide', 'Fenofibrate', 'Diazepam', 
-'Lovastatin', 'Nitroglycerin', 'Albuterol', 'Acetaminophen, Oxycodone', 'Doxazosin', 'Lisinopril', 
-'Olmesartan', 'Ipratropium', 'Pravastatin', 'Insulin Glargine', 'Gabapentin', 'Hydrochlorothiazide, Losartan', 
-'Cephalexin', 'Celecoxib', 'Simvastatin', 'Diclofenac', 'Alprazolam', 'Montelukast', 'Valsartan', 'Doxycycline', 
-'Pioglitazone', 'Clonazepam', 'Amphetamine, Dextroamphetamine', 'Ondansetron', 'Insulin Lispro', 'Naproxen', 
-'Hydrochlorothiazide, Olmesartan', 'Sumatriptan', 'Memantine', 'Fluticasone, Salmeterol', 'Digoxin', 
-'Levetiracetam', 'Hydrocodone', 'Albuterol, Ipratropium', 'Diltiazem', 'Hydrochlorothiazide', 'Glimepiride', 
-'Ethinyl Estradiol, Norethindrone', 'Benazepril', 'Meloxicam', 'Fluticasone', 'Azithromycin', 'Hydroxyzine', 
-'Spironolactone', 'Esomeprazole', 'Metformin', 'Hydralazine', 'Penicillin', 'Fexofenadine', 'Metoclopramide', 
-'Isosorbide Mononitrate', 'Temazepam', 'Tizanidine', 'Propranolol', 'Tolterodine', 'Methotrexate', 'Promethazine', 
-'Triamterene', 'Alendronate', 'Enalapril', 'Methylphenidate', 'Amoxicillin, Clavulanate', 'Docusate', 'Ibuprofen', 
-'Cyclobenzaprine', 'Tamsulosin', 'Risedronate', 'Insulin Detemir', 'Baclofen', 'Glyburide, Metformin', 'Tramadol', 
-'Acyclovir', 'Omeprazole', 'Amlodipine, Benazepril', 'Minocycline', 'Quinapril', 'Sulfamethoxazole, Trimethoprim', 
-'Ramipril', 'Irbesartan', 'Atenolol', 'Clopidogrel', 'Glipizide', 'Nitrofurantoin', 'Brimonidine Ophthalmic', 
-'Glyburide', 'Latanoprost Ophthalmic', 'Cefdinir', 'Acetaminophen, Propoxyphene', 'Metoprolol', 'Hydroxychloroquine', 
-'Amoxicillin', 'Lisdexamfetamine', 'Donepezil', 'Ethinyl Estradiol, Norgestimate', 'Terazosin', 
-'Hydrochlorothiazide, Valsartan', 'Aspirin', 'Methocarbamol', 'Atorvastatin', 'Rosuvastatin', 'Buspirone', 
-'Meclizine', 'Phenytoin', 'Mometasone Nasal', 'Ezetimibe, Simvastatin', 'Ranitidine', 'Budesonide', 'Pregabalin', 
-'Oxybutynin', 'Insulin Isophane, Insulin Regular', 'Polyethylene Glycol 3350', 'Cetirizine', 'Carvedilol', 
-'Amlodipine', 'Estradiol', 'Insulin Regular', 'Clonidine', 'Hydrochlorothiazide, Triamterene', 'Rabeprazole', 
-'Losartan', 'Ezetimibe', 'Acetaminophen, Hydrocodone', 'Beclomethasone']
+# Add the data, read once per process and shared by every session
+data_path = 'StreamlitData.parquet' if os.path.exists('StreamlitData.parquet') else 'StreamlitData.csv'
+df = load_data(data_path)
+
+# The percentage tables precomputed by dashboard_data.py
+aggregates_path = 'DashboardAggregates.parquet'
+
+# Settings for the point plots, which send every point to the browser
+st.sidebar.header('Plot settings')
+point_budget = st.sidebar.number_input('Most points to draw in a plot', min_value=500, value=5000, step=500)
+render_mode = st.sidebar.radio('When there are more people than that', ['Sample people from each class', 'Show binned counts'])
+binned = render_mode == 'Show binned counts'
+
+
+# Notes how the plotted points relate to the full data, with the class proportions worked out once per process
+def sample_note(shown):
+    proportions = ', '.join(f'{value} {percent}%' for value, percent in data_proportions(data_path).items())
+    if shown < len(df):
+        st.markdown(f'*Showing {shown:,} of {len(df):,} people, sampled within each class. Full data: {proportions}*')
+    else:
+        st.markdown(f'*Showing all {len(df):,} people: {proportions}*')
+
 
 # Creating a dictionary of categorical feature information to display
 cat_cols_dict = {'Gender': 'Is the person male or female?', 
@@ -276,14 +231,8 @@ with st.beta_expander('Look at the percentage of depression among categorical fe
 # The function to run the first plot
     def percentage_plot(col):
 
-        # Creates a temporary dataframe to get the percentages
-        temp_df = df.groupby(col)['Depression'].value_counts(normalize=True)
-        temp_df = temp_df.mul(100).rename('Percent').reset_index()
-        temp_df['Percent'] = temp_df['Percent'].round(decimals=1)
-
-        # Plot the percentages with the temporary dataframe
-        fig = px.bar(temp_df[temp_df['Depression']=='Depressed'], x=col, y='Percent', color='Percent', 
-                    barmode="group", text='Percent', color_continuous_scale='geyser', title=f"Percent Depression By {col}")
+        # Gets the figure for the feature, built once and then reused
+        fig = to_figure(percentage_figure(data_path, aggregates_path, col))
 
         # Explaination of the features displays along with the graph
         st.markdown('**Explaination of the feature selected:**')
@@ -307,15 +256,15 @@ with st.beta_expander('Look at depression in numerical features plotted together
 # The function to run the second plot
     def scatter_plot(x, y):
 
-        # Plot the features selected by the user
-        fig = px.scatter(df, x=x, y=y, color="Depression", color_discrete_sequence=['#268d87', '#d26a3e'], 
-                title=f"{y} vs {x} and Depression")
+        # Plot the features selected by the user, as binned counts or sampled points when there are too many
+        fig, shown = scatter_figure(data_path, x, y, point_budget, binned)
+        sample_note(shown)
 
         # Explaination of the features displays along with the graph
         st.markdown('**Explaination of the features selected:**')
         st.markdown(f'**- {num_optionX}: {num_cols_dict[num_optionX]}**')
         st.markdown(f'**- {num_optionY}: {num_cols_dict[num_optionY]}**')
-        return fig
+        return to_figure(fig)
 
 # Running the function
     st.plotly_chart(scatter_plot(num_optionX, num_optionY))
@@ -335,24 +284,24 @@ with st.beta_expander('Look at depression in a numerical feature alone or add a
 
         # Plot the features selected by the user when y is set to 'None'
         if y=='None':
-            fig = px.strip(df, x=x, orientation="h", color="Depression", color_discrete_sequence=['#268d87', '#d26a3e'],
-                        title=f'{x} and Depression')
+            fig, shown = strip_figure(data_path, x, y, point_budget, binned, f'{x} and Depression')
+            sample_note(shown)
 
             # Explaination of the feature to display along with the graph
             st.markdown('**Explaination of the feature selected:**')
             st.markdown(f'**- {num_optionX2}: {num_cols_dict[num_optionX2]}**')
-            return fig
+            return to_figure(fig)
 
         # Plot the features selected by the user when y is not 'None'
         else:
-            fig = px.strip(df, x=x, y=y, orientation='h', color='Depression', color_discrete_sequence=['#268d87', '#d26a3e'],
-                        title=f"{x} with {y} and Depression")
+            fig, shown = strip_figure(data_path, x, y, point_budget, binned, f"{x} with {y} and Depression")
+            sample_note(shown)
 
             # Explaination of the features displays along with the graph
             st.markdown('**Explaination of the features selected:**')
             st.markdown(f'**- {num_optionX2}: {num_cols_dict[num_optionX2]}**')
             st.markdown(f'**- {cat_optionY}: {cat_cols_dict[cat_optionY]}**')
-            return fig
+            return to_figure(fig)
 
 # Running the function
     st.plotly_chart(strip_plot(num_optionX2, cat_optionY))
@@ -367,14 +316,8 @@ with st.beta_expander('Look at depression with prescription data'):
 
     def percentage_plot_rx(col):
 
-        # Creates a temporary dataframe to get the percentages
-        temp_df = df.groupby(f'Rx {col}')['Depression'].value_counts(normalize=True)
-        temp_df = temp_df.mul(100).rename('Percent').reset_index()
-        temp_df['Percent'] = temp_df['Percent'].round(decimals=1)
-
-        # Plot the percentages with the temporary dataframe
-        fig = px.bar(temp_df[temp_df['Depression']=='Depressed'], x=f'Rx {col}', y='Percent', color='Percent', 
-                    barmode="group", text='Percent', color_continuous_scale='geyser', title=f"Percent Depression By {col}")
+        # Gets the figure for the prescription, built once and then reused
+        fig = to_figure(percentage_figure(data_path, aggregates_path, f'Rx {col}', col))
 
         # Explaination of the features displays along with the graph
         st.markdown('**Explaination of the feature selected:**')
@@ -382,10 +325,10 @@ with st.beta_expander('Look at depression with prescription data'):
         return fig
     
     def strip_plot_rx(col):
-        fig = px.strip(df, x=f'Rx Days {col}', orientation="h", color="Depression", color_discrete_sequence=['#268d87', '#d26a3e'],
-                        title=f'Days prescribed {col} and Depression')
-        return fig
+        fig, shown = strip_figure(data_path, f'Rx Days {col}', 'None', point_budget, binned, f'Days prescribed {col} and Depression')
+        sample_note(shown)
+        return to_figure(fig)
 
 # Running the functions
     st.plotly_chart(percentage_plot_rx(rx_option))
-    st.plotly_chart(strip_plot_rx(rx_option))
\ No newline at end of file
+    st.plotly_chart(strip_plot_rx(rx_option))
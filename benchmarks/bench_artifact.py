@@ -0,0 +1,73 @@
+'''
+Compares getting a scoring pipeline by refitting it on the training data,
+by unpickling the whole pipeline, and by loading a saved artifact version
+with memory mapped arrays. Also shows the schema check rejecting a table
+with a changed layout.
+
+    python benchmarks/bench_artifact.py --rows 50000 --quantiles 1000
+'''
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import make_full_data
+from timing import time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--num', type=int, default=60)
+    parser.add_argument('--rx', type=int, default=100)
+    args = parser.parse_args()
+
+    full_df = make_full_data(args.rows, n_num=args.num, n_rx=args.rx)
+    X = full_df.drop('depression', axis=1)
+    y = full_df['depression'].map({'Not Depressed': 0, 'Depressed': 1})
+
+    def refit():
+        return pf.fit_pipeline(X, y, LogisticRegression(max_iter=1000))
+
+    pipeline, fit_seconds = time_call(refit)
+
+    with tempfile.TemporaryDirectory() as folder:
+        pickle_path = os.path.join(folder, 'pipeline.pkl')
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(pipeline, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def unpickle():
+            with open(pickle_path, 'rb') as f:
+                return pickle.load(f)
+
+        root = os.path.join(folder, 'artifacts')
+        pf.save_artifact(pipeline, root)
+        loaded, load_seconds = time_call(pf.load_artifact, root)
+        _, pickle_seconds = time_call(unpickle)
+
+        expected = pf.score_frame(pipeline, X.iloc[:1000])
+        assert (pf.score_frame(loaded, X.iloc[:1000]) == expected).all()
+
+        print(f'{args.rows} rows, {len(pf.feature_names(pipeline))} features,'
+              f' {len(loaded["manifest"]["arrays"])} memory mapped arrays')
+        print(f'refit                {fit_seconds * 1000:10.1f} ms')
+        print(f'unpickle             {pickle_seconds * 1000:10.1f} ms')
+        print(f'load_artifact (mmap) {load_seconds * 1000:10.1f} ms')
+
+    # A file where two columns swapped places in the export
+    changed = X.rename(columns={X.columns[0]: X.columns[-1],
+                                X.columns[-1]: X.columns[0]})
+    try:
+        pf.check_schema(pipeline, changed)
+    except ValueError as error:
+        print(f'schema check: {error}')
+
+
+if __name__ == '__main__':
+    main()
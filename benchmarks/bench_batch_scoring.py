@@ -0,0 +1,96 @@
+'''
+Streams a large synthetic member file through a saved scoring pipeline with
+score_file and reports the rows scored per second and the peak memory, for
+one process and for a pool of processes. The input is written in pieces so
+generating it does not need the whole file in memory either.
+
+    python benchmarks/bench_batch_scoring.py --rows 10000000 --format parquet
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import make_full_data
+from timing import peak_rss_mb
+
+SHAPE = {'n_cat': 8, 'n_num': 16, 'n_rx': 10}
+
+
+def write_members(path, n_rows, piece=250000):
+    '''
+    Writes a synthetic member file of n_rows in pieces, as CSV or Parquet
+    depending on the extension.
+    '''
+    writer = None
+    for start in range(0, n_rows, piece):
+        df = make_full_data(min(piece, n_rows - start), seed=start, **SHAPE)
+        df = df.drop('depression', axis=1).reset_index()
+        df['SEQN'] += start
+        if path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        else:
+            df.to_csv(path, mode='a' if start else 'w', header=not start,
+                      index=False)
+    if writer is not None:
+        writer.close()
+
+
+def run(artifact, in_path, out_path, chunksize, n_jobs):
+    '''
+    Scores the file, meant to run in a fresh process so its peak memory only
+    covers the scoring. Returns the stats with the peak memory of this
+    process and of its largest worker added.
+    '''
+    stats = pf.score_file(artifact, in_path, out_path, chunksize=chunksize,
+                          n_jobs=n_jobs)
+    stats['peak_mb'] = peak_rss_mb()
+    stats['worker_peak_mb'] = peak_rss_mb(children=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--chunksize', type=int, default=250000)
+    parser.add_argument('--format', choices=['csv', 'parquet'],
+                        default='parquet')
+    parser.add_argument('--jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    train = make_full_data(50000, seed=-1 % 2**32, **SHAPE)
+    pipeline = pf.fit_pipeline(train.drop('depression', axis=1),
+                               train['depression'] == 'Depressed',
+                               LogisticRegression(max_iter=1000))
+
+    with tempfile.TemporaryDirectory() as folder:
+        artifact = pf.save_artifact(pipeline, os.path.join(folder, 'model'))
+        in_path = os.path.join(folder, f'members.{args.format}')
+        write_members(in_path, args.rows)
+        size = os.path.getsize(in_path) / 1e6
+        print(f'{args.rows} rows, {size:.0f} MB {args.format}, chunks of '
+              f'{args.chunksize}')
+
+        for n_jobs in [1, args.jobs]:
+            out_path = os.path.join(folder, f'scores_{n_jobs}.parquet')
+            with ProcessPoolExecutor(1) as executor:
+                stats = executor.submit(run, artifact, in_path, out_path,
+                                        args.chunksize, n_jobs).result()
+            workers = (f', largest worker {stats["worker_peak_mb"]:.0f} MB'
+                       if n_jobs != 1 else '')
+            print(f'n_jobs={n_jobs:<3d} {stats["rows_per_second"]:12,.0f} '
+                  f'rows/s  {stats["seconds"]:8.1f}s  peak RSS '
+                  f'{stats["peak_mb"]:.0f} MB{workers}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+'''
+Compares a cold glob_concat, which parses every .XPT file, with a warm one
+served from the on-disk Feather cache.
+
+    python benchmarks/bench_cache.py --cycles 10 --rows 20000 --cols 120
+'''
+
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import make_xpt_corpus
+from timing import time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--cols', type=int, default=120)
+    args = parser.parse_args()
+
+    builtins.display = lambda *objs: None
+
+    with tempfile.TemporaryDirectory() as folder:
+        make_xpt_corpus(folder, n_cycles=args.cycles,
+                        rows_per_cycle=args.rows, n_cols=args.cols)
+        cache_dir = os.path.join(folder, 'cache')
+
+        _, cold = time_call(pf.glob_concat, folder, '*.XPT',
+                            cache_dir=cache_dir)
+        _, warm = time_call(pf.glob_concat, folder, '*.XPT',
+                            cache_dir=cache_dir)
+        size = sum(size for _, size, _ in pf.cache.cache_entries(cache_dir))
+
+        print(f'{args.cycles} files x {args.rows} rows x {args.cols} columns')
+        print(f'cold (parse and store) {cold:8.2f}s')
+        print(f'warm (cache hits)      {warm:8.2f}s  {cold / warm:6.1f}x')
+        print(f'cache size             {size / 1e6:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
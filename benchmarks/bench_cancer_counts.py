@@ -0,0 +1,72 @@
+'''
+Compares the row by row cancer count functions, used with df.apply, against
+the vectorized cancer_counts on synthetic conditions tables.
+
+    python benchmarks/bench_cancer_counts.py --sizes 100000 1000000 10000000
+'''
+
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from timing import time_call
+
+
+CANCER_TYPES = ['None', 'Breast', 'Prostate', 'Colon', 'Skin Non Melanoma',
+                'Lung', 'Melanoma', 'Other']
+
+
+def make_conditions(n_rows, seed=0):
+    '''
+    Generates cancer type columns where most people have no cancer and later
+    cancers are rarer than earlier ones.
+    '''
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(index=pd.RangeIndex(n_rows, name='SEQN'))
+    for col, p_none in [('first_cancer_type', .9), ('second_cancer_type', .97),
+                        ('third_cancer_type', .99)]:
+        p = [p_none] + [(1 - p_none) / 7] * 7
+        df[col] = rng.choice(CANCER_TYPES, n_rows, p=p).astype(object)
+    return df
+
+
+def apply_counts(df):
+    '''
+    The way the notebook creates the count columns.
+    '''
+    counts = pd.DataFrame(index=df.index)
+    counts['first_cancer_count'] = df.apply(pf.first_cancer_count, axis=1)
+    counts['second_cancer_count'] = df.apply(pf.second_cancer_count, axis=1)
+    counts['third_cancer_count'] = df.apply(pf.third_cancer_count, axis=1)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100000, 1000000, 10000000])
+    parser.add_argument('--apply-max', type=int, default=1000000,
+                        help='largest size to run the apply version on')
+    args = parser.parse_args()
+
+    print(f'{"rows":>10s} {"apply":>10s} {"vectorized":>11s} {"speedup":>8s}')
+    for n_rows in args.sizes:
+        df = make_conditions(n_rows)
+        vectorized, fast = time_call(pf.cancer_counts, df)
+
+        if n_rows > args.apply_max:
+            print(f'{n_rows:10d} {"skipped":>10s} {fast:10.3f}s')
+            continue
+
+        applied, slow = time_call(apply_counts, df)
+        assert applied.equals(vectorized)
+        print(f'{n_rows:10d} {slow:9.2f}s {fast:10.3f}s {slow / fast:7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
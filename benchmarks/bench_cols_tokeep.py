@@ -0,0 +1,77 @@
+'''
+Compares the time and peak memory of the old drop-one-column-at-a-time
+cols_tokeep with the single pass version on a wide synthetic frame.
+
+    python benchmarks/bench_cols_tokeep.py --rows 20000 --cols 300 --keep 30
+'''
+
+import argparse
+import os
+import sys
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from timing import time_call
+
+
+def old_cols_tokeep(df, col_list):
+    '''
+    The previous cols_tokeep, kept here as the baseline.
+    '''
+    df_copy = df.copy()
+    for col in df_copy.columns:
+        if col not in col_list:
+            df_copy.drop(columns=[col], inplace=True)
+    return df_copy
+
+
+def measure(func, *args, **kwargs):
+    '''
+    Runs a function once and returns the seconds it took and the peak memory
+    it allocated in MB.
+    '''
+    tracemalloc.start()
+    _, seconds = time_call(func, *args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--cols', type=int, default=300)
+    parser.add_argument('--keep', type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((args.rows, args.cols)),
+                      columns=[f'VAR{i:03d}' for i in range(args.cols)])
+    frame_mb = df.memory_usage().sum() / 1e6
+
+    # Scattered columns need a copy, neighbouring ones can be a view
+    scattered = list(df.columns[::args.cols // args.keep][:args.keep])
+    neighbours = list(df.columns[:args.keep])
+
+    runs = [
+        ('old, scattered', old_cols_tokeep, scattered, {}),
+        ('new, scattered', pf.cols_tokeep, scattered, {}),
+        ('old, neighbouring', old_cols_tokeep, neighbours, {}),
+        ('new, neighbouring', pf.cols_tokeep, neighbours, {}),
+        ('new, neighbouring, copy=False', pf.cols_tokeep, neighbours,
+         {'copy': False}),
+    ]
+
+    print(f'{args.rows} rows x {args.cols} columns ({frame_mb:.1f} MB), '
+          f'keeping {args.keep}')
+    for name, func, cols, kwargs in runs:
+        seconds, peak = measure(func, df, cols, **kwargs)
+        print(f'{name:32s} {seconds:8.3f}s  peak {peak:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+Compares working out the percentage table of every feature the way
+plotting_percentages does, a groupby and value_counts per feature, with
+crosstabs, which counts every feature against the target from factorized
+codes, and with reading saved tables back in a later session. Also draws
+a few headless percentage plots from the data and from the tables.
+
+    python benchmarks/bench_crosstab.py --rows 500000 --cat 40 --plots 4
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import make_full_data
+from timing import time_call
+
+
+def groupby_tables(df, cols, target='depression'):
+    '''
+    The percentages and sorted values plotting_percentages works out for
+    each feature.
+    '''
+    tables = {}
+    for col in cols:
+        temp_df = df.groupby(col)[target].value_counts(normalize=True)
+        temp_df = temp_df.mul(100).rename('percent').reset_index()
+        order_list = list(df[col].unique())
+        order_list.sort()
+        tables[col] = temp_df, order_list
+    return tables
+
+
+def draw(cols, df=None, tables=None):
+    '''
+    Draws the headless percentage plot of each column.
+    '''
+    for col in cols:
+        table = None if tables is None else tables[col]
+        pf.percentages_figure(df, col, table=table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--cat', type=int, default=40)
+    parser.add_argument('--plots', type=int, default=4)
+    args = parser.parse_args()
+
+    df = make_full_data(args.rows, n_cat=args.cat, n_num=10, n_rx=10)
+    cols = [col for col in df.columns if col != 'depression']
+
+    old, old_seconds = time_call(groupby_tables, df, cols)
+    tables, new_seconds = time_call(pf.crosstabs, df, cols)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'crosstabs.pkl')
+        pf.save_crosstabs(tables, path)
+        _, cached_seconds = time_call(pf.load_crosstabs, path)
+
+    # The same percentages in the same order
+    for col in cols:
+        temp_df, order_list = old[col]
+        new = pf.table_percentages(tables[col])
+        merged = temp_df.merge(new, on=[col, 'depression'])
+        assert len(merged) == len(temp_df) == len(new), col
+        assert (merged['percent_x'] - merged['percent_y']).abs().max() < 1e-9
+        assert order_list == list(tables[col].index), col
+
+    print(f'{args.rows} rows, {len(cols)} features')
+    print(f'groupby per feature   {old_seconds:8.2f}s')
+    print(f'crosstabs             {new_seconds:8.2f}s  '
+          f'{old_seconds / new_seconds:6.1f}x')
+    print(f'load_crosstabs        {cached_seconds:8.2f}s')
+
+    plot_cols = [col for col in cols if col.startswith('cat_')][:args.plots]
+    _, data_seconds = time_call(draw, plot_cols, df=df)
+    _, table_seconds = time_call(draw, plot_cols, tables=tables)
+    print(f'{len(plot_cols)} plots from data    {data_seconds:8.2f}s')
+    print(f'{len(plot_cols)} plots from tables  {table_seconds:8.2f}s')
+
+
+if __name__ == '__main__':
+    main()
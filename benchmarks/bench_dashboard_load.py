@@ -0,0 +1,61 @@
+'''
+Compares the dashboard's startup read of StreamlitData.csv with dtype
+inference against load_data with the explicit schema, from CSV, Parquet and
+Feather, and against a cached rerun.
+
+    python benchmarks/bench_dashboard_load.py --rows 40000
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Dashboard'))
+
+import dashboard_data
+from synthetic import make_dashboard_data
+from timing import time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=40000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, 'StreamlitData.csv')
+        make_dashboard_data(args.rows).to_csv(csv_path, index=False)
+        parquet_path = dashboard_data.convert_data(
+            csv_path, os.path.join(folder, 'StreamlitData.parquet'))
+        feather_path = dashboard_data.convert_data(
+            csv_path, os.path.join(folder, 'StreamlitData.feather'))
+
+        def uncached(path):
+            dashboard_data.load_data.cache_clear()
+            return dashboard_data.load_data(path)
+
+        runs = [
+            ('read_csv, inferred dtypes', pd.read_csv, csv_path),
+            ('load_data, csv', uncached, csv_path),
+            ('load_data, parquet', uncached, parquet_path),
+            ('load_data, feather', uncached, feather_path),
+            ('load_data, cached rerun', dashboard_data.load_data,
+             feather_path),
+        ]
+
+        print(f'{args.rows} rows, {os.path.getsize(csv_path) / 1e6:.1f} MB '
+              f'csv')
+        base_seconds = None
+        for name, func, path in runs:
+            df, seconds = time_call(func, path)
+            base_seconds = base_seconds or seconds
+            memory = df.memory_usage(deep=True).sum() / 1e6
+            print(f'{name:28s} {seconds:8.3f}s  '
+                  f'{base_seconds / seconds:8.1f}x  {memory:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
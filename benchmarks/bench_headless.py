@@ -0,0 +1,80 @@
+'''
+Draws and saves many plots and tracks the resident memory after each batch,
+once with pyplot figures that are never closed and once with the headless
+figures. The headless memory should stay flat.
+
+    python benchmarks/bench_headless.py --plots 1000
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from project_functions import headless
+from timing import time_call, rss_mb
+
+
+def pyplot_plot(df, folder, i):
+    '''
+    The global pyplot way, as in the notebook functions.
+    '''
+    plt.figure(figsize=(8, 6))
+    plt.hist(df['value'], bins=20)
+    plt.title(f'Plot {i}')
+    plt.savefig(os.path.join(folder, f'pyplot_{i}.png'))
+
+
+def headless_plot(df, folder, i):
+    '''
+    The same plot drawn and saved with the headless functions.
+    '''
+    fig, ax = headless.new_figure((8, 6))
+    ax.hist(df['value'], bins=20)
+    ax.set_title(f'Plot {i}')
+    headless.save_figure(fig, folder, f'headless_{i}')
+
+
+def run(plot, df, folder, n_plots, step):
+    '''
+    Draws the plots and returns the resident memory after every step plots.
+    '''
+    memory = []
+    for i in range(n_plots):
+        plot(df, folder, i)
+        if (i + 1) % step == 0:
+            memory.append(rss_mb())
+    return memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--plots', type=int, default=1000)
+    args = parser.parse_args()
+    step = max(1, args.plots // 10)
+
+    df = pd.DataFrame({'value': np.random.default_rng(0).normal(size=5000)})
+    # Too many open pyplot figures is the point here, so the warning is muted
+    plt.rcParams['figure.max_open_warning'] = 0
+
+    with tempfile.TemporaryDirectory() as folder:
+        for name, plot in [('headless', headless_plot),
+                           ('pyplot, never closed', pyplot_plot)]:
+            memory, seconds = time_call(run, plot, df, folder, args.plots,
+                                        step)
+            trace = ' '.join(f'{mb:.0f}' for mb in memory)
+            print(f'{name:22s} {seconds:7.1f}s  RSS MB every {step} plots: '
+                  f'{trace}')
+        plt.close('all')
+
+
+if __name__ == '__main__':
+    main()
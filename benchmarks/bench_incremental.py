@@ -0,0 +1,61 @@
+'''
+Compares adding one new survey cycle to a component by rebuilding it from
+every .XPT file with glob_concat against adding it to the incremental store
+with ingest_component, for growing numbers of existing cycles.
+
+    python benchmarks/bench_incremental.py --cycles 4 8 16 --rows 10000
+'''
+
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import make_component, write_xpt
+from timing import time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cycles', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--cols', type=int, default=60)
+    args = parser.parse_args()
+
+    builtins.display = lambda *objs: None
+
+    print(f'{"existing cycles":>16s} {"full rebuild":>13s} '
+          f'{"incremental":>12s} {"speedup":>8s}')
+    for n_cycles in args.cycles:
+        with tempfile.TemporaryDirectory() as folder:
+            source = os.path.join(folder, 'Demographics')
+            store = os.path.join(folder, 'store')
+            os.makedirs(source)
+
+            def add_cycle(cycle):
+                df = make_component(args.rows, args.cols,
+                                    seqn_start=cycle * args.rows, seed=cycle)
+                write_xpt(df, os.path.join(source, f'DEMO_{cycle:02d}.XPT'))
+
+            for cycle in range(n_cycles):
+                add_cycle(cycle)
+            pf.ingest_component(source, '*.XPT', store)
+
+            # A new cycle is released
+            add_cycle(n_cycles)
+            rebuilt, full = time_call(pf.glob_concat, source, '*.XPT')
+            summary, incremental = time_call(pf.ingest_component, source,
+                                             '*.XPT', store)
+            assert summary['skipped'] == n_cycles
+            stored = pf.load_component(store, 'Demographics')
+            assert stored.sort_index().equals(rebuilt.sort_index())
+            print(f'{n_cycles:16d} {full:12.2f}s {incremental:11.2f}s '
+                  f'{full / incremental:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+'''
+Compares reading a synthetic multi-cycle .XPT corpus with the plain serial
+glob_concat against the parallel, column projected and downcast version.
+
+    python benchmarks/bench_ingest.py --cycles 10 --rows 20000 --cols 120
+'''
+
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import make_xpt_corpus
+from timing import time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--cols', type=int, default=120)
+    parser.add_argument('--keep', type=int, default=15,
+                        help='number of columns to keep')
+    parser.add_argument('--jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    # glob_concat displays the files it finds, which needs IPython otherwise
+    builtins.display = lambda *objs: None
+
+    with tempfile.TemporaryDirectory() as folder:
+        make_xpt_corpus(folder, n_cycles=args.cycles,
+                        rows_per_cycle=args.rows, n_cols=args.cols)
+        tokeep = [f'VAR{i:03d}' for i in range(args.keep)]
+
+        # The current approach: read everything, then keep the wanted columns
+        def baseline():
+            return pf.cols_tokeep(pf.glob_concat(folder, '*.XPT'), tokeep)
+
+        runs = [
+            ('serial, all columns', baseline),
+            ('serial, projected', lambda: pf.glob_concat(
+                folder, '*.XPT', columns=tokeep)),
+            ('parallel, projected', lambda: pf.glob_concat(
+                folder, '*.XPT', columns=tokeep, n_jobs=args.jobs)),
+            ('parallel, projected, downcast', lambda: pf.glob_concat(
+                folder, '*.XPT', columns=tokeep, downcast=True,
+                n_jobs=args.jobs)),
+        ]
+
+        print(f'{args.cycles} files x {args.rows} rows x {args.cols} columns, '
+              f'keeping {args.keep}')
+        base_seconds = None
+        for name, func in runs:
+            df, seconds = time_call(func)
+            base_seconds = base_seconds or seconds
+            memory = df.memory_usage(deep=True).sum() / 1e6
+            print(f'{name:32s} {seconds:8.2f}s  {base_seconds / seconds:5.2f}x'
+                  f'  {memory:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+'''
+Compares joining many cleaned components on SEQN with a chain of
+pd.concat(axis=1) calls, like the notebook builds full_df, against
+join_components, on synthetic components that each cover part of the
+people.
+
+    python benchmarks/bench_join.py --components 24 --rows 100000
+'''
+
+import argparse
+import os
+import sys
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from timing import time_call
+
+
+def make_components(n_components, n_rows, n_cols, seed=0):
+    '''
+    Generates components indexed by SEQN in shuffled order, each covering
+    70 to 100 percent of the people, with numerical, integer and
+    categorical columns.
+    '''
+    rng = np.random.default_rng(seed)
+    components = {}
+    for i in range(n_components):
+        seqn = rng.permutation(n_rows)[:int(n_rows * rng.uniform(.7, 1))]
+        data = {}
+        for j in range(n_cols):
+            name = f'C{i:02d}_{j:02d}'
+            if j % 3 == 0:
+                data[name] = pd.Categorical.from_codes(
+                    rng.integers(0, 4, len(seqn)), ['Yes', 'No', 'Missing',
+                                                    'Refused'])
+            elif j % 3 == 1:
+                data[name] = rng.integers(0, 100, len(seqn))
+            else:
+                data[name] = rng.normal(size=len(seqn))
+        components[f'component_{i:02d}'] = pd.DataFrame(
+            data, index=pd.Index(seqn, name='SEQN'))
+    return components
+
+
+def chained_concat(components, target):
+    '''
+    The notebook's way: concatenate one component at a time, then keep the
+    target's people.
+    '''
+    full_df = None
+    for df in components.values():
+        full_df = df if full_df is None else pd.concat([full_df, df], axis=1)
+    return full_df.loc[components[target].index]
+
+
+def measure(func, *args, repeat=3, **kwargs):
+    '''
+    Best seconds of a few runs and the peak MB allocated while running,
+    as traced by tracemalloc, which numpy and pandas report to.
+    '''
+    seconds = []
+    for _ in range(repeat):
+        result, elapsed = time_call(func, *args, **kwargs)
+        seconds.append(elapsed)
+        del result
+    tracemalloc.start()
+    result = func(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, min(seconds), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--components', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--cols', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    components = make_components(args.components, args.rows, args.cols)
+    target = next(iter(components))
+
+    old, old_seconds, old_peak = measure(chained_concat, components, target,
+                                         repeat=args.repeat)
+    (new, coverage), new_seconds, new_peak = measure(
+        pf.join_components, components, how='left', repeat=args.repeat)
+    pd.testing.assert_frame_equal(old.sort_index(), new, check_dtype=False,
+                                  check_categorical=False)
+    _, inner_seconds, inner_peak = measure(pf.join_components, components,
+                                           how='inner', repeat=args.repeat)
+
+    print(f'{args.components} components x {args.rows} people x '
+          f'{args.cols} columns, joined {new.shape}')
+    print(f'{"":22} {"seconds":>8} {"peak MB":>8}')
+    print(f'{"chained concat":22} {old_seconds:8.2f} {old_peak:8.0f}')
+    print(f'{"join_components left":22} {new_seconds:8.2f} {new_peak:8.0f}')
+    print(f'{"join_components inner":22} {inner_seconds:8.2f} '
+          f'{inner_peak:8.0f}')
+    print()
+    print(coverage.head().to_string())
+
+if __name__ == '__main__':
+    main()
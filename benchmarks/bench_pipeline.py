@@ -0,0 +1,354 @@
+'''
+Runs the whole pipeline on synthetic NHANES components at several sizes and
+records the seconds, patients per second and memory of every stage, so a
+change that slows a stage down or makes it use more memory shows up. Each
+size is written as one .XPT file per survey cycle for every component and
+then loaded with glob_concat, cleaned with cols_tokeep and apply_recodes,
+turned into features with cancer_counts, rx_features and join_components,
+trained with fit_pipeline and scored with evaluate_model. Every size runs
+in a fresh process so its peak memory is its own.
+
+Results can be saved as JSON and compared with an earlier run, which lists
+every stage that got slower or used more memory than the tolerance allows
+and exits with status 1. Repeating each size and keeping the fastest run of
+every stage makes the comparison far less noisy.
+
+    python benchmarks/bench_pipeline.py --sizes 10000 100000 1000000 \
+        --data-dir bench_data --repeats 3 --save pipeline.json
+    python benchmarks/bench_pipeline.py --data-dir bench_data --repeats 3 \
+        --baseline pipeline.json
+'''
+
+import argparse
+import builtins
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import MEDS, NHANES_FILES, write_nhanes
+from timing import time_call, rss_mb, peak_rss_mb
+
+# Stages in the order they run, generating the data is not one of them
+STAGES = ['load', 'target', 'clean', 'features', 'train', 'evaluate']
+
+# Differences in seconds and MB below these are noise, never regressions
+MIN_SECONDS = .05
+MIN_MB = 20
+
+DEMO_TOKEEP = ['RIAGENDR', 'RIDAGEYR', 'RIDRETH1', 'DMDCITZN', 'DMDEDUC2',
+               'DMDMARTL', 'DMDHHSIZ', 'INDHHIN2', 'RIDEXPRG']
+
+# The notebook's demographics cleaning as a recode spec
+DEMO_RECODES = {
+    'RIAGENDR': {'codes': {1: 0, 2: 1}, 'dtype': 'int'},
+    'RIDRETH1': {'codes': {1: 'Mexican', 2: 'Other Hispanic', 3: 'White',
+                           4: 'Black', 5: 'Other and Multiracial'}},
+    'DMDCITZN': {'codes': {1: 'Citizen', 2: 'Not Citizen'},
+                 'missing': [7, 9], 'fill': 'Missing'},
+    'DMDEDUC2': {'missing': [7, 9], 'fill': 0, 'dtype': 'int'},
+    'DMDMARTL': {'codes': {1: 'Married', 2: 'Widowed', 3: 'Divorced',
+                           4: 'Separated', 5: 'Never Married', 6: 'Partner'},
+                 'missing': [77, 99], 'fill': 'Missing'},
+    'INDHHIN2': {'codes': {12: 5, 13: 4, 14: 11, 15: 12},
+                 'missing': [77, 99], 'fill': 0, 'dtype': 'int'},
+    'RIDEXPRG': {'codes': {1: 'Yes', 2: 'No'}, 'missing': [3],
+                 'fill': 'Missing'}}
+DEMO_NAMES = {'RIAGENDR': 'gender', 'RIDAGEYR': 'age', 'RIDRETH1': 'race',
+              'DMDCITZN': 'citizenship', 'DMDEDUC2': 'education_level',
+              'DMDMARTL': 'marital_status', 'DMDHHSIZ': 'household_size',
+              'INDHHIN2': 'household_income', 'RIDEXPRG': 'pregnant'}
+
+# The conditions cleaning, yes/no answers become 1 and 0 and the cancer type
+# codes become names with 'None' for no cancer
+YES_NO = {'codes': {2: 0}, 'missing': [7, 9], 'fill': 0, 'dtype': 'int'}
+CANCER_TYPES = {'codes': {code: f'Type {code}' for code in range(10, 40)},
+                'fill': 'None'}
+CANCER_NAMES = {'MCQ230A': 'first_cancer_type',
+                'MCQ230B': 'second_cancer_type',
+                'MCQ230C': 'third_cancer_type'}
+
+
+def load(folder, n_jobs):
+    '''
+    Reads every component like the notebook, the long prescriptions table
+    file by file since a person has many rows in it.
+    '''
+    components = {}
+    for name, (subfolder, _) in NHANES_FILES.items():
+        path = os.path.join(folder, subfolder)
+        if name == 'prescriptions':
+            files = sorted(os.path.join(path, file)
+                           for file in os.listdir(path))
+            scripts = pd.concat(pf.read_xpt_files(files, n_jobs=n_jobs))
+            scripts['SEQN'] = scripts['SEQN'].astype('int64')
+            components[name] = scripts
+        else:
+            components[name] = pf.glob_concat(path, '*.XPT', n_jobs=n_jobs)
+    return components
+
+
+def clean(components):
+    '''
+    Keeps and recodes the columns of the demographics, conditions and labs.
+    '''
+    demo = pf.cols_tokeep(components['demographics'], DEMO_TOKEEP)
+    demo = pf.apply_recodes(demo, DEMO_RECODES, copy=False)
+    demo = demo.rename(columns=DEMO_NAMES)
+
+    conditions = components['conditions']
+    spec = {col: YES_NO for col in conditions.columns
+            if col not in CANCER_NAMES}
+    spec.update({col: CANCER_TYPES for col in CANCER_NAMES})
+    conditions = pf.apply_recodes(conditions, spec)
+    conditions = conditions.rename(columns=CANCER_NAMES)
+
+    # Lab results that were not measured get the middle value
+    labs = components['labs']
+    labs = labs.fillna(labs.median())
+    return {'demo': demo, 'conditions': conditions, 'labs': labs}
+
+
+def features(components, cleaned, target):
+    '''
+    Adds the cancer counts and prescription features and joins everything
+    onto the people with a target.
+    '''
+    conditions = cleaned['conditions']
+    counts = pf.cancer_counts(conditions)
+    conditions = pd.concat([conditions.drop(columns=list(CANCER_NAMES
+                                                          .values())),
+                            counts], axis=1)
+    rx_df = pf.rx_features(components['prescriptions'], MEDS,
+                           sparse_output=False)
+
+    full, _ = pf.join_components({'target': target.to_frame(),
+                                  'demo': cleaned['demo'],
+                                  'conditions': conditions,
+                                  'labs': cleaned['labs'],
+                                  'rx': rx_df}, target='target')
+    full[rx_df.columns] = full[rx_df.columns].fillna(0)
+
+    # fit_pipeline encodes the text columns, which it finds by their dtype
+    text_cols = full.select_dtypes('category').columns
+    full[text_cols] = full[text_cols].astype(object)
+    return full
+
+
+def train(full, random_state=123):
+    '''
+    Splits the people and fits the notebook's preprocessing and a logistic
+    regression on the training set.
+    '''
+    X = full.drop(columns='depression')
+    y = full['depression']
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=.25, stratify=y, random_state=random_state)
+    model = LogisticRegression(class_weight='balanced', max_iter=1000)
+    pipeline = pf.fit_pipeline(X_train, y_train, model,
+                               random_state=random_state)
+    return pipeline, X_train, X_test, y_test
+
+
+def evaluate(pipeline, X_train, X_test, y_test):
+    '''
+    Scores the test set with evaluate_model.
+    '''
+    X_test_final = pf.transform_features(pipeline, X_test)
+    return pf.evaluate_model(pipeline['model'], X_train, X_test_final, y_test,
+                             verbose=False)
+
+
+def stage(stats, name, n_patients, func, *args):
+    '''
+    Runs one stage and records its seconds, patients per second, resident
+    memory after it and how much it raised the peak.
+    '''
+    peak = peak_rss_mb()
+    result, seconds = time_call(func, *args)
+    stats[name] = {'seconds': seconds,
+                   'patients_per_second': n_patients / seconds,
+                   'rss_mb': rss_mb(),
+                   'peak_rise_mb': peak_rss_mb() - peak}
+    return result
+
+
+def run_size(n_patients, data_dir, n_cycles, n_jobs, trace):
+    '''
+    Generates the data of one size when it is not in the data folder yet and
+    runs every stage on it, meant to run in a fresh process.
+    '''
+    builtins.display = lambda *objs: None
+    if trace:
+        pf.enable_tracing(trace)
+
+    # The data is written next to its final folder and renamed into place,
+    # so a stopped run never leaves half a corpus to be reused
+    folder = os.path.join(data_dir, f'nhanes_{n_patients}')
+    generate_seconds = None
+    if not os.path.isdir(folder):
+        temp = f'{folder}.{os.getpid()}.tmp'
+        _, generate_seconds = time_call(write_nhanes, temp, n_patients,
+                                        n_cycles)
+        os.replace(temp, folder)
+
+    stats = {}
+    components = stage(stats, 'load', n_patients, load, folder, n_jobs)
+    target = stage(stats, 'target', n_patients, pf.phq9_target,
+                   components['target'])
+    cleaned = stage(stats, 'clean', n_patients, clean, components)
+    full = stage(stats, 'features', n_patients, features, components,
+                 cleaned, target)
+    pipeline, X_train, X_test, y_test = stage(stats, 'train', n_patients,
+                                              train, full)
+    results = stage(stats, 'evaluate', n_patients, evaluate, pipeline,
+                    X_train, X_test, y_test)
+    if trace:
+        pf.disable_tracing()
+
+    total = sum(stats[name]['seconds'] for name in STAGES)
+    return {'patients': n_patients,
+            'rows': len(full),
+            'features': full.shape[1] - 1,
+            'generate_seconds': generate_seconds,
+            'stages': stats,
+            'total_seconds': total,
+            'patients_per_second': n_patients / total,
+            'peak_mb': peak_rss_mb(),
+            'f2': results['f2'],
+            'roc_auc': results['roc_auc']}
+
+
+def best_of(runs):
+    '''
+    Combines repeated runs of one size, keeping each stage's fastest run and
+    the lowest peak memory, which are the least disturbed by anything else
+    running on the machine.
+    '''
+    best = dict(runs[0])
+    best['stages'] = {name: min((run['stages'][name] for run in runs),
+                                key=lambda stats: stats['seconds'])
+                      for name in STAGES}
+    best['total_seconds'] = sum(best['stages'][name]['seconds']
+                                for name in STAGES)
+    best['patients_per_second'] = best['patients'] / best['total_seconds']
+    best['peak_mb'] = min(run['peak_mb'] for run in runs)
+    best['repeats'] = len(runs)
+    return best
+
+
+def regressions(results, baseline, tolerance):
+    '''
+    Stages of the sizes in both runs that took more seconds or raised the
+    peak memory by more than the tolerance, ignoring differences that are
+    only noise.
+    '''
+    found = []
+    for size, run in results.items():
+        if size not in baseline:
+            continue
+        old = baseline[size]
+        checks = [(f'{name} seconds', run['stages'][name]['seconds'],
+                   old['stages'][name]['seconds'], MIN_SECONDS)
+                  for name in STAGES]
+        checks.append(('peak MB', run['peak_mb'], old['peak_mb'], MIN_MB))
+        for what, new_value, old_value, noise in checks:
+            if (new_value > old_value * (1 + tolerance)
+                    and new_value - old_value > noise):
+                found.append(f'{size} patients, {what}: {old_value:.2f} -> '
+                             f'{new_value:.2f}')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--cycles', type=int, default=4)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=1,
+                        help='runs of each size, the fastest of each stage '
+                             'is kept')
+    parser.add_argument('--data-dir', default=None,
+                        help='folder to keep the generated data in between '
+                             'runs, a temporary folder when not given')
+    parser.add_argument('--trace', default=None,
+                        help='JSONL file to trace every function call into')
+    parser.add_argument('--save', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=.25)
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp()
+    os.makedirs(data_dir, exist_ok=True)
+    results = {}
+    try:
+        for n_patients in args.sizes:
+            runs = []
+            for _ in range(args.repeats):
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    runs.append(executor.submit(
+                        run_size, n_patients, data_dir, args.cycles,
+                        args.jobs, args.trace).result())
+            results[str(n_patients)] = best_of(runs)
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    for size, run in results.items():
+        generated = ('reused' if run['generate_seconds'] is None
+                     else f"{run['generate_seconds']:.2f}s")
+        print(f"{run['patients']} patients, {run['rows']} with a target, "
+              f"{run['features']} features, data {generated}")
+        print(f"{'stage':10s} {'seconds':>9s} {'patients/s':>12s} "
+              f"{'RSS MB':>8s} {'peak +MB':>9s}")
+        for name in STAGES:
+            stats = run['stages'][name]
+            print(f"{name:10s} {stats['seconds']:9.2f} "
+                  f"{stats['patients_per_second']:12.0f} "
+                  f"{stats['rss_mb']:8.0f} {stats['peak_rise_mb']:9.0f}")
+        print(f"{'total':10s} {run['total_seconds']:9.2f} "
+              f"{run['patients_per_second']:12.0f}   peak "
+              f"{run['peak_mb']:.0f} MB, F2 {run['f2']:.3f}, "
+              f"ROC AUC {run['roc_auc']:.3f}")
+        print()
+
+    if args.trace:
+        print(pf.trace_summary(args.trace, top=10).round(3).to_string())
+        print()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'machine': {'python': platform.python_version(),
+                                   'pandas': pd.__version__,
+                                   'numpy': np.__version__,
+                                   'cpus': os.cpu_count()},
+                       'tolerance': args.tolerance,
+                       'sizes': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['sizes']
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print(f'Slower or larger than the baseline by more than '
+                  f'{args.tolerance:.0%}:')
+            for line in found:
+                print('  ' + line)
+            sys.exit(1)
+        print('No regressions against the baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+'''
+Compares val_counts, which displays every column's value counts, with
+profile_frame on a wide synthetic component of NHANES style answer codes,
+labels and measurements. Outside a notebook display is replaced by
+printing the text of each value count to a throwaway buffer, which is less
+work than rendering it in a notebook.
+
+    python benchmarks/bench_profiling.py --rows 100000 --cols 300
+'''
+
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from timing import time_call
+
+
+def make_wide(n_rows, n_cols, seed=0):
+    '''
+    Answer code columns with nulls and 7/9 codes, categorical label columns
+    and continuous measurement columns, in equal parts.
+    '''
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(n_cols):
+        if i % 3 == 0:
+            values = rng.choice([1., 2., 7., 9., np.nan], p=[.5, .4, .02, .03,
+                                                            .05], size=n_rows)
+        elif i % 3 == 1:
+            values = pd.Categorical.from_codes(
+                rng.integers(-1, 4, n_rows), ['Yes', 'No', 'Missing',
+                                              'Refused'])
+        else:
+            values = rng.normal(100, 15, n_rows).round(1)
+        data[f'VAR{i:03d}'] = values
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--cols', type=int, default=300)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    df = make_wide(args.rows, args.cols)
+    buffer = io.StringIO()
+    builtins.display = lambda *objs: print(*objs, file=buffer)
+
+    with contextlib.redirect_stdout(buffer):
+        _, old_seconds = time_call(pf.val_counts, df)
+    summary, new_seconds = time_call(pf.profile_frame, df,
+                                     n_jobs=args.n_jobs)
+
+    print(f'{args.rows} rows x {args.cols} columns')
+    print(f'val_counts       {old_seconds:8.2f}s')
+    print(f'profile_frame    {new_seconds:8.2f}s  '
+          f'{old_seconds / new_seconds:6.1f}x')
+    print()
+    print(summary.head(6).to_string())
+
+
+if __name__ == '__main__':
+    main()
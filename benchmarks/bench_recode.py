@@ -0,0 +1,125 @@
+'''
+Compares the notebook's chained replace, fillna and astype cleaning of the
+demographics answer codes with apply_recodes on the same spec, on a
+synthetic table, and prints the time and the memory report. Before timing
+it checks that continuous columns and fractional codes stay floats.
+
+    python benchmarks/bench_recode.py --rows 1000000
+'''
+
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from timing import time_call
+
+# The demographics recodes from the cleaning notebook
+SPEC = {
+    'gender': {'codes': {2: 1, 1: 0}},
+    'race': {'codes': {1: 'Mexican', 2: 'Other Hispanic', 3: 'White',
+                       4: 'Black', 5: 'Other and Multiracial'}},
+    'citizenship': {'codes': {1: 'Citizen', 2: 'Not Citizen'},
+                    'missing': [7, 9], 'fill': 'Missing'},
+    'education_level': {'missing': [7, 9], 'fill': 0},
+    'marital_status': {'codes': {1: 'Married', 2: 'Widowed', 3: 'Divorced',
+                                 4: 'Separated', 5: 'Never Married',
+                                 6: 'Partner'},
+                       'missing': [77, 99], 'fill': 'Missing'},
+    'pregnant': {'codes': {1: 'Yes', 2: 'No'}, 'missing': [3],
+                 'fill': 'Missing'},
+    'birth_place': {'codes': {1: 'USA', 2: 'Mexico', 3: 'Elsewhere',
+                              4: 'Other Spanish Country',
+                              5: 'Other Non Spanish Country'},
+                    'missing': [7, 9, 77, 99], 'fill': 'Missing'},
+}
+
+
+def make_demo(n_rows, seed=0):
+    '''
+    Generates the raw float answer codes of the demographics columns, with
+    nulls and refused/don't know codes.
+    '''
+    rng = np.random.default_rng(seed)
+    choices = {'gender': [1, 2], 'race': [1, 2, 3, 4, 5],
+               'citizenship': [1, 2, 7, 9], 'education_level': [1, 2, 3, 4, 5,
+                                                                7, 9],
+               'marital_status': [1, 2, 3, 4, 5, 6, 77, 99],
+               'pregnant': [1, 2, 3], 'birth_place': [1, 2, 3, 4, 5, 7, 9]}
+    df = pd.DataFrame({col: rng.choice(values, n_rows).astype('float64')
+                       for col, values in choices.items()})
+    for col in ['citizenship', 'education_level', 'marital_status',
+                'pregnant', 'birth_place']:
+        df.loc[rng.random(n_rows) < .05, col] = np.nan
+    return df
+
+
+def chained(df):
+    '''
+    The notebook's way: replace, fillna and astype one column at a time.
+    '''
+    df = df.copy()
+    for col, rule in SPEC.items():
+        codes = dict(rule.get('codes', {}))
+        codes.update({code: rule['fill'] for code in rule.get('missing', [])})
+        df[col] = df[col].replace(codes)
+        if 'fill' in rule:
+            df[col] = df[col].fillna(rule['fill'])
+        if not any(isinstance(value, str) for value in codes.values()):
+            df[col] = df[col].astype('int64')
+        else:
+            df[col] = df[col].astype(object)
+    return df
+
+
+def check_numbers():
+    '''
+    Checks that columns of measurements and fractional codes stay floats
+    when no dtype is given, instead of being cut to whole numbers.
+    '''
+    bmi = pd.Series([23.4, 25.9, 7777.0, 30.1], name='bmi')
+    recoded = pf.recode_column(bmi, {'codes': {7777: 0}})
+    assert recoded.dtype == 'float64', recoded.dtype
+    assert recoded.tolist() == [23.4, 25.9, 0., 30.1], recoded.tolist()
+
+    recoded = pf.recode_column(bmi, {'missing': [7777]})
+    assert recoded.dtype == 'float64', recoded.dtype
+    assert recoded.isna().tolist() == [False, False, True, False]
+
+    answers = pd.Series([1., 2., 3., np.nan], name='answers')
+    recoded = pf.recode_column(answers, {'codes': {3: 5.5}})
+    assert recoded.dtype == 'float64', recoded.dtype
+    assert recoded.tolist()[:3] == [1., 2., 5.5], recoded.tolist()
+
+    # Whole numbers still get the smallest integer dtype
+    recoded = pf.recode_column(answers, {'codes': {3: 5}})
+    assert recoded.dtype == 'Int8', recoded.dtype
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+    check_numbers()
+
+    raw = make_demo(args.rows)
+    old, old_seconds = time_call(chained, raw)
+    new, new_seconds = time_call(pf.apply_recodes, raw, SPEC)
+
+    # Same answers, only the dtypes differ
+    for col in SPEC:
+        assert (old[col].astype(str) == new[col].astype(str)).all(), col
+
+    print(f'{args.rows} rows, {len(SPEC)} columns')
+    print(f'chained replace {old_seconds:8.2f}s')
+    print(f'apply_recodes   {new_seconds:8.2f}s  '
+          f'{old_seconds / new_seconds:6.1f}x')
+    print(pf.memory_report(old, new).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+'''
+Times the resampling stage on an encoded training table like the notebooks'
+X_train_final, with one-hot columns, quantile transformed columns and the
+cluster column. Compares a neighbour search over every column, which is
+what SMOTENC runs, with resample's search over the continuous columns, then
+times all of resample and loading its saved output in a later session. imbalanced-learn is used for
+the full SMOTENC run when it is installed.
+
+    python benchmarks/bench_resampling.py --rows 100000 --cat 30 --num 30
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import NearestNeighbors
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from synthetic import make_full_data
+from timing import time_call
+
+
+def neighbor_search(X, y, mask, k_neighbors=5, every_column=True):
+    '''
+    The neighbour search of the minority rows after undersampling. SMOTENC
+    searches every column, with the categorical ones scaled by the median
+    standard deviation, resample only the continuous ones.
+    '''
+    X, y = pf.undersample(X, y)
+    minority = X[y.to_numpy() == 1].to_numpy(dtype='float64', copy=True)
+    if every_column:
+        median_std = np.median(minority[:, ~mask].std(axis=0))
+        minority[:, mask] *= median_std / 2
+    else:
+        minority = minority[:, ~mask]
+    index = NearestNeighbors(n_neighbors=k_neighbors + 1).fit(minority)
+    return index.kneighbors(minority, return_distance=False)
+
+
+def imblearn_resample(X, y, mask):
+    '''
+    The notebooks' RandomUnderSampler and SMOTENC.
+    '''
+    from imblearn.under_sampling import RandomUnderSampler
+    from imblearn.over_sampling import SMOTENC
+    sampler = RandomUnderSampler(sampling_strategy=.25, random_state=123)
+    X_under, y_under = sampler.fit_resample(X, y)
+    smote = SMOTENC(categorical_features=mask, random_state=123)
+    return smote.fit_resample(X_under, y_under)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--cat', type=int, default=30)
+    parser.add_argument('--num', type=int, default=30)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    full_df = make_full_data(args.rows, n_cat=args.cat, n_num=args.num)
+    X = full_df.drop('depression', axis=1)
+    y = full_df['depression'].map({'Not Depressed': 0, 'Depressed': 1})
+    pipeline = pf.fit_pipeline(X, y, LogisticRegression(max_iter=200))
+    names = pf.feature_names(pipeline)
+    X_train_final = pd.DataFrame(pf.transform_features(pipeline, X),
+                                 columns=names)
+    mask = np.array([col not in pipeline['scale_cols'] for col in names])
+    y_train = y.reset_index(drop=True)
+
+    # A first run without saving loads the libraries before anything is
+    # timed
+    pf.resample(X_train_final.iloc[:5000], y_train.iloc[:5000], mask,
+                cache_dir=None)
+
+    rows = []
+    try:
+        _, seconds = time_call(imblearn_resample, X_train_final, y_train,
+                               mask)
+        rows.append(('imblearn SMOTENC', seconds))
+    except ImportError:
+        pass
+    for title, every_column in [('kNN, every column', True),
+                                ('kNN, continuous only', False)]:
+        _, seconds = time_call(neighbor_search, X_train_final, y_train, mask,
+                               every_column=every_column)
+        rows.append((title, seconds))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        (X_res, y_res), seconds = time_call(pf.resample, X_train_final,
+                                            y_train, mask,
+                                            cache_dir=cache_dir)
+        rows.append(('resample', seconds))
+        _, seconds = time_call(pf.resample, X_train_final, y_train, mask,
+                               cache_dir=cache_dir)
+        rows.append(('resample, saved', seconds))
+        size = sum(os.path.getsize(os.path.join(cache_dir, file))
+                   for file in os.listdir(cache_dir)) / 1e6
+
+    print(f'{X_train_final.shape} in, {X_res.shape} out, '
+          f'classes {y_res.value_counts().to_dict()}, saved {size:.0f} MB')
+    for title, seconds in rows:
+        print(f'{title:22} {seconds:8.2f}s')
+
+
+if __name__ == '__main__':
+    main()
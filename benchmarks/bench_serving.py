@@ -0,0 +1,93 @@
+'''
+Load test for the scoring service. Fits a pipeline on synthetic FullData
+style data, starts the service on a free localhost port and sends single
+record requests from many concurrent clients, once with micro-batching
+turned off and once with it on.
+
+    python benchmarks/bench_serving.py --requests 2000 --clients 32
+'''
+
+import argparse
+import json
+import os
+import sys
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from project_functions import serving
+from synthetic import make_full_data
+from timing import time_call
+
+
+def post(url, body):
+    '''
+    Sends one JSON request and returns the decoded response.
+    '''
+    request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                     headers={'Content-Type':
+                                              'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def load_test(pipeline, records, clients, max_batch):
+    '''
+    Starts a server, sends every record as its own request from a pool of
+    clients and returns the seconds taken and the server's metrics.
+    '''
+    server = serving.make_server(pipeline, port=0, max_batch=max_batch)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    try:
+        with ThreadPoolExecutor(clients) as executor:
+            responses, seconds = time_call(
+                lambda: list(executor.map(
+                    lambda record: post(f'{url}/score', record), records)))
+        with urllib.request.urlopen(f'{url}/metrics') as response:
+            metrics = json.loads(response.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+    return responses, seconds, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--train-rows', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=32)
+    args = parser.parse_args()
+
+    full_df = make_full_data(args.train_rows + args.requests)
+    X = full_df.drop('depression', axis=1)
+    y = full_df['depression'].map({'Not Depressed': 0, 'Depressed': 1})
+    pipeline = pf.fit_pipeline(X.iloc[:args.train_rows],
+                               y.iloc[:args.train_rows],
+                               LogisticRegression(max_iter=1000))
+
+    # Records as a client would send them, with plain Python values
+    test = X.iloc[args.train_rows:]
+    records = json.loads(test.to_json(orient='records'))
+    expected = pf.score_frame(pipeline, test)
+
+    print(f'{args.requests} single record requests from {args.clients} '
+          f'clients')
+    for name, max_batch in [('no batching', 1), ('micro-batching', 256)]:
+        responses, seconds, metrics = load_test(pipeline, records,
+                                                args.clients, max_batch)
+        scores = np.array([response['scores'][0] for response in responses])
+        assert np.allclose(scores, expected)
+        print(f'{name:16s} {args.requests / seconds:8.0f} requests/s  '
+              f'p50 {metrics["p50_ms"]:7.2f} ms  p99 {metrics["p99_ms"]:7.2f}'
+              f' ms  {metrics["mean_batch_rows"]:6.1f} rows per model call')
+
+
+if __name__ == '__main__':
+    main()
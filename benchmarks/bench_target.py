@@ -0,0 +1,112 @@
+'''
+Compares the notebook's target construction (drop DPQ100, dropna, mask the
+7 and 9 codes, dropna again, sum and apply) with phq9_target on synthetic
+PHQ-9 answers, then builds the target from a Parquet extract chunk by chunk
+and compares the memory allocated with loading it whole.
+
+    python benchmarks/bench_target.py --rows 1000000 --chunksize 100000
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from project_functions.batch import iter_chunks
+from project_functions.target import PHQ9_ITEMS
+from timing import time_call
+
+# The SAS reader's value for 0
+SAS_ZERO = 5.397605346934028e-79
+
+
+def make_dpq(n_rows, seed=0):
+    '''
+    Synthetic DPQ answers indexed by SEQN, with skipped questionnaires, a few
+    refused and don't know codes and zeros stored the way the SAS reader
+    gives them.
+    '''
+    rng = np.random.default_rng(seed)
+    answers = rng.choice([SAS_ZERO, 1., 2., 3.], p=[.55, .25, .12, .08],
+                         size=(n_rows, len(PHQ9_ITEMS) + 1))
+    codes = rng.random(answers.shape)
+    answers[codes < .01] = 7.
+    answers[codes > .995] = 9.
+    answers[codes > .999] = np.nan
+    answers[rng.random(n_rows) < .08] = np.nan
+    columns = PHQ9_ITEMS + ['DPQ100']
+    return pd.DataFrame(answers, columns=columns,
+                        index=pd.Index(np.arange(n_rows) + 73557,
+                                       name='SEQN'))
+
+
+def notebook_target(df_target):
+    '''
+    The notebook's steps, in order.
+    '''
+    df_target = df_target.drop(columns=['DPQ100'])
+    df_target.dropna(inplace=True)
+    df_target = df_target[(df_target != 7) & (df_target != 9)]
+    df_target.dropna(inplace=True)
+    df_target = df_target.astype('int64')
+    df_target['Total'] = df_target.sum(axis=1)
+    df_target['depression'] = df_target.Total.apply(
+        lambda x: 'Not Depressed' if x<10 else 'Depressed')
+    return pd.DataFrame(df_target['depression'])
+
+
+def peak_mb(func, *args, **kwargs):
+    '''
+    Result of a call and the peak MB allocated during it.
+    '''
+    tracemalloc.start()
+    result = func(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--chunksize', type=int, default=100000)
+    args = parser.parse_args()
+
+    df_target = make_dpq(args.rows)
+    old, old_seconds = time_call(notebook_target, df_target)
+    new, new_seconds = time_call(pf.phq9_target, df_target, labels=True)
+    pd.testing.assert_series_equal(old['depression'], new, check_dtype=False,
+                                   check_categorical=False)
+    print(f'{args.rows} people, {len(new)} with a complete PHQ-9, '
+          f'{(new == "Depressed").mean():.1%} depressed')
+    print(f'notebook steps    {old_seconds:8.2f}s')
+    print(f'phq9_target       {new_seconds:8.2f}s  '
+          f'{old_seconds / new_seconds:6.1f}x')
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'dpq.parquet')
+        df_target.reset_index().to_parquet(path, row_group_size=args.chunksize)
+        del df_target
+
+        def whole():
+            return pf.phq9_target(pd.read_parquet(path))
+
+        def chunked():
+            return pf.phq9_target_chunks(iter_chunks(path, args.chunksize))
+
+        (whole_target, whole_peak), whole_seconds = time_call(peak_mb, whole)
+        (chunk_target, chunk_peak), chunk_seconds = time_call(peak_mb, chunked)
+        pd.testing.assert_series_equal(whole_target, chunk_target)
+    print(f'whole file        {whole_seconds:8.2f}s  {whole_peak:6.0f} MB peak')
+    print(f'chunks of {args.chunksize:<7} {chunk_seconds:8.2f}s  '
+          f'{chunk_peak:6.0f} MB peak')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+'''
+Measures what tracing costs. A cheap traced function is called many times
+with tracing off and on and compared with calling it unwrapped, then a small
+pipeline of crosstabs, profile_frame and cols_tokeep is traced and the
+summary of its trace is printed.
+
+    python benchmarks/bench_tracing.py --calls 200000 --rows 200000
+'''
+
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_functions as pf
+from timing import time_call
+from synthetic import make_component
+
+
+def calls(func, n, value):
+    '''
+    Calls func n times.
+    '''
+    for _ in range(n):
+        func(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+    builtins.display = lambda *objs: None
+
+    # A function that does almost nothing, so the wrapper is all there is
+    # to measure
+    traced = pf.traced(lambda value: value)
+    plain = traced.__wrapped__
+    value = pd.DataFrame({'a': [1]})
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'trace.jsonl')
+        _, plain_seconds = time_call(calls, plain, args.calls, value)
+        _, off_seconds = time_call(calls, traced, args.calls, value)
+        pf.enable_tracing(path)
+        _, on_seconds = time_call(calls, traced, args.calls, value)
+        pf.disable_tracing()
+
+        print(f'{args.calls} calls of an empty function')
+        for name, seconds in [('unwrapped', plain_seconds),
+                              ('tracing off', off_seconds),
+                              ('tracing on', on_seconds)]:
+            print(f'{name:12s} {seconds:8.3f}s  '
+                  f'{1e9 * seconds / args.calls:8.0f} ns per call')
+        os.remove(path)
+
+        # A small pipeline, untraced and traced
+        df = make_component(args.rows, 40)
+        df['depression'] = np.random.default_rng(0).integers(0, 2, args.rows)
+        cols = [col for col in df.columns if col.startswith('VAR')]
+
+        def pipeline():
+            kept = pf.cols_tokeep(df, cols[:20] + ['depression'])
+            pf.profile_frame(kept)
+            pf.crosstabs(kept, cols[:20])
+
+        _, off_seconds = time_call(pipeline)
+        pf.enable_tracing(path)
+        _, on_seconds = time_call(pipeline)
+        pf.disable_tracing()
+
+        print()
+        print(f'pipeline on {args.rows} rows')
+        print(f'tracing off  {off_seconds:8.3f}s')
+        print(f'tracing on   {on_seconds:8.3f}s')
+        print()
+        print(pf.trace_summary(path).round(4).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+Compares tuning a logistic regression with GridSearchCV, like the notebooks
+do, against successive_halving, then runs the search again with more
+candidates to show the cached folds being reused. The best model of each
+search is scored on a held out test set with F2.
+
+    python benchmarks/bench_tuning.py --rows 60000 --features 40 --n-jobs 1
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import warnings
+import numpy as np
+import sklearn.metrics as metrics
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project_functions.tuning import f2_scorer, successive_halving
+from timing import time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=60000)
+    parser.add_argument('--features', type=int, default=40)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    X, y = make_classification(args.rows, args.features, n_informative=12,
+                               weights=[.85], flip_y=.05, random_state=0)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=.2, random_state=123, stratify=y)
+
+    model = LogisticRegression(class_weight='balanced', max_iter=500,
+                               random_state=123)
+    params = {'solver': ['lbfgs', 'liblinear', 'newton-cg'],
+              'C': [float(C) for C in np.logspace(-4, 2, 8)]}
+    more_params = {'solver': ['lbfgs', 'liblinear', 'newton-cg'],
+                   'C': [float(C) for C in np.logspace(-4, 2, 8)]
+                         + [.3, 3, 30]}
+
+    def grid_search():
+        grid = GridSearchCV(model, params, scoring=f2_scorer, cv=3,
+                            n_jobs=args.n_jobs)
+        return grid.fit(X_train, y_train)
+
+    def test_f2(fitted):
+        return metrics.fbeta_score(y_test, fitted.predict(X_test), beta=2)
+
+    grid, grid_seconds = time_call(grid_search)
+    n_grid = len(grid.cv_results_['params'])
+    rows = [('GridSearchCV', grid_seconds, 3 * n_grid, 0,
+             grid.best_params_, test_f2(grid.best_estimator_))]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for title, grid_params in [('halving, cold cache', params),
+                                   ('halving, rerun', params),
+                                   ('halving, 9 more', more_params)]:
+            search, seconds = time_call(successive_halving, model,
+                                        grid_params, X_train, y_train,
+                                        cache_dir=cache_dir,
+                                        n_jobs=args.n_jobs)
+            rows.append((title, seconds, search['fits'], search['cached'],
+                         search['best_params'],
+                         test_f2(search['best_model'])))
+        print(search['history'].groupby('round')
+              .agg(candidates=('params', 'size'), rows=('rows', 'first'),
+                   best_score=('mean_score', 'max')).to_string())
+        print()
+
+    print(f'{len(y_train)} training rows x {args.features} features')
+    print(f'{"":20} {"seconds":>8} {"fits":>5} {"cached":>6} {"test F2":>8}  '
+          f'best params')
+    for title, seconds, fits, cached, best, f2 in rows:
+        best = {key: round(value, 4) if isinstance(value, float) else value
+                for key, value in best.items()}
+        print(f'{title:20} {seconds:8.2f} {fits:5} {cached:6} {f2:8.4f}  '
+              f'{best}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,470 @@
+'''
+Synthetic NHANES style data for the benchmarks. The real survey files are not
+kept in the repository, so these functions write look-alike SAS transport
+(.XPT) files that pd.read_sas and the project functions can read.'''
+
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+
+# Fixed 80 byte header records of the SAS transport format
+LIBRARY_HEADER = ('HEADER RECORD*******LIBRARY HEADER RECORD!!!!!!!'
+                  '000000000000000000000000000000  ')
+MEMBER_HEADER = ('HEADER RECORD*******MEMBER  HEADER RECORD!!!!!!!'
+                 '000000000000000001600000000140  ')
+DESCRIPTOR_HEADER = ('HEADER RECORD*******DSCRPTR HEADER RECORD!!!!!!!'
+                     '000000000000000000000000000000  ')
+OBS_HEADER = ('HEADER RECORD*******OBS     HEADER RECORD!!!!!!!'
+              '000000000000000000000000000000  ')
+SAS_DATE = '01JAN20:00:00:00'
+
+
+def _pad(text, length):
+    '''
+    Pads or cuts a string to an exact length and encodes it.
+    '''
+    return text[:length].ljust(length).encode('ascii')
+
+
+def _ibm_float(values):
+    '''
+    Converts an array of floats into the 8 byte IBM mainframe floats that the
+    SAS transport format stores, with nulls written as the SAS missing value.
+    '''
+    values = np.asarray(values, dtype='float64')
+    missing = np.isnan(values)
+    sign = np.signbit(values).astype('uint64')
+    mantissa, exponent = np.frexp(np.abs(np.where(missing, 0, values)))
+
+    # IBM floats use a base 16 exponent with the fraction shifted to match
+    hex_exponent = -((-exponent) // 4)
+    shift = 4 * hex_exponent - exponent
+    fraction = np.ldexp(mantissa, 56 - shift).astype('uint64')
+
+    ibm = ((sign << np.uint64(63))
+           | ((hex_exponent + 64).astype('uint64') << np.uint64(56))
+           | fraction)
+    ibm[values == 0] = 0
+    ibm[missing] = np.uint64(0x2e) << np.uint64(56)
+    return ibm.astype('>u8')
+
+
+def write_xpt(df, file, name='DATA'):
+    '''
+    Writes a DataFrame to a SAS transport (.XPT) file. Numeric columns are
+    stored as 8 byte floats and all other columns as fixed width text.
+
+    Args:
+        df (DataFrame): Data to write, the index is not written.
+        file (str): Location of the file to write.
+        name (str): Name of the SAS dataset inside the file.
+
+    Returns:
+        The location of the written file.
+
+    Example:
+        write_xpt(demo_df, r'Data/Demographics/DEMO_A.XPT')
+    '''
+
+    # Working out the type and width of every column
+    fields = []
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            fields.append((col, 1, 8, None))
+        else:
+            text = df[col].map(lambda x: x if isinstance(x, bytes)
+                               else str(x).encode('ascii'))
+            width = max(1, int(text.map(len).max() if len(text) else 1))
+            fields.append((col, 2, width, text))
+
+    with open(file, 'wb') as f:
+        f.write(LIBRARY_HEADER.encode('ascii'))
+        f.write(_pad('SAS     SAS     SASLIB  6.06    bsd4.2' + ' ' * 26
+                     + SAS_DATE, 80))
+        f.write(_pad(SAS_DATE, 80))
+        f.write(MEMBER_HEADER.encode('ascii'))
+        f.write(DESCRIPTOR_HEADER.encode('ascii'))
+        f.write(_pad('SAS     ' + name.ljust(8)[:8] + 'SASDATA 6.06    '
+                     'bsd4.2  ' + ' ' * 24 + SAS_DATE, 80))
+        f.write(_pad(SAS_DATE, 80))
+        f.write(_pad('HEADER RECORD*******NAMESTR HEADER RECORD!!!!!!!000000'
+                     f'{len(fields):04d}00000000000000000000', 80))
+
+        # One 140 byte description per column, padded to whole records
+        namestrs = b''
+        position = 0
+        for number, (col, ntype, width, _) in enumerate(fields, start=1):
+            namestrs += struct.pack('>hhhh8s40s8shhh2s8shhl52s', ntype, 0,
+                                    width, number, _pad(col, 8), _pad(col, 40),
+                                    _pad('', 8), 0, 0, 0, b'  ', _pad('', 8),
+                                    0, 0, position, b'\x00' * 52)
+            position += width
+        f.write(namestrs.ljust(-(-len(namestrs) // 80) * 80, b' '))
+        f.write(OBS_HEADER.encode('ascii'))
+
+        # Writing every row as one fixed width record
+        record = np.dtype([(f's{i}', f'S{width}')
+                           for i, (_, _, width, _) in enumerate(fields)])
+        data = np.zeros(len(df), dtype=record)
+        for i, (col, ntype, width, text) in enumerate(fields):
+            if ntype == 1:
+                data[f's{i}'] = _ibm_float(df[col]).view('S8')
+            else:
+                data[f's{i}'] = text.map(lambda x: x.ljust(width)).to_numpy()
+        body = data.tobytes()
+        f.write(body.ljust(-(-len(body) // 80) * 80, b' '))
+    return file
+
+
+def make_component(n_rows, n_cols, seqn_start=0, prefix='VAR', seed=0):
+    '''
+    Generates a synthetic survey component with a SEQN column followed by
+    numeric columns that look like NHANES answers: mostly small whole number
+    codes, some refused/don't know codes, some nulls, and a few lab style
+    columns with decimals.
+
+    Args:
+        n_rows (int): Number of people in the component.
+        n_cols (int): Number of columns besides SEQN.
+        seqn_start (int): First SEQN number, so cycles do not overlap.
+        prefix (str): Start of each column name.
+        seed (int): Seed for the random numbers.
+
+    Returns:
+        DataFrame of the component.
+
+    Example:
+        demo_df = make_component(10000, 40, prefix='DMD')
+    '''
+
+    rng = np.random.default_rng(seed)
+    data = {'SEQN': np.arange(seqn_start, seqn_start + n_rows,
+                              dtype='float64')}
+    for i in range(n_cols):
+        if i % 5 == 4:
+            col = rng.normal(100, 15, n_rows).round(2)
+        else:
+            col = rng.choice([1.0, 2.0, 3.0, 7.0, 9.0], n_rows,
+                             p=[.45, .35, .14, .03, .03])
+        col[rng.random(n_rows) < .1] = np.nan
+        data[f'{prefix}{i:03d}'] = col
+    return pd.DataFrame(data)
+
+
+def make_xpt_corpus(folder, n_cycles=8, rows_per_cycle=10000, n_cols=60,
+                    prefix='VAR', seed=0):
+    '''
+    Writes one synthetic .XPT file per survey cycle into a folder, like the
+    folders that glob_concat reads for each NHANES component.
+
+    Args:
+        folder (str): Folder to write the files into, created if needed.
+        n_cycles (int): Number of survey cycle files.
+        rows_per_cycle (int): Number of people in each cycle.
+        n_cols (int): Number of columns besides SEQN.
+        prefix (str): Start of each column name.
+        seed (int): Seed for the random numbers.
+
+    Returns:
+        List of the written file locations.
+
+    Example:
+        files = make_xpt_corpus(r'bench_data/Demographics', n_cycles=10)
+    '''
+
+    os.makedirs(folder, exist_ok=True)
+    files = []
+    for cycle in range(n_cycles):
+        df = make_component(rows_per_cycle, n_cols,
+                            seqn_start=cycle * rows_per_cycle, prefix=prefix,
+                            seed=seed + cycle)
+        file = os.path.join(folder, f'{prefix}_{cycle:02d}.XPT')
+        files.append(write_xpt(df, file, name=f'{prefix}_{cycle:02d}'))
+    return files
+
+
+def make_dashboard_data(n_rows, seed=0):
+    '''
+    Generates a table shaped like the dashboard's StreamlitData.csv, with the
+    columns from Dashboard/dashboard_data.py: a Depression label, text
+    answers for the categorical columns, decimals for the numerical columns
+    and a flag and days prescribed for every prescription.
+
+    Args:
+        n_rows (int): Number of people.
+        seed (int): Seed for the random numbers.
+
+    Returns:
+        DataFrame of the dashboard data.
+
+    Example:
+        df = make_dashboard_data(40000)
+    '''
+    from dashboard_data import num_cols, cat_cols, Rx_cols
+
+    rng = np.random.default_rng(seed)
+    answers = np.array(['Yes', 'No', 'Missing', 'Refused', 'Dont Know'])
+    data = {'Depression': np.where(rng.random(n_rows) < .09, 'Depressed',
+                                   'Not Depressed')}
+    for col in cat_cols:
+        data[col] = answers[rng.choice(5, n_rows, p=[.3, .5, .1, .05, .05])]
+    for col in num_cols:
+        values = rng.normal(100, 25, n_rows).round(1)
+        values[rng.random(n_rows) < .2] = np.nan
+        data[col] = values
+    for col in Rx_cols:
+        taking = rng.random(n_rows) < .03
+        data[f'Rx {col}'] = taking.astype('int64')
+        data[f'Rx Days {col}'] = np.where(
+            taking, rng.integers(1, 5000, n_rows), 0).astype('float64')
+    return pd.DataFrame(data)
+
+
+def make_full_data(n_rows, n_cat=12, n_num=30, n_rx=20, seed=0):
+    '''
+    Generates a table shaped like FullData.csv from the cleaning notebook:
+    a SEQN index, text answer columns, numerical columns, an 'Rx_' and
+    'Rx_days_' column for each medication and the 'depression' target.
+    Depression is more likely with some of the answers and values so models
+    have something to learn.
+
+    Args:
+        n_rows (int): Number of people.
+        n_cat (int): Number of text columns.
+        n_num (int): Number of numerical columns.
+        n_rx (int): Number of medications.
+        seed (int): Seed for the random numbers.
+
+    Returns:
+        DataFrame of the data, indexed by SEQN.
+
+    Example:
+        full_df = make_full_data(20000)
+    '''
+    rng = np.random.default_rng(seed)
+    answers = np.array(['Yes', 'No', 'Missing', 'Refused'])
+    data = {}
+    risk = np.zeros(n_rows)
+    for i in range(n_cat):
+        codes = rng.choice(4, n_rows, p=[.3, .55, .1, .05])
+        data[f'cat_{i:02d}'] = answers[codes].astype(object)
+        risk += (codes == 0) * rng.normal(0, .6)
+    for i in range(n_num):
+        values = rng.normal(0, 1, n_rows)
+        data[f'num_{i:02d}'] = (values * 15 + 100).round(1)
+        risk += values * rng.normal(0, .3)
+    for i in range(n_rx):
+        taking = rng.random(n_rows) < .05
+        data[f'Rx_med_{i:02d}'] = taking.astype('int64')
+        data[f'Rx_days_med_{i:02d}'] = np.where(
+            taking, rng.integers(1, 5000, n_rows), 0).astype('float64')
+        risk += taking * rng.normal(.3, .3)
+
+    # About one in ten people is depressed, like the survey
+    risk += rng.logistic(0, 1, n_rows)
+    depressed = risk > np.quantile(risk, .9)
+    data['depression'] = np.where(depressed, 'Depressed', 'Not Depressed')
+    return pd.DataFrame(data, index=pd.RangeIndex(1, n_rows + 1, name='SEQN'))
+
+
+# Medications of the prescriptions component, the notebook's meds_tokeep
+# first and then others nobody keeps a column for
+MEDS = ['LISINOPRIL', 'METFORMIN', 'ALBUTEROL', 'LEVOTHYROXINE',
+        'SIMVASTATIN', 'ATORVASTATIN', 'METOPROLOL', 'AMLODIPINE',
+        'OMEPRAZOLE', 'HYDROCHLOROTHIAZIDE', 'FUROSEMIDE', 'ATENOLOL',
+        'LOSARTAN', 'MONTELUKAST', 'AMOXICILLIN',
+        'ACETAMINOPHEN; HYDROCODONE', 'GABAPENTIN', 'POTASSIUM CHLORIDE',
+        'GLIPIZIDE', 'IBUPROFEN', 'RANITIDINE', 'CLOPIDOGREL']
+OTHER_MEDS = [f'OTHER DRUG {i:03d}' for i in range(200)]
+
+# Folder and file prefix of each component written by write_nhanes, like
+# the notebook's Data folder
+NHANES_FILES = {'demographics': ('Demographics', 'DEMO'),
+                'conditions': ('Conditions', 'MCQ'),
+                'labs': ('Labs', 'LAB'),
+                'prescriptions': ('PrescriptionMedications', 'RXQ_RX'),
+                'target': ('Target', 'DPQ')}
+
+# Condition questions answered 1 (yes) or 2 (no)
+CONDITION_COLS = ['MCQ010', 'MCQ053', 'MCQ080', 'MCQ160A', 'MCQ160B',
+                  'MCQ160C', 'MCQ160D', 'MCQ160E', 'MCQ160F', 'MCQ160G',
+                  'MCQ160K', 'MCQ160L', 'MCQ160M']
+
+# Mean and standard deviation of each lab measurement
+LAB_COLS = {'LBXTC': (190, 40), 'LBDHDD': (53, 15), 'LBXTR': (130, 70),
+            'LBDLDL': (110, 35), 'LBXSGL': (100, 25), 'LBXSCR': (.9, .25),
+            'LBXSAL': (4.2, .35), 'LBXSUA': (5.4, 1.4),
+            'LBXWBCSI': (7.2, 2.), 'LBXHGB': (14., 1.5),
+            'LBXPLTSI': (245, 60)}
+
+
+def _answers(rng, codes, p, n_rows, skipped=0.):
+    '''
+    Survey answer codes picked with the given chances, with a share of nulls
+    for questions that were not asked.
+    '''
+    values = np.asarray(codes, dtype='float64')[rng.choice(len(codes), n_rows,
+                                                           p=p)]
+    values[rng.random(n_rows) < skipped] = np.nan
+    return values
+
+
+def make_nhanes(n_patients, seqn_start=0, seed=0):
+    '''
+    Generates the components of one survey cycle with the columns and answer
+    codes of the real NHANES files: demographics, medical conditions, lab
+    results, the long prescriptions table with a row per prescription and
+    the PHQ-9 questionnaire. One hidden risk per person raises the chance of
+    depression, of some conditions, of glucose and of prescriptions, so
+    models trained on the joined data have something to learn.
+
+    Args:
+        n_patients (int): Number of people in the cycle.
+        seqn_start (int): Number of SEQN numbers used by earlier cycles, so
+            cycles do not overlap.
+        seed (int): Seed for the random numbers.
+
+    Returns:
+        Dictionary of component name to DataFrame with a SEQN column, named
+        like the keys of NHANES_FILES.
+
+    Example:
+        components = make_nhanes(10000)
+        components['prescriptions'].head()
+    '''
+    rng = np.random.default_rng(seed)
+    n = n_patients
+    # SEQN numbers start at 1 like the survey's
+    seqn = np.arange(seqn_start + 1, seqn_start + n + 1, dtype='float64')
+    risk = rng.normal(0, 1, n)
+
+    # Demographics, with pregnancy only asked of women
+    gender = _answers(rng, [1, 2], [.49, .51], n)
+    risk += (gender == 2) * .3
+    demo = pd.DataFrame({
+        'SEQN': seqn,
+        'RIAGENDR': gender,
+        'RIDAGEYR': rng.integers(18, 81, n).astype('float64'),
+        'RIDRETH1': _answers(rng, [1, 2, 3, 4, 5], [.17, .1, .4, .22, .11],
+                             n),
+        'DMDCITZN': _answers(rng, [1, 2, 7, 9], [.88, .11, .005, .005], n,
+                             .001),
+        'DMDEDUC2': _answers(rng, [1, 2, 3, 4, 5, 7, 9],
+                             [.1, .12, .23, .3, .24, .005, .005], n, .02),
+        'DMDMARTL': _answers(rng, [1, 2, 3, 4, 5, 6, 77, 99],
+                             [.5, .07, .1, .03, .18, .11, .005, .005], n,
+                             .02),
+        'DMDHHSIZ': rng.integers(1, 8, n).astype('float64'),
+        'INDHHIN2': _answers(rng, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 13, 14,
+                                   15, 77, 99],
+                             [.03, .04, .06, .07, .07, .1, .08, .07, .05,
+                              .05, .04, .02, .1, .19, .015, .015], n, .03),
+        'DMQMILIZ': _answers(rng, [1, 2, 7, 9], [.08, .91, .005, .005], n)})
+    pregnant = _answers(rng, [1, 2, 3], [.03, .9, .07], n)
+    demo['RIDEXPRG'] = np.where(gender == 2, pregnant, np.nan)
+
+    # Conditions, more likely with a higher risk, and up to three cancer
+    # types for people who had cancer
+    conditions = {'SEQN': seqn}
+    for col in CONDITION_COLS + ['MCQ220']:
+        yes = rng.random(n) < 1 / (1 + np.exp(2.4 - .5 * risk))
+        values = np.where(yes, 1., 2.)
+        values[rng.random(n) < .01] = 7.
+        values[rng.random(n) < .04] = np.nan
+        conditions[col] = values
+    cancer = conditions['MCQ220'] == 1
+    for i, col in enumerate(['MCQ230A', 'MCQ230B', 'MCQ230C']):
+        has_type = cancer & (rng.random(n) < [1, .15, .03][i])
+        conditions[col] = np.where(has_type, rng.integers(10, 40, n), np.nan)
+    conditions = pd.DataFrame(conditions)
+
+    # Lab results, missing for people who skipped the exam
+    labs = {'SEQN': seqn}
+    examined = rng.random(n) >= .08
+    for col, (mean, std) in LAB_COLS.items():
+        values = np.abs(rng.normal(mean, std, n)).round(2)
+        if col == 'LBXSGL':
+            values = (values + 6 * risk).round(2)
+        labs[col] = np.where(examined, values, np.nan)
+    labs = pd.DataFrame(labs)
+
+    # One row per prescription, and one row with no drug for people who
+    # take nothing, like RXQ_RX
+    n_scripts = rng.poisson(np.exp(.1 + .25 * risk))
+    rows = np.maximum(n_scripts, 1)
+    person = np.repeat(np.arange(n), rows)
+    taking = np.repeat(n_scripts > 0, rows)
+    names = np.array(MEDS + OTHER_MEDS, dtype=object)
+    weights = np.r_[np.full(len(MEDS), 3.), np.ones(len(OTHER_MEDS))]
+    drugs = names[rng.choice(len(names), len(person),
+                             p=weights / weights.sum())]
+    days = rng.integers(1, 7300, len(person)).astype('float64')
+    days[rng.random(len(person)) < .01] = 99999.
+    prescriptions = pd.DataFrame({
+        'SEQN': seqn[person],
+        'RXDUSE': np.where(taking, 1., 2.),
+        'RXDDRUG': np.where(taking, drugs, ''),
+        'RXDDAYS': np.where(taking, days, np.nan),
+        'RXDCOUNT': np.where(taking, np.repeat(n_scripts, rows), np.nan)})
+
+    # The PHQ-9 answers from 0 to 3, with about one in ten people scoring
+    # 10 or more, a few refused answers and people who skipped the
+    # questionnaire
+    target = {'SEQN': seqn}
+    mood = risk + rng.normal(0, 1, n)
+    for col in ['DPQ010', 'DPQ020', 'DPQ030', 'DPQ040', 'DPQ050', 'DPQ060',
+                'DPQ070', 'DPQ080', 'DPQ090', 'DPQ100']:
+        answer = np.clip(np.floor(.5 * mood + rng.normal(.4, .9, n)), 0, 3)
+        refused = rng.random(n) < .005
+        answer[refused] = rng.choice([7., 9.], refused.sum())
+        target[col] = answer
+    target = pd.DataFrame(target)
+    target.loc[rng.random(n) < .08, target.columns[1:]] = np.nan
+
+    return {'demographics': demo, 'conditions': conditions, 'labs': labs,
+            'prescriptions': prescriptions, 'target': target}
+
+
+def write_nhanes(folder, n_patients, n_cycles=4, file_format='xpt', seed=0):
+    '''
+    Writes a synthetic NHANES corpus, one file per survey cycle for every
+    component in its own folder like the notebook's Data folder.
+
+    Args:
+        folder (str): Folder to write the component folders into.
+        n_patients (int): Number of people across all cycles.
+        n_cycles (int): Number of survey cycles the people are split into.
+        file_format (str): 'xpt' for SAS transport files or 'csv'.
+        seed (int): Seed for the random numbers.
+
+    Returns:
+        Dictionary of component name to the list of its written files.
+
+    Example:
+        files = write_nhanes(r'bench_data', 100000)
+        demo_df = pf.glob_concat(r'bench_data/Demographics', '*.XPT')
+    '''
+    if file_format not in ('xpt', 'csv'):
+        raise ValueError("file_format must be 'xpt' or 'csv'")
+
+    files = {name: [] for name in NHANES_FILES}
+    per_cycle = -(-n_patients // n_cycles)
+    for cycle in range(n_cycles):
+        start = cycle * per_cycle
+        size = min(per_cycle, n_patients - start)
+        if size <= 0:
+            break
+        components = make_nhanes(size, seqn_start=start, seed=seed + cycle)
+        for name, df in components.items():
+            subfolder, prefix = NHANES_FILES[name]
+            os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+            stem = os.path.join(folder, subfolder, f'{prefix}_{cycle:02d}')
+            if file_format == 'xpt':
+                files[name].append(write_xpt(df, f'{stem}.XPT',
+                                             name=f'{prefix[:5]}_{cycle:02d}'))
+            else:
+                df.to_csv(f'{stem}.csv', index=False)
+                files[name].append(f'{stem}.csv')
+    return files
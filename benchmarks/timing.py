@@ -0,0 +1,47 @@
+'''
+Small timing and memory helpers shared by the benchmarks.'''
+
+import os
+import time
+
+
+def time_call(func, *args, **kwargs):
+    '''
+    Runs a function once and returns its result and the seconds it took.
+    '''
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def rss_mb():
+    '''
+    Current resident memory of this process in MB, from psutil when it is
+    installed and from /proc otherwise. Returns nan when neither is there.
+    '''
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        return float('nan')
+
+
+def peak_rss_mb(children=False):
+    '''
+    Highest resident memory reached so far in MB, by this process or, with
+    children=True, by the largest of its finished child processes. Returns
+    nan where the resource module is not available.
+    '''
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1e3
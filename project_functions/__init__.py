@@ -4,12 +4,45 @@ Functions written for use in this project to predict patient depression based on
     -viviennedifrancesco@gmail.com'''
 
 import glob, os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
 import pandas as pd 
+from scipy import sparse
 import matplotlib.pyplot as plt 
 import seaborn as sns
 import sklearn.metrics as metrics
-
-def glob_concat(path, file_str):
+from project_functions.ingest import read_xpt, read_xpt_files, downcast_frame
+from project_functions.cache import invalidate_cache, evict_cache
+from project_functions.incremental import ingest_component, load_component
+from project_functions.recode import (recode_column, apply_recodes, 
+                                      memory_report)
+from project_functions.join import join_components
+from project_functions.headless import (counts_figure, percentages_figure, 
+                                        num_cols_figure, save_figure, 
+                                        save_feature_plots)
+from project_functions.scoring import (make_pipeline, fit_pipeline, 
+                                       feature_names, check_schema, 
+                                       transform_features, score_frame)
+from project_functions.artifact import save_artifact, load_artifact
+from project_functions.batch import score_file
+from project_functions.tuning import (f2_scorer, data_fingerprint, 
+                                      successive_halving)
+from project_functions.resampling import undersample, oversample, resample
+from project_functions.target import (phq9_target, phq9_target_chunks, 
+                                      target_from_files)
+from project_functions.profiling import profile_column, profile_frame
+from project_functions.crosstab import (crosstab, crosstabs, save_crosstabs, 
+                                        load_crosstabs, table_counts, 
+                                        table_percentages)
+from project_functions.tracing import (traced, trace_package, enable_tracing, 
+                                       disable_tracing, trace_stage, 
+                                       trace_summary)
+
+def glob_concat(path, file_str, columns=None, downcast=False, n_jobs=1, 
+                cache_dir=None, max_cache_bytes=None):
     '''
     Looks for files in folder path and combines them into a DataFrame.
     Also sets the index to be the SEQN column.
@@ -17,6 +50,15 @@ def glob_concat(path, file_str):
     Args:
         path (str): Location on computer where files are located.
         file_str (str): Specific search query of which files to find.
+        columns (list): Only these columns are kept from the files, SEQN is
+            always kept. All columns are kept when None.
+        downcast (boolean): Whether to downcast numeric columns while loading.
+        n_jobs (int): Number of processes to read the files with, -1 uses 
+            every core.
+        cache_dir (str): Folder to cache the decoded files in so later calls
+            skip parsing them, no cache when None.
+        max_cache_bytes (int): Size limit of the cache, the least recently 
+            used files are removed past it. No limit when None.
         
     Returns:
         Displays the files that were found for verification and returns the 
@@ -24,6 +66,9 @@ def glob_concat(path, file_str):
     
     Example:
         combined_df = glob_concat(r'File/File', '*.XPT')
+        demo_df = glob_concat(r'Data/Demographics', '*.XPT', 
+                              columns=demo_tokeep, n_jobs=-1, 
+                              cache_dir='.xpt_cache')
     '''
     
     # Find the files in the folders
@@ -32,8 +77,14 @@ def glob_concat(path, file_str):
     # Print the files for verification when running the function
     display(files)
 
+    # The index needs SEQN even when it is not in the columns to keep
+    if columns is not None:
+        columns = ['SEQN'] + [col for col in columns if col != 'SEQN']
+
     # Combining all the files into a DataFrame
-    df_files = [pd.read_sas(file) for file in files]
+    df_files = read_xpt_files(files, columns=columns, downcast=downcast, 
+                              n_jobs=n_jobs, cache_dir=cache_dir, 
+                              max_cache_bytes=max_cache_bytes)
     combined_df = pd.concat(df_files)
 
     # Setting the index of the new DataFrame
@@ -59,14 +110,20 @@ def val_counts(df):
         print('--------------------------------------')
 
 
-def cols_tokeep(df, col_list):
+def cols_tokeep(df, col_list, copy=True):
     '''
-    Makes a copy of the passed in DataFrame and drops all columns except those
-    specified in a list.
+    Makes a new DataFrame with only the columns specified in a list. The 
+    columns are picked out in a single pass and keep the order they have in 
+    the passed in DataFrame. Requested columns that are not in the DataFrame 
+    are skipped with a warning.
     
     Args:
         df(DataFrame): DataFrame to take specific columns from.
         col_list(list): List of columns in the DataFrame to be kept.
+        copy(boolean): When False and the kept columns sit next to each other,
+            they are sliced out without copying them upfront. Changes to the
+            result never reach the original DataFrame under pandas' 
+            Copy-on-Write, older pandas versions may pass them through.
     
     Returns:
         New DataFrame that has only the columns specified from the col_list.
@@ -74,13 +131,23 @@ def cols_tokeep(df, col_list):
     Example:
         new_df = cols_tokeep(old_df, columns_list)
     '''
-    df_copy = df.copy()
-    for col in df_copy.columns:
-        if col not in col_list:
-            df_copy.drop(columns=[col], inplace=True)
-        else:
-            pass
-    return df_copy
+
+    # Warning about requested columns that are not in the DataFrame, at the
+    # caller's line past the tracing wrapper trace_package puts around this
+    missing = [col for col in col_list if col not in df.columns]
+    if missing:
+        warnings.warn(f'Columns not found in the DataFrame: {missing}', 
+                      stacklevel=3)
+
+    # Finding the positions of the columns to keep in the original order
+    keep = set(col_list)
+    positions = [i for i, col in enumerate(df.columns) if col in keep]
+
+    # A slice of neighbouring columns is taken without an upfront copy
+    if (not copy and positions and 
+            positions[-1] - positions[0] + 1 == len(positions)):
+        return df.iloc[:, positions[0]:positions[-1] + 1]
+    return df.take(positions, axis=1)
 
 
 def first_cancer_count(x):
@@ -149,31 +216,141 @@ def third_cancer_count(x):
         return 0
 
 
-def plotting_counts(df, col, target='depression'):
+def cancer_counts(df, cols=None, none_value='None'):
+    '''
+    Creates the count column for every cancer type column at once, in place of
+    applying first_cancer_count, second_cancer_count and third_cancer_count
+    row by row. Works for any number of cancer type columns.
+    
+    Args:
+        df(DataFrame): DataFrame with the cancer type columns.
+        cols(list): Cancer type columns to count, defaults to every column 
+            ending in '_cancer_type'.
+        none_value(str): Value that means no cancer was recorded.
+        
+    Returns:
+        DataFrame with the same index and a '_cancer_count' column for each 
+        cancer type column, 1 if a cancer is recorded and 0 if it is not.
+    
+    Example:
+        counts = cancer_counts(medcond_clean)
+        medcond_clean[counts.columns] = counts
+    '''
+
+    if cols is None:
+        cols = [col for col in df.columns if col.endswith('_cancer_type')]
+
+    # Comparing whole columns at a time instead of looping over the rows
+    counts = {}
+    for col in cols:
+        name = col[:-len('_type')] if col.endswith('_type') else col
+        counts[name + '_count'] = (df[col] != none_value).astype('int64')
+    return pd.DataFrame(counts, index=df.index)
+
+
+def rx_features(scripts, meds, drug_col='RXDDRUG', days_col='RXDDAYS', 
+                seqn_col='SEQN', sparse_output=True):
+    '''
+    Turns the long prescription table, with one row per prescription, into 
+    one row per person with an 'Rx_' column that is 1 if the person takes a 
+    medication and an 'Rx_days_' column with the average number of days they 
+    have taken it. Every medication is counted in one grouped pass instead of
+    a loop of .apply calls per medication.
+    
+    Args:
+        scripts (DataFrame): Prescription table indexed by SEQN, or with a 
+            SEQN column, and the drug and days columns.
+        meds (list): Medications to create columns for, as they are written
+            in the drug column.
+        drug_col (str): Column with the drug names, bytes are decoded.
+        days_col (str): Column with the number of days the drug was taken.
+        seqn_col (str): Column with the SEQN if it is not the index.
+        sparse_output (boolean): Whether the columns are pandas sparse 
+            columns, which keeps the mostly zero columns small.
+        
+    Returns:
+        DataFrame indexed by SEQN with the 'Rx_' and 'Rx_days_' column for 
+        each medication next to each other.
+    
+    Example:
+        rx_df = rx_features(scripts_clean, meds_tokeep)
+        rx_matrix = rx_df.sparse.to_coo()
+    '''
+
+    if seqn_col in scripts.columns:
+        seqn = scripts[seqn_col]
+    else:
+        seqn = scripts.index
+    seqn_codes, seqn_values = pd.factorize(seqn, sort=True)
+
+    # Decoding the drug names if they are still bytes from the SAS file
+    drugs = scripts[drug_col]
+    if len(drugs) and isinstance(drugs.iloc[0], bytes):
+        drugs = drugs.str.decode('utf-8')
+    med_codes = pd.Categorical(drugs, categories=meds).codes
+
+    # Unknown and refused day codes count as 0 days like in the notebook
+    days = scripts[days_col].replace({99999: 0, 77777: 0}).fillna(0)
+    days = days.to_numpy(dtype='float64')
+
+    # Grouping the prescriptions by person and medication in one pass
+    rows = med_codes >= 0
+    keys = seqn_codes[rows].astype('int64') * len(meds) + med_codes[rows]
+    keys, group = np.unique(keys, return_inverse=True)
+    counts = np.bincount(group)
+    avg_days = np.bincount(group, weights=days[rows]) / counts
+
+    # Placing each medication's columns next to each other
+    people, med = np.divmod(keys, len(meds))
+    matrix = sparse.coo_matrix(
+        (np.concatenate([np.ones(len(keys)), avg_days]),
+         (np.concatenate([people, people]), 
+          np.concatenate([2 * med, 2 * med + 1]))),
+        shape=(len(seqn_values), 2 * len(meds))).tocsc()
+
+    names = []
+    for med in meds:
+        names += [f'Rx_{med}', f'Rx_days_{med}']
+    columns = {name: pd.arrays.SparseArray.from_spmatrix(matrix[:, [i]]) 
+               for i, name in enumerate(names)}
+    rx_df = pd.DataFrame(columns, index=pd.Index(seqn_values, name='SEQN'))
+    if not sparse_output:
+        rx_df = rx_df.sparse.to_dense()
+    return rx_df
+
+
+def plotting_counts(df, col, target='depression', table=None):
     '''
     Generates countplot on a column in a dataframe.
     
     Args:
         df (dataframe): Dataframe that contains the column and target to be 
-        plotted
+        plotted, not used when a table is passed in
         col (str): Column name of the data to be plotted against the target
         target (str): Target column of the dataframe
+        table (dataframe): Counts of the column against the target from 
+            crosstabs, which are drawn instead of counting the dataframe
         
     Returns:
         Count plot figure with bars grouped by the target
     
     Example:
         plotting_counts(data, 'feature_name')
+        plotting_counts(None, 'feature_name', table=tables['feature_name'])
     '''
 
-    # Sort the column values for plotting
-    order_list = list(df[col].unique())
-    order_list.sort()
-    
     # Plot the figure
     fig, ax = plt.subplots(figsize=(16,8))
     x, y = col, target
-    ax = sns.countplot(x=x, hue=y, data=df, order=order_list)
+    if table is None:
+        # Sort the column values for plotting
+        order_list = list(df[col].unique())
+        order_list.sort()
+        ax = sns.countplot(x=x, hue=y, data=df, order=order_list)
+    else:
+        # The table is already sorted and counted
+        ax = sns.barplot(x=x, y='count', hue=y, data=table_counts(table), 
+                         order=list(table.index))
 
     # Set labels and title
     plt.title(f'{col.title()} By Count {target.title()}', 
@@ -184,16 +361,19 @@ def plotting_counts(df, col, target='depression'):
     return fig, ax
 
 
-def plotting_percentages(df, col, target='depression'):
+def plotting_percentages(df, col, target='depression', table=None):
     '''
     Generates catplot on a column in a dataframe that shows percentages at the
     top of each bar.
     
     Args:
         df (dataframe): Dataframe that contains the column and target to be 
-        plotted
+        plotted, not used when a table is passed in
         col (str): Column name of the data to be plotted against the target
         target (str): Target column of the dataframe
+        table (dataframe): Counts of the column against the target from 
+            crosstabs, which the percentages are taken from instead of 
+            grouping the dataframe
         
     Returns:
         Catplot figure with bars grouped by the target and representing
@@ -201,17 +381,24 @@ def plotting_percentages(df, col, target='depression'):
     
     Example:
         plotting_percentages(data, 'feature_name')
+        plotting_percentages(None, 'feature_name', 
+                             table=tables['feature_name'])
     '''
     
     x, y = col, target
     
-    # Temporary dataframe with percentage values
-    temp_df = df.groupby(x)[y].value_counts(normalize=True)
-    temp_df = temp_df.mul(100).rename('percent').reset_index()
+    if table is None:
+        # Temporary dataframe with percentage values
+        temp_df = df.groupby(x)[y].value_counts(normalize=True)
+        temp_df = temp_df.mul(100).rename('percent').reset_index()
 
-    # Sort the column values for plotting    
-    order_list = list(df[col].unique())
-    order_list.sort()
+        # Sort the column values for plotting    
+        order_list = list(df[col].unique())
+        order_list.sort()
+    else:
+        # The table is already sorted and counted
+        temp_df = table_percentages(table)
+        order_list = list(table.index)
 
     # Plot the figure
     sns.set(font_scale=1.5)
@@ -259,7 +446,79 @@ def plot_num_cols(df, col, target='depression'):
     plt.suptitle(f'{col.title()} and {target.title()}', fontsize=30, y=1.05)
 
 
-def make_classification_report(model, y_true, x_test, title=''):
+def model_scores(model, x_test):
+    '''
+    Generates the predictions and the positive class scores for a model once
+    so every report and plot can be made from them.
+    
+    Args:
+        model (classification model): SKlearn compatable model
+        x_test (dataframe or array): X data to generate predictions for
+        
+    Returns:
+        Tuple of the predicted labels and the scores for the positive class, 
+        from predict_proba or decision_function. The scores are None if the 
+        model has neither.
+    
+    Example:
+        y_preds, y_scores = model_scores(logreg_model, X_test)
+    '''
+
+    y_preds = model.predict(x_test)
+
+    # Using the same score the ROC curve would use
+    if hasattr(model, 'predict_proba'):
+        y_scores = model.predict_proba(x_test)[:, 1]
+    elif hasattr(model, 'decision_function'):
+        y_scores = model.decision_function(x_test)
+    else:
+        y_scores = None
+    return y_preds, y_scores
+
+
+def evaluation_results(y_true, y_preds, y_scores=None, title=''):
+    '''
+    Puts the metrics for a model into a dictionary using predictions and 
+    scores that were already generated.
+    
+    Args:
+        y_true (series or array): True labels to compare predictions
+        y_preds (series or array): Predicted labels
+        y_scores (series or array): Scores for the positive class, the ROC 
+            metrics are left out when None
+        title (str): Title for the model
+        
+    Returns:
+        Dictionary with the title, the predictions and scores, the 
+        classification report dictionary, the normalized confusion matrix, 
+        F2, recall, precision and ROC AUC.
+    
+    Example:
+        results = evaluation_results(y_test, *model_scores(model, X_test))
+    '''
+
+    report_dict = metrics.classification_report(y_true, y_preds, 
+                                                output_dict=True,
+                             target_names=['not depressed', 'depressed'])
+    report_dict['title'] = title
+
+    results = {'title': title, 
+               'y_preds': y_preds, 
+               'y_scores': y_scores, 
+               'report': report_dict,
+               'confusion_matrix': metrics.confusion_matrix(y_true, y_preds, 
+                                                            normalize='true'),
+               'f2': metrics.fbeta_score(y_true, y_preds, beta=2),
+               'recall': report_dict['depressed']['recall'],
+               'precision': report_dict['depressed']['precision'],
+               'roc_auc': np.nan}
+    if y_scores is not None:
+        results['roc_auc'] = metrics.roc_auc_score(y_true, y_scores)
+    return results
+
+
+def make_classification_report(model, y_true, x_test, title='', 
+                               y_preds=None, report_dict=None):
     
     '''
     Generate and return the classification report for a model.
@@ -269,6 +528,11 @@ def make_classification_report(model, y_true, x_test, title=''):
         y_true (series or array): True labels to compare predictions
         x_test (dataframe or array): X data to generate predictions for
         title (str): Title for the report
+        y_preds (series or array): Predictions that were already generated,
+            the model predicts x_test when None
+        report_dict (dict): Report dictionary that was already generated, 
+            such as results['report'] from evaluation_results, it is 
+            computed from the predictions when None
         
     Returns:
         Dictionary of the classification results
@@ -278,19 +542,22 @@ def make_classification_report(model, y_true, x_test, title=''):
                                     title='Logistic Regression Model')
         
         '''
-    # Generate predictions
-    y_preds = model.predict(x_test)
+    # Generate predictions when they were not passed in
+    if y_preds is None:
+        y_preds = model.predict(x_test)
     print('__________________________________________________________________')
     print(f'CLASSIFICATION REPORT FOR: \n\t{title}')
     print('__________________________________________________________________')
     print('\n')
     
-    # Generate report
+    # Generate the printed report, and the dictionary when it was not 
+    # passed in
     report = metrics.classification_report(y_true, y_preds, 
                                 target_names=['not depressed', 'depressed'])
-    report_dict = metrics.classification_report(y_true, y_preds, 
-                                                output_dict=True,
-                             target_names=['not depressed', 'depressed'])
+    if report_dict is None:
+        report_dict = metrics.classification_report(y_true, y_preds, 
+                                                    output_dict=True,
+                                target_names=['not depressed', 'depressed'])
     
     # Add the title to the report dictionary
     report_dict['title'] = title
@@ -300,7 +567,7 @@ def make_classification_report(model, y_true, x_test, title=''):
     return report_dict
 
 
-def plot_confusion_matrix(model, X, y, title=''):
+def plot_confusion_matrix(model, X, y, title='', y_preds=None):
     '''
     Plots the normalized confusion matrix for a model
     
@@ -309,6 +576,8 @@ def plot_confusion_matrix(model, X, y, title=''):
         X (dataframe or array): feature columns of a dataframe
         y (series or array): target column of a dataframe
         title (str): Title for the matrix
+        y_preds (series or array): Predictions that were already generated,
+            the model predicts X when None
     
     Returns:
         Plotted figure of the confusion matrix for the model
@@ -318,10 +587,13 @@ def plot_confusion_matrix(model, X, y, title=''):
         title='Logistic Regression Model')
     '''
     
-    # Plot the matrix with labels    
-    fig = metrics.plot_confusion_matrix(model, X, y, normalize='true', 
-                                        cmap='Greens',
-                                 display_labels=['not depressed', 'depressed']) 
+    # Plot the matrix with labels from the predictions
+    if y_preds is None:
+        y_preds = model.predict(X)
+    matrix = metrics.confusion_matrix(y, y_preds, normalize='true')
+    fig = metrics.ConfusionMatrixDisplay(matrix, 
+                    display_labels=['not depressed', 'depressed']).plot(
+                                                                cmap='Greens')
 
     # Remove grid lines
     plt.grid(False)
@@ -333,7 +605,7 @@ def plot_confusion_matrix(model, X, y, title=''):
     return fig
 
 
-def plot_roc_curve(model, xtest, ytest, title=''):
+def plot_roc_curve(model, xtest, ytest, title='', y_scores=None):
     '''
     Plots the precision-recall curve for a model
     
@@ -341,6 +613,8 @@ def plot_roc_curve(model, xtest, ytest, title=''):
         Model (classification model): SKlearn compatable model
         xtest (dataframe or array): feature columns of the test set
         ytest (series or array): target column of the test set
+        y_scores (series or array): Positive class scores that were already
+            generated, the model scores xtest when None
         
     Returns:
         Plotted figure of ROC curve for the model
@@ -348,9 +622,15 @@ def plot_roc_curve(model, xtest, ytest, title=''):
     Example:
         plot_roc_curve(classification_model, X_test, y_test)
     '''
+    if y_scores is None:
+        y_scores = model_scores(model, xtest)[1]
+    fpr, tpr, _ = metrics.roc_curve(ytest, y_scores)
+
     # Creating the plot
     fig, ax = plt.subplots(figsize=(8,6), ncols=1)
-    roc_plot = metrics.plot_roc_curve(model, xtest, ytest, ax=ax)
+    roc_plot = metrics.RocCurveDisplay(fpr=fpr, tpr=tpr, 
+                                       roc_auc=metrics.auc(fpr, tpr))
+    roc_plot.plot(ax=ax, name=type(model).__name__)
 
     # Setting the title of the plot
     ax.set_title(f'ROC Curve For {title}', 
@@ -389,11 +669,13 @@ def plot_top_features(model, xtrain, title=''):
     return importances.sort_values(ascending=False)
 
 
-def evaluate_model(model, xtrain, xtest, ytest, tree=False, title=''):
+def evaluate_model(model, xtrain, xtest, ytest, tree=False, title='', 
+                   verbose=True):
     '''
     Runs all the evaluation functions on a model including the classification 
     report, confusion matrix, ROC plot, and a top features plot if the 
-    model is tree based.
+    model is tree based. The model predicts and scores the test set only 
+    once and every report and plot is made from those.
     
     Args:
         model (classification model): SKlearn compatable model
@@ -402,21 +684,147 @@ def evaluate_model(model, xtrain, xtest, ytest, tree=False, title=''):
         ytest (series or array): target column of the test set
         tree (boolean): if the model is tree based or not
         title (str): Title for the model
+        verbose (boolean): Whether to print the report and show the plots,
+            when False only the results are returned
     
     Returns:
-        The classification report, confusion matrix, precision recall plot, and 
-        top features plot if tree=True
+        Dictionary of the results from evaluation_results, with the feature 
+        importances added when tree=True. The classification report, 
+        confusion matrix, ROC plot, and top features plot if tree=True are 
+        shown when verbose=True.
     
     Example:
-        evaluate_model(logreg_model, X_train, X_test, y_test,
-                        title='Logistic Regression Model')
+        results = evaluate_model(logreg_model, X_train, X_test, y_test,
+                                 title='Logistic Regression Model')
         
     '''
     
-    make_classification_report(model, ytest, xtest, title=title)
-    plot_confusion_matrix(model, xtest, ytest, title=title)
-    plot_roc_curve(model, xtest, ytest, title=title)
+    # Generate the predictions and scores a single time
+    y_preds, y_scores = model_scores(model, xtest)
+    results = evaluation_results(ytest, y_preds, y_scores, title=title)
+
+    if verbose:
+        make_classification_report(model, ytest, xtest, title=title, 
+                                   y_preds=y_preds, 
+                                   report_dict=results['report'])
+        plot_confusion_matrix(model, xtest, ytest, title=title, 
+                              y_preds=y_preds)
+        plot_roc_curve(model, xtest, ytest, title=title, y_scores=y_scores)
     
     # Feature importance can only be run on tree based models
     if tree:
-        plot_top_features(model, xtrain, title=title)
+        if verbose:
+            results['importances'] = plot_top_features(model, xtrain, 
+                                                       title=title)
+        else:
+            results['importances'] = pd.Series(model.feature_importances_, 
+                        index=xtrain.columns).sort_values(ascending=False)
+    return results
+
+
+def time_model(model, xtest, ytest, xtrain=None, ytrain=None, title=''):
+    '''
+    Fits a model if training data is passed in, then scores the test set once
+    and times both steps.
+    
+    Args:
+        model (classification model): SKlearn compatable model
+        xtest (dataframe or array): feature columns of the test set
+        ytest (series or array): target column of the test set
+        xtrain (dataframe or array): feature columns of the training set
+        ytrain (series or array): target column of the training set, the 
+            model is used as it is when None
+        title (str): Title for the model
+        
+    Returns:
+        Dictionary of the results from evaluation_results with the model and
+        the fit and predict seconds added.
+    
+    Example:
+        results = time_model(logreg_model, X_test, y_test)
+    '''
+
+    fit_seconds = np.nan
+    if ytrain is not None:
+        start = time.perf_counter()
+        model.fit(xtrain, ytrain)
+        fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_preds, y_scores = model_scores(model, xtest)
+    predict_seconds = time.perf_counter() - start
+
+    results = evaluation_results(ytest, y_preds, y_scores, title=title)
+    results.update({'model': model, 
+                    'fit_seconds': fit_seconds, 
+                    'predict_seconds': predict_seconds})
+    return results
+
+
+def compare_models(models, xtest, ytest, xtrain=None, ytrain=None, 
+                   n_jobs=None, processes=False, plot=False):
+    '''
+    Evaluates many models at the same time in a pool of threads or processes
+    and puts their metrics side by side. Plots are only drawn once every model
+    is done, and only when asked for.
+    
+    Args:
+        models (dict): Model titles and SKlearn compatable models
+        xtest (dataframe or array): feature columns of the test set
+        ytest (series or array): target column of the test set
+        xtrain (dataframe or array): feature columns of the training set
+        ytrain (series or array): target column of the training set, the 
+            models are fit first and the fit is timed when it is passed in
+        n_jobs (int): Number of models to evaluate at once, -1 uses every 
+            core
+        processes (boolean): Whether to use processes instead of threads
+        plot (boolean): Whether to plot the confusion matrix and ROC curve 
+            for each model after they are all evaluated
+        
+    Returns:
+        DataFrame with a row for each model of F2, recall, precision, ROC AUC 
+        and the fit and predict seconds, sorted by F2, and a dictionary of the
+        full results from time_model for each model.
+    
+    Example:
+        summary, results = compare_models({'Logistic Regression': logreg_model,
+                                           'Random Forest': forest_model},
+                                          X_test_final, y_test, n_jobs=-1)
+    '''
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+
+    with pool(max_workers=n_jobs) as executor:
+        futures = {title: executor.submit(time_model, model, xtest, ytest, 
+                                          xtrain, ytrain, title)
+                   for title, model in models.items()}
+        results = {title: future.result() for title, future in futures.items()}
+
+    summary = pd.DataFrame([{'model': title, 
+                             'f2': result['f2'],
+                             'recall': result['recall'],
+                             'precision': result['precision'],
+                             'roc_auc': result['roc_auc'],
+                             'fit_seconds': result['fit_seconds'],
+                             'predict_seconds': result['predict_seconds']}
+                            for title, result in results.items()])
+    summary = summary.set_index('model').sort_values('f2', ascending=False)
+
+    # Pyplot is not thread safe so the plots are drawn here one at a time
+    if plot:
+        for title, result in results.items():
+            plot_confusion_matrix(result['model'], xtest, ytest, title=title,
+                                  y_preds=result['y_preds'])
+            if result['y_scores'] is not None:
+                plot_roc_curve(result['model'], xtest, ytest, title=title,
+                               y_scores=result['y_scores'])
+    return summary, results
+
+
+# Every public function is traced once enable_tracing is called, except the
+# ones applied to every row
+trace_package(sys.modules[__name__], 
+              skip=['first_cancer_count', 'second_cancer_count', 
+                    'third_cancer_count'])
@@ -0,0 +1,195 @@
+'''
+Functions to save a fitted scoring pipeline to a folder and load it back
+quickly. Each save writes a new numbered version folder, v1, v2 and so on,
+holding a manifest.json with the column lists, dtypes, feature names and
+library versions, a pickle of each fitted estimator, and the estimators'
+large numeric arrays, such as the quantile tables and cluster centers, as
+.npy files. The arrays are loaded memory mapped, so loading only reads what
+scoring touches and takes milliseconds.'''
+
+import copy
+import glob, os
+import json
+import pickle
+import re
+import shutil
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import sklearn
+from project_functions.scoring import feature_names, make_pipeline
+
+# Version of the folder layout, bumped when it changes
+ARTIFACT_FORMAT = 1
+
+# Arrays with at least this many values are stored as .npy files
+MIN_ARRAY_SIZE = 1024
+
+ESTIMATORS = ['encoder', 'transformer', 'kmeans', 'model']
+
+# Fitted attributes scoring never reads, which are left out of the saved
+# state, like the cluster of every training row
+UNUSED_ATTRIBUTES = {'kmeans': ['labels_']}
+
+
+def artifact_versions(root):
+    '''
+    Lists the saved versions under an artifact folder.
+
+    Args:
+        root (str): Artifact folder.
+
+    Returns:
+        List of the version numbers, oldest first.
+
+    Example:
+        artifact_versions('artifacts/logreg')
+    '''
+    versions = []
+    for path in glob.glob(os.path.join(root, 'v*', 'manifest.json')):
+        match = re.fullmatch(r'v(\d+)', os.path.basename(os.path.dirname(path)))
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+
+def _split_arrays(name, estimator, arrays):
+    '''
+    Returns a shallow copy of an estimator without its unused attributes and
+    with its large numeric arrays set to None, adding the removed arrays to
+    arrays under 'name.attribute'.
+    '''
+    light = copy.copy(estimator)
+    for attr in UNUSED_ATTRIBUTES.get(name, []):
+        vars(light).pop(attr, None)
+    for attr, value in list(vars(light).items()):
+        if (isinstance(value, np.ndarray) and value.size >= MIN_ARRAY_SIZE
+                and value.dtype.kind in 'biuf'):
+            arrays[f'{name}.{attr}'] = value
+            setattr(light, attr, None)
+    return light
+
+
+def save_artifact(pipeline, root):
+    '''
+    Saves a scoring pipeline as the next version under an artifact folder.
+    The version is written to a temporary folder first and then renamed, so
+    a reader never sees a half written version.
+
+    Args:
+        pipeline (dict): Scoring pipeline from project_functions.scoring.
+        root (str): Artifact folder, created if needed.
+
+    Returns:
+        Location of the new version folder.
+
+    Example:
+        save_artifact(pipeline, 'artifacts/logreg')
+    '''
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=root, prefix='.staging-')
+
+    try:
+        arrays = {}
+        for name in ESTIMATORS:
+            light = _split_arrays(name, pipeline[name], arrays)
+            with open(os.path.join(staging, f'{name}.pkl'), 'wb') as f:
+                pickle.dump(light, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        array_info = {}
+        for key, value in arrays.items():
+            np.save(os.path.join(staging, f'{key}.npy'),
+                    np.ascontiguousarray(value))
+            array_info[key] = {'file': f'{key}.npy', 'shape': value.shape,
+                               'dtype': str(value.dtype)}
+
+        manifest = {'format': ARTIFACT_FORMAT,
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'libraries': {'numpy': np.__version__,
+                                  'pandas': pd.__version__,
+                                  'sklearn': sklearn.__version__},
+                    'ohe_cols': pipeline['ohe_cols'],
+                    'scale_cols': pipeline['scale_cols'],
+                    'dtypes': pipeline.get('dtypes'),
+                    'feature_names': feature_names(pipeline),
+                    'threshold': pipeline['threshold'],
+                    'estimators': {name: f'{name}.pkl' for name in ESTIMATORS},
+                    'arrays': array_info}
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Taking the next free version number, retrying if another save
+        # claimed it first
+        while True:
+            versions = artifact_versions(root)
+            path = os.path.join(root, f'v{versions[-1] + 1 if versions else 1}')
+            try:
+                os.rename(staging, path)
+                return path
+            except OSError:
+                if not os.path.exists(path):
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def load_artifact(path, mmap=True):
+    '''
+    Loads a saved scoring pipeline. Given an artifact folder it loads the
+    latest version, given a version folder it loads that version.
+
+    Args:
+        path (str): Artifact folder or version folder.
+        mmap (boolean): Whether to memory map the .npy arrays instead of
+            reading them into memory.
+
+    Returns:
+        Dictionary of the scoring pipeline, with the manifest under
+        'manifest' and the version folder under 'path'.
+
+    Raises:
+        ValueError: If there is no saved version or the layout is from a
+            different format.
+
+    Example:
+        pipeline = load_artifact('artifacts/logreg')
+    '''
+    if not os.path.exists(os.path.join(path, 'manifest.json')):
+        versions = artifact_versions(path)
+        if not versions:
+            raise ValueError(f'No saved pipeline in {path}')
+        path = os.path.join(path, f'v{versions[-1]}')
+
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f'{path} has artifact format {manifest.get("format")}'
+                         f', expected {ARTIFACT_FORMAT}')
+    if manifest['libraries']['sklearn'] != sklearn.__version__:
+        warnings.warn(f'{path} was saved with scikit-learn '
+                      f'{manifest["libraries"]["sklearn"]}, running '
+                      f'{sklearn.__version__}')
+
+    estimators = {}
+    for name, file in manifest['estimators'].items():
+        with open(os.path.join(path, file), 'rb') as f:
+            estimators[name] = pickle.load(f)
+
+    # Putting the large arrays back, memory mapped read only
+    for key, info in manifest['arrays'].items():
+        name, attr = key.split('.', 1)
+        array = np.load(os.path.join(path, info['file']),
+                        mmap_mode='r' if mmap else None)
+        setattr(estimators[name], attr, array)
+
+    pipeline = make_pipeline(estimators['encoder'], estimators['transformer'],
+                             estimators['kmeans'], estimators['model'],
+                             manifest['ohe_cols'], manifest['scale_cols'],
+                             threshold=manifest['threshold'],
+                             dtypes=manifest['dtypes'])
+    pipeline['manifest'] = manifest
+    pipeline['path'] = path
+    return pipeline
@@ -0,0 +1,198 @@
+'''
+Functions for scoring files too large to load into memory. The input is
+read in fixed size chunks from a CSV or Parquet file, each chunk goes
+through the scoring pipeline, and the scores are appended to the output
+file as soon as they are ready. Only a few chunks are held at a time, so
+peak memory depends on the chunk size and not on the file size. Chunks can
+be scored in a pool of processes that each load the pipeline once.'''
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from project_functions.scoring import check_schema, score_frame
+from project_functions.artifact import load_artifact
+
+# The pipeline of a worker process, set once when the worker starts
+_worker_pipeline = None
+
+
+def iter_chunks(path, chunksize=100000, columns=None, text_cols=None):
+    '''
+    Reads a CSV or Parquet file in chunks.
+
+    Args:
+        path (str): Location of the .csv or .parquet file.
+        chunksize (int): Number of rows in each chunk.
+        columns (list): Only these columns are read, all when None.
+        text_cols (list): Columns always read as text, so a chunk where a
+            text column happens to be empty is not read as numbers.
+
+    Returns:
+        Generator of DataFrames.
+
+    Example:
+        for chunk in iter_chunks('members.parquet', 500000):
+            ...
+    '''
+    if path.lower().endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        # Pre-buffering keeps the column data of earlier row groups around,
+        # which makes memory grow with the file
+        try:
+            parquet_file = pq.ParquetFile(path, pre_buffer=False)
+        except TypeError:
+            parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize,
+                                               columns=columns):
+            yield batch.to_pandas()
+    else:
+        dtype = {col: object for col in text_cols} if text_cols else None
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns,
+                               dtype=dtype)
+
+
+def file_columns(path):
+    '''
+    Column names of a CSV or Parquet file, read without loading any rows.
+
+    Args:
+        path (str): Location of the .csv or .parquet file.
+
+    Returns:
+        List of the column names.
+
+    Example:
+        file_columns('members.parquet')
+    '''
+    if path.lower().endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _init_worker(pipeline):
+    '''
+    Loads the pipeline in a worker process, from the artifact folder when a
+    location is given.
+    '''
+    global _worker_pipeline
+    if isinstance(pipeline, str):
+        pipeline = load_artifact(pipeline)
+    _worker_pipeline = pipeline
+
+
+def _score_chunk(chunk, id_col, pipeline=None):
+    '''
+    Scores one chunk and returns a DataFrame of the ids, scores and
+    predictions.
+    '''
+    pipeline = pipeline or _worker_pipeline
+    scores = score_frame(pipeline, chunk)
+    result = pd.DataFrame({'score': scores,
+                           'prediction': (scores >= pipeline['threshold'])
+                                         .astype('int8')})
+    if id_col is not None:
+        result.insert(0, id_col, chunk[id_col].to_numpy())
+    return result
+
+
+def _write_result(output, result):
+    '''
+    Appends a result chunk to the output CSV or Parquet file, starting the
+    file on the first chunk.
+    '''
+    if output['path'].lower().endswith(('.parquet', '.pq')):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(result, preserve_index=False)
+        if output['writer'] is None:
+            output['writer'] = pq.ParquetWriter(output['path'], table.schema)
+        output['writer'].write_table(table)
+    else:
+        result.to_csv(output['path'], mode='a' if output['rows'] else 'w',
+                      header=not output['rows'], index=False)
+    output['rows'] += len(result)
+
+
+def score_file(pipeline, in_path, out_path, chunksize=100000, id_col='SEQN',
+               n_jobs=1, max_in_flight=None):
+    '''
+    Scores every row of a CSV or Parquet file and writes the ids, scores and
+    predictions to a CSV or Parquet file, chunk by chunk and in the input
+    order. The file's columns and the dtypes of the first chunk are checked
+    against the pipeline's schema so a file with the wrong layout fails
+    before any work is done.
+
+    Args:
+        pipeline (dict or str): Scoring pipeline, or the location of an
+            artifact folder from save_artifact, which lets each worker load
+            it memory mapped instead of being sent a copy.
+        in_path (str): Location of the .csv or .parquet file to score.
+        out_path (str): Location of the .csv or .parquet file to write.
+        chunksize (int): Number of rows scored at a time.
+        id_col (str): Column copied to the output to identify each row, None
+            to leave it out.
+        n_jobs (int): Number of processes to score with, -1 uses every core.
+        max_in_flight (int): Most chunks read but not yet written, which
+            bounds the memory used. Twice the number of processes when None.
+
+    Returns:
+        Dictionary of the number of rows, the seconds taken and the rows
+        scored per second.
+
+    Raises:
+        ValueError: If the file does not match the pipeline's schema.
+
+    Example:
+        score_file('artifacts/logreg', 'members.parquet', 'scores.parquet',
+                   chunksize=250000, n_jobs=-1)
+    '''
+    start = time.perf_counter()
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * n_jobs
+
+    # The main process needs the column lists to read and check the chunks
+    local = load_artifact(pipeline) if isinstance(pipeline, str) else pipeline
+    columns = local['ohe_cols'] + local['scale_cols']
+    if id_col is not None:
+        columns = [id_col] + columns
+    missing = [col for col in columns if col not in file_columns(in_path)]
+    if missing:
+        raise ValueError(f'{in_path} is missing {len(missing)} columns: '
+                         f'{missing[:10]}')
+    chunks = iter_chunks(in_path, chunksize, columns=columns,
+                         text_cols=local['ohe_cols'])
+
+    output = {'path': out_path, 'writer': None, 'rows': 0}
+    try:
+        if n_jobs <= 1:
+            for i, chunk in enumerate(chunks):
+                if i == 0:
+                    check_schema(local, chunk)
+                _write_result(output, _score_chunk(chunk, id_col, local))
+        else:
+            with ProcessPoolExecutor(n_jobs, initializer=_init_worker,
+                                     initargs=(pipeline,)) as executor:
+                in_flight = deque()
+                for i, chunk in enumerate(chunks):
+                    if i == 0:
+                        check_schema(local, chunk)
+                    in_flight.append(executor.submit(_score_chunk, chunk,
+                                                     id_col))
+                    del chunk
+
+                    # Waiting for the oldest chunk keeps the output in order
+                    if len(in_flight) >= max_in_flight:
+                        _write_result(output, in_flight.popleft().result())
+                while in_flight:
+                    _write_result(output, in_flight.popleft().result())
+    finally:
+        if output['writer'] is not None:
+            output['writer'].close()
+
+    seconds = time.perf_counter() - start
+    return {'rows': output['rows'], 'seconds': seconds,
+            'rows_per_second': output['rows'] / seconds}
@@ -0,0 +1,183 @@
+'''
+Functions for an on-disk cache of decoded .XPT files. Each entry is an
+uncompressed Feather file named after the source file and a key built from
+the source file's location, size and modified time and the requested columns,
+so a changed source file never matches an old entry. Entries are read
+through a memory map, which saves reading the file into a buffer first, but
+the columns are still copied into the DataFrame, so a cached read needs
+about as much memory as the data. The least recently used entries are
+removed when the cache grows past a size limit.'''
+
+import glob, os
+import hashlib
+import json
+
+
+def _path_hash(file):
+    '''
+    Short hash of the absolute location of a source file.
+    '''
+    location = os.path.abspath(file).encode('utf-8')
+    return hashlib.sha1(location).hexdigest()[:16]
+
+
+def cache_path(cache_dir, file, columns=None, downcast=False):
+    '''
+    Builds the location of the cache entry for a source file and the options
+    it was read with.
+
+    Args:
+        cache_dir (str): Folder where the cache entries are kept.
+        file (str): Location of the source .XPT file.
+        columns (list): Columns requested from the file, all when None.
+        downcast (boolean): Whether the numeric columns were downcast.
+
+    Returns:
+        Location of the cache entry, which may not exist yet.
+
+    Example:
+        entry = cache_path('.xpt_cache', r'Data/Demographics/DEMO_H.XPT')
+    '''
+
+    stat = os.stat(file)
+    key = json.dumps([os.path.abspath(file), stat.st_size, stat.st_mtime_ns,
+                      None if columns is None else sorted(columns),
+                      bool(downcast)])
+    key_hash = hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+    return os.path.join(cache_dir, f'{_path_hash(file)}-{key_hash}.feather')
+
+
+def load_cached(entry):
+    '''
+    Reads a cache entry through a memory map and marks it as recently used.
+    The memory map only skips the read buffer, the columns are still copied
+    into the DataFrame.
+
+    Args:
+        entry (str): Location of the cache entry.
+
+    Returns:
+        DataFrame that was stored in the entry.
+
+    Example:
+        df = load_cached(cache_path('.xpt_cache', file))
+    '''
+    import pyarrow.feather as feather
+
+    # Touching the entry keeps the least recently used order up to date
+    os.utime(entry)
+    table = feather.read_table(entry, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def save_cached(df, entry):
+    '''
+    Writes a DataFrame to a cache entry. The entry is written to a temporary
+    file first so other processes never see a partly written entry.
+
+    Args:
+        df (DataFrame): DataFrame to store, the index is not stored.
+        entry (str): Location of the cache entry.
+
+    Returns:
+        Location of the cache entry.
+
+    Example:
+        save_cached(df, cache_path('.xpt_cache', file))
+    '''
+    import pyarrow.feather as feather
+
+    os.makedirs(os.path.dirname(entry) or '.', exist_ok=True)
+    temp = f'{entry}.{os.getpid()}.tmp'
+    feather.write_feather(df.reset_index(drop=True), temp,
+                          compression='uncompressed')
+    os.replace(temp, entry)
+    return entry
+
+
+def cache_entries(cache_dir):
+    '''
+    Lists the cache entries from least to most recently used.
+
+    Args:
+        cache_dir (str): Folder where the cache entries are kept.
+
+    Returns:
+        List of (location, size in bytes, last used time) tuples.
+
+    Example:
+        entries = cache_entries('.xpt_cache')
+    '''
+
+    entries = []
+    for entry in glob.glob(os.path.join(cache_dir, '*.feather')):
+        try:
+            stat = os.stat(entry)
+        except FileNotFoundError:
+            continue
+        entries.append((entry, stat.st_size, stat.st_mtime))
+    return sorted(entries, key=lambda x: x[2])
+
+
+def evict_cache(cache_dir, max_bytes):
+    '''
+    Removes the least recently used cache entries until the cache is no
+    larger than the size limit.
+
+    Args:
+        cache_dir (str): Folder where the cache entries are kept.
+        max_bytes (int): Largest total size the cache may be.
+
+    Returns:
+        List of the removed entries.
+
+    Example:
+        evict_cache('.xpt_cache', max_bytes=2 * 1024 ** 3)
+    '''
+
+    entries = cache_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for entry, size, _ in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(entry)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed.append(entry)
+    return removed
+
+
+def invalidate_cache(cache_dir, files=None):
+    '''
+    Removes the cache entries for some source files, or every entry.
+
+    Args:
+        cache_dir (str): Folder where the cache entries are kept.
+        files (list): Source .XPT files whose entries should be removed,
+            every entry is removed when None.
+
+    Returns:
+        List of the removed entries.
+
+    Example:
+        invalidate_cache('.xpt_cache', [r'Data/Demographics/DEMO_H.XPT'])
+    '''
+
+    if files is None:
+        patterns = ['*.feather']
+    else:
+        patterns = [f'{_path_hash(file)}-*.feather' for file in files]
+
+    removed = []
+    for pattern in patterns:
+        for entry in glob.glob(os.path.join(cache_dir, pattern)):
+            # Another process may have evicted it since the glob
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                continue
+            removed.append(entry)
+    return removed
@@ -0,0 +1,151 @@
+'''
+Contingency tables of the target against many features, for the count and
+percentage plots. The target is factorized once and each feature once, with
+its values sorted the way the plots order them, and the counts of every
+value and target pair come from one bincount of the combined codes. The
+tables are small, so they can be saved and drawn from in a later session
+without the data.'''
+
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+
+def _codes(values):
+    '''
+    Codes of a column with its distinct values sorted, nulls get -1.
+    '''
+    return pd.factorize(values, sort=True)
+
+
+def crosstab(values, target_codes, target_labels):
+    '''
+    Contingency table of one feature against factorized target codes.
+
+    Args:
+        values (Series): Feature column.
+        target_codes (array): Codes of the target from pd.factorize.
+        target_labels (Index): Target labels of the codes.
+
+    Returns:
+        DataFrame of counts with a row per feature value, sorted, and a
+        column per target label. Rows with a null feature or target are
+        left out.
+
+    Example:
+        codes, labels = pd.factorize(df['depression'], sort=True)
+        crosstab(df['gender'], codes, pd.Index(labels, name='depression'))
+    '''
+    codes, uniques = _codes(values)
+    n_values, n_labels = len(uniques), len(target_labels)
+    valid = (codes >= 0) & (target_codes >= 0)
+    counts = np.bincount(codes[valid] * n_labels + target_codes[valid],
+                         minlength=n_values * n_labels)
+    labels = pd.Index(target_labels,
+                      name=getattr(target_labels, 'name', None))
+    return pd.DataFrame(counts.reshape(n_values, n_labels),
+                        index=pd.Index(uniques, name=values.name),
+                        columns=labels)
+
+
+def crosstabs(df, cols, target='depression'):
+    '''
+    Contingency tables of the target against every column in cols.
+
+    Args:
+        df (dataframe): Dataframe that contains the columns and target
+        cols (list): Columns to count against the target
+        target (str): Target column of the dataframe
+
+    Returns:
+        Dictionary of column name to its DataFrame of counts, with a row per
+        value and a column per target label.
+
+    Example:
+        tables = crosstabs(train_df, demo_cat_cols)
+        plotting_percentages(None, 'gender', table=tables['gender'])
+    '''
+    # Factorizing the target once for every table
+    target_codes, target_labels = _codes(df[target])
+    target_labels = pd.Index(target_labels, name=target)
+    return {col: crosstab(df[col], target_codes, target_labels)
+            for col in cols}
+
+
+def save_crosstabs(tables, path):
+    '''
+    Saves tables from crosstabs to a pickle file, writing a temporary file
+    first so a file that is being read is never half written.
+
+    Args:
+        tables (dict): Tables from crosstabs.
+        path (str): Location of the file to write.
+
+    Returns:
+        None
+
+    Example:
+        save_crosstabs(tables, 'CSVFiles/crosstabs.pkl')
+    '''
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, path)
+
+
+def load_crosstabs(path):
+    '''
+    Reads tables saved with save_crosstabs, so the plots can be drawn in a
+    later session without loading the data.
+
+    Args:
+        path (str): Location of the file.
+
+    Returns:
+        Dictionary of column name to its DataFrame of counts.
+
+    Example:
+        tables = load_crosstabs('CSVFiles/crosstabs.pkl')
+        plotting_counts(None, 'gender', table=tables['gender'])
+    '''
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def table_counts(table):
+    '''
+    Long form of a contingency table for a bar plot, with the feature value,
+    target label and count of every pair that appears.
+
+    Args:
+        table (DataFrame): Table from crosstab or crosstabs.
+
+    Returns:
+        DataFrame with the feature, target and 'count' columns.
+
+    Example:
+        table_counts(tables['gender'])
+    '''
+    long_df = table.stack().rename('count').reset_index()
+    return long_df[long_df['count'] > 0].reset_index(drop=True)
+
+
+def table_percentages(table):
+    '''
+    Long form of a contingency table as the percent of each feature value's
+    rows that have each target label, like
+    df.groupby(col)[target].value_counts(normalize=True) times 100.
+
+    Args:
+        table (DataFrame): Table from crosstab or crosstabs.
+
+    Returns:
+        DataFrame with the feature, target and 'percent' columns.
+
+    Example:
+        table_percentages(tables['gender'])
+    '''
+    percent = table.div(table.sum(axis=1), axis=0).mul(100)
+    long_df = percent.stack().rename('percent').reset_index()
+    return long_df[long_df['percent'] > 0].reset_index(drop=True)
@@ -0,0 +1,310 @@
+'''
+Versions of the plotting functions for batch jobs. The figures are drawn on
+Figure objects that pyplot does not know about, so no interactive backend is
+used, nothing is kept in pyplot's global state, and each figure is freed as
+soon as it is saved. Whole sets of plots can be written to a folder from a
+pool of processes.'''
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import seaborn as sns
+import sklearn.metrics as metrics
+from project_functions.crosstab import table_counts, table_percentages
+
+
+def new_figure(figsize=(16, 8)):
+    '''
+    Creates a Figure with one set of axes that is drawn with the Agg backend
+    and is not registered with pyplot.
+
+    Args:
+        figsize (tuple): Width and height of the figure in inches.
+
+    Returns:
+        The figure and its axes.
+
+    Example:
+        fig, ax = new_figure((8, 6))
+    '''
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    return fig, ax
+
+
+def counts_figure(df, col, target='depression', table=None):
+    '''
+    Headless version of plotting_counts.
+
+    Args:
+        df (dataframe): Dataframe that contains the column and target to be
+        plotted, not used when a table is passed in
+        col (str): Column name of the data to be plotted against the target
+        target (str): Target column of the dataframe
+        table (dataframe): Counts of the column against the target from
+            crosstabs, which are drawn instead of counting the dataframe
+
+    Returns:
+        Figure of the count plot with bars grouped by the target
+
+    Example:
+        fig = counts_figure(data, 'feature_name')
+    '''
+
+    # Plot the figure
+    fig, ax = new_figure((16, 8))
+    if table is None:
+        # Sort the column values for plotting
+        order_list = list(df[col].unique())
+        order_list.sort()
+        sns.countplot(x=col, hue=target, data=df, order=order_list, ax=ax)
+    else:
+        sns.barplot(x=col, y='count', hue=target, data=table_counts(table),
+                    order=list(table.index), ax=ax)
+
+    # Set labels and title
+    ax.set_title(f'{col.title()} By Count {target.title()}', fontsize=30)
+    ax.set_xlabel(f'{col.title()}', fontsize=20)
+    ax.set_ylabel(f'{target.title()} Count', fontsize=20)
+    ax.tick_params(axis='x', labelrotation=75)
+    return fig
+
+
+def percentages_figure(df, col, target='depression', table=None):
+    '''
+    Headless version of plotting_percentages.
+
+    Args:
+        df (dataframe): Dataframe that contains the column and target to be
+        plotted, not used when a table is passed in
+        col (str): Column name of the data to be plotted against the target
+        target (str): Target column of the dataframe
+        table (dataframe): Counts of the column against the target from
+            crosstabs, which the percentages are taken from instead of
+            grouping the dataframe
+
+    Returns:
+        Figure with bars grouped by the target and representing percentages
+        of the entries for each value
+
+    Example:
+        fig = percentages_figure(data, 'feature_name')
+    '''
+
+    if table is None:
+        # Temporary dataframe with percentage values
+        temp_df = df.groupby(col)[target].value_counts(normalize=True)
+        temp_df = temp_df.mul(100).rename('percent').reset_index()
+
+        # Sort the column values for plotting
+        order_list = list(df[col].unique())
+        order_list.sort()
+    else:
+        temp_df = table_percentages(table)
+        order_list = list(table.index)
+
+    # Plot the figure
+    fig, ax = new_figure((16, 8))
+    sns.barplot(x=col, y='percent', hue=target, data=temp_df,
+                order=order_list, ax=ax)
+    ax.set_ylim(0, 100)
+
+    # Add the percentage value on top of each bar, skipping empty patches
+    for p in ax.patches:
+        if not p.get_height() > 0:
+            continue
+        txt = str(round(p.get_height(), 1)) + '%'
+        ax.text(p.get_x(), p.get_height(), txt, fontsize=15)
+
+    # Set labels and title
+    ax.set_title(f'{col.title()} By Percent {target.title()}', fontsize=30)
+    ax.set_xlabel(f'{col.title()}', fontsize=20)
+    ax.set_ylabel(f'{target.title()} Percentage', fontsize=20)
+    ax.tick_params(axis='x', labelrotation=75)
+    return fig
+
+
+def num_cols_figure(df, col, target='depression'):
+    '''
+    Headless version of plot_num_cols.
+
+    Args:
+        df (dataframe): Dataframe that contains the column and target to be
+        plotted
+        col (str): Column name of the data to be plotted against the target
+        target (str): Target column of the dataframe
+
+    Returns:
+        Figure of the 'boxen' plot split by the target
+
+    Example:
+        fig = num_cols_figure(data, 'feature_name')
+    '''
+    fig, ax = new_figure((14, 7))
+    sns.boxenplot(x=target, y=col, data=df, ax=ax)
+    ax.set_title(f'{col.title()} and {target.title()}', fontsize=30)
+    return fig
+
+
+def confusion_matrix_figure(y_true, y_preds, title=''):
+    '''
+    Headless version of plot_confusion_matrix using predictions that were
+    already generated.
+
+    Args:
+        y_true (series or array): True labels
+        y_preds (series or array): Predicted labels
+        title (str): Title for the matrix
+
+    Returns:
+        Figure of the normalized confusion matrix
+
+    Example:
+        fig = confusion_matrix_figure(y_test, results['y_preds'])
+    '''
+    fig, ax = new_figure((8, 6))
+    matrix = metrics.confusion_matrix(y_true, y_preds, normalize='true')
+    metrics.ConfusionMatrixDisplay(
+        matrix, display_labels=['not depressed', 'depressed']).plot(
+            ax=ax, cmap='Greens')
+    ax.grid(False)
+    ax.set_title(f'Confusion Matrix For {title}', fontsize=17)
+    return fig
+
+
+def roc_curve_figure(y_true, y_scores, title='', name=None):
+    '''
+    Headless version of plot_roc_curve using scores that were already
+    generated.
+
+    Args:
+        y_true (series or array): True labels
+        y_scores (series or array): Scores for the positive class
+        title (str): Title for the plot
+        name (str): Name of the model for the legend
+
+    Returns:
+        Figure of the ROC curve
+
+    Example:
+        fig = roc_curve_figure(y_test, results['y_scores'], name='Forest')
+    '''
+    fig, ax = new_figure((8, 6))
+    fpr, tpr, _ = metrics.roc_curve(y_true, y_scores)
+    metrics.RocCurveDisplay(fpr=fpr, tpr=tpr,
+                            roc_auc=metrics.auc(fpr, tpr)).plot(ax=ax,
+                                                                name=name)
+    ax.set_title(f'ROC Curve For {title}', fontsize=17)
+    ax.legend()
+    return fig
+
+
+def save_figure(fig, save_dir, name, formats=('png',)):
+    '''
+    Writes a figure to a folder in each of the formats and then clears it so
+    its memory is freed right away.
+
+    Args:
+        fig (Figure): Figure to save.
+        save_dir (str): Folder to save into, created if needed.
+        name (str): File name without the extension.
+        formats (tuple): File formats to write, such as 'png' and 'svg'.
+
+    Returns:
+        List of the written file locations.
+
+    Example:
+        save_figure(counts_figure(data, 'gender'), 'figures', 'gender')
+    '''
+    os.makedirs(save_dir, exist_ok=True)
+    name = re.sub(r'[^\w\-]+', '_', name)
+
+    paths = []
+    for fmt in formats:
+        path = os.path.join(save_dir, f'{name}.{fmt}')
+        fig.savefig(path, format=fmt, bbox_inches='tight')
+        paths.append(path)
+    fig.clear()
+    return paths
+
+
+FIGURES = {'counts': counts_figure,
+           'percentages': percentages_figure,
+           'num_cols': num_cols_figure}
+
+
+def _render_feature(kind, df, col, target, save_dir, formats, table=None):
+    '''
+    Draws and saves one feature plot, used by the worker processes.
+    '''
+    if table is None:
+        fig = FIGURES[kind](df, col, target)
+    else:
+        fig = FIGURES[kind](df, col, target, table=table)
+    return save_figure(fig, save_dir, f'{kind}_{col}', formats)
+
+
+def save_feature_plots(df, cols, kind='percentages', target='depression',
+                       save_dir='figures', formats=('png',), n_jobs=1,
+                       tables=None):
+    '''
+    Draws a plot for every column against the target and writes them to a
+    folder, spread across a pool of processes when more than one job is
+    requested.
+
+    Args:
+        df (dataframe): Dataframe that contains the columns and target
+        cols (list): Columns to plot
+        kind (str): 'counts', 'percentages' or 'num_cols', matching
+            plotting_counts, plotting_percentages and plot_num_cols
+        target (str): Target column of the dataframe
+        save_dir (str): Folder to save the plots into
+        formats (tuple): File formats to write, such as 'png' and 'svg'
+        n_jobs (int): Number of processes to draw with, -1 uses every core
+        tables (dict): Tables from crosstabs to draw the 'counts' and
+            'percentages' plots from, so only the small tables are sent to
+            the workers and df is not used
+
+    Returns:
+        Dictionary of each column and the list of its written files.
+
+    Raises:
+        ValueError: If tables are passed in for the 'num_cols' plots, which
+            need the data, or a column has no table and df is None.
+
+    Example:
+        save_feature_plots(train_df, demo_cat_cols, kind='counts',
+                           save_dir='Images/EDA', formats=('png', 'svg'),
+                           n_jobs=-1)
+    '''
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if tables is not None and kind == 'num_cols':
+        raise ValueError("The 'num_cols' plots are drawn from the data, "
+                         "not from tables")
+    tables = tables or {}
+
+    # Columns without a table are drawn from df, so it has to be there
+    if df is None:
+        missing = [col for col in cols if col not in tables]
+        if missing:
+            raise ValueError(f'No table or data for {len(missing)} columns: '
+                             f'{missing[:10]}')
+
+    if n_jobs <= 1:
+        return {col: _render_feature(kind, df, col, target, save_dir, formats,
+                                     tables.get(col))
+                for col in cols}
+
+    # Each worker is only sent its table, or the two columns its plot needs
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = {col: executor.submit(_render_feature, kind,
+                                        None if col in tables
+                                        else df[[col, target]],
+                                        col, target, save_dir, formats,
+                                        tables.get(col))
+                   for col in cols}
+        return {col: future.result() for col, future in futures.items()}
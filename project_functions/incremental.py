@@ -0,0 +1,255 @@
+'''
+Functions for adding new NHANES survey cycles to persisted component tables
+without rebuilding them. Each component is kept in its own folder of a store
+with one Parquet partition per source .XPT file, a sorted array of each
+partition's SEQN numbers, and a manifest.json recording which files were
+already processed along with their size, modified time, row count and SEQN
+range. Ingesting a component only reads the files that are new or changed,
+and the SEQN uniqueness check only opens partitions whose SEQN range
+overlaps the new rows, so adding a cycle costs time in proportion to that
+cycle.'''
+
+import glob, os
+import json
+import numpy as np
+import pandas as pd
+from project_functions.ingest import read_xpt_files
+
+
+def component_manifest(store_dir, component):
+    '''
+    Reads the manifest of a component in the store.
+
+    Args:
+        store_dir (str): Folder of the store.
+        component (str): Name of the component.
+
+    Returns:
+        Dictionary of the manifest, with an empty 'files' dictionary when the
+        component has not been ingested yet.
+
+    Example:
+        component_manifest('clean_store', 'Demographics')
+    '''
+    path = os.path.join(store_dir, component, 'manifest.json')
+    if not os.path.exists(path):
+        return {'files': {}, 'next_partition': 1}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(store_dir, component, manifest):
+    '''
+    Writes the manifest to a temporary file and renames it into place, so
+    the manifest on disk is always either the old or the new one.
+    '''
+    path = os.path.join(store_dir, component, 'manifest.json')
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp, path)
+
+
+def _file_key(file):
+    '''
+    Size and modified time of a source file, which change when it is
+    replaced.
+    '''
+    stat = os.stat(file)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def pending_files(files, manifest):
+    '''
+    Finds the files that are not in the manifest or have changed since they
+    were processed.
+
+    Args:
+        files (list): Locations of the source files.
+        manifest (dict): Manifest of the component.
+
+    Returns:
+        List of the files that need to be processed.
+
+    Example:
+        pending_files(glob.glob(r'Data/Demographics/*.XPT'), manifest)
+    '''
+    pending = []
+    for file in files:
+        entry = manifest['files'].get(os.path.abspath(file))
+        if entry is None or (entry['size'], entry['mtime_ns']) != _file_key(file):
+            pending.append(file)
+    return pending
+
+
+def check_new_seqn(component_dir, manifest, seqn, skip=()):
+    '''
+    Checks that new SEQN numbers are unique and not already in the stored
+    partitions. Only partitions whose SEQN range overlaps the new numbers are
+    opened, and their sorted SEQN arrays are searched with searchsorted.
+
+    Args:
+        component_dir (str): Folder of the component in the store.
+        manifest (dict): Manifest of the component.
+        seqn (array): Sorted SEQN numbers about to be added.
+        skip (iterable): Source files whose partitions are being replaced and
+            are left out of the check.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If a SEQN is repeated or already stored.
+
+    Example:
+        check_new_seqn('clean_store/Demographics', manifest, np.sort(seqn))
+    '''
+    repeated = seqn[1:][seqn[1:] == seqn[:-1]]
+    if len(repeated):
+        raise ValueError(f'Index has duplicate keys: {np.unique(repeated)[:10]}')
+    if not len(seqn):
+        return
+
+    for file, entry in manifest['files'].items():
+        if file in skip or entry['rows'] == 0:
+            continue
+        if entry['seqn_max'] < seqn[0] or entry['seqn_min'] > seqn[-1]:
+            continue
+        stored = np.load(os.path.join(component_dir, entry['seqn']),
+                         mmap_mode='r')
+        found = np.searchsorted(stored, seqn)
+        found = np.minimum(found, len(stored) - 1)
+        clash = seqn[stored[found] == seqn]
+        if len(clash):
+            raise ValueError(f'Index has duplicate keys: {clash[:10]} are '
+                             f'already stored from {file}')
+
+
+def ingest_component(path, file_str, store_dir, component=None, columns=None,
+                     downcast=False, clean=None, n_jobs=1):
+    '''
+    Adds the new and changed .XPT files of a component folder to the store.
+    Files already in the manifest and unchanged are not read again. Each new
+    file is read, cleaned, checked for SEQN uniqueness and written as its
+    own partition, and the manifest is updated once every partition is on
+    disk. A changed file replaces its old partition.
+
+    Args:
+        path (str): Folder with the component's .XPT files.
+        file_str (str): Search query of which files to find.
+        store_dir (str): Folder of the store.
+        component (str): Name of the component in the store, the name of the
+            folder when None.
+        columns (list): Only these columns are kept from the files, SEQN is
+            always kept. All columns are kept when None.
+        downcast (boolean): Whether to downcast numeric columns while loading.
+        clean (function): Optional function run on each new file's DataFrame,
+            indexed by SEQN, before it is stored. It must keep the index.
+        n_jobs (int): Number of processes to read the files with, -1 uses
+            every core.
+
+    Returns:
+        Dictionary of the files added, the number of files skipped and the
+        number of rows added.
+
+    Raises:
+        ValueError: If a SEQN is repeated or already stored.
+
+    Example:
+        ingest_component(r'Data/Demographics', '*.XPT', 'clean_store',
+                         columns=demo_tokeep, n_jobs=-1)
+    '''
+    component = component or os.path.basename(os.path.normpath(path))
+    component_dir = os.path.join(store_dir, component)
+    os.makedirs(component_dir, exist_ok=True)
+
+    manifest = component_manifest(store_dir, component)
+    files = sorted(glob.glob(os.path.join(path, file_str)))
+    pending = pending_files(files, manifest)
+    summary = {'added': pending, 'skipped': len(files) - len(pending),
+               'rows': 0}
+    if not pending:
+        return summary
+
+    if columns is not None:
+        columns = ['SEQN'] + [col for col in columns if col != 'SEQN']
+    df_files = read_xpt_files(pending, columns=columns, downcast=downcast,
+                              n_jobs=n_jobs)
+
+    # Indexing and cleaning each new file, then checking all of their SEQN
+    # numbers together before anything is written
+    frames = []
+    for df in df_files:
+        df['SEQN'] = df['SEQN'].astype('int64')
+        df = df.set_index('SEQN')
+        if clean is not None:
+            df = clean(df)
+        frames.append(df)
+    replaced = {os.path.abspath(file) for file in pending}
+    new_seqn = np.sort(np.concatenate([df.index.to_numpy(dtype='int64')
+                                       for df in frames]))
+    check_new_seqn(component_dir, manifest, new_seqn, skip=replaced)
+
+    old_partitions = []
+    for file, df in zip(pending, frames):
+        number = manifest['next_partition']
+        manifest['next_partition'] += 1
+        name = f'part-{number:05d}'
+        seqn = np.sort(df.index.to_numpy(dtype='int64'))
+        df.to_parquet(os.path.join(component_dir, f'{name}.parquet'))
+        np.save(os.path.join(component_dir, f'{name}.seqn.npy'), seqn)
+
+        key = os.path.abspath(file)
+        if key in manifest['files']:
+            old_partitions.append(manifest['files'][key])
+        size, mtime_ns = _file_key(file)
+        manifest['files'][key] = {
+            'size': size, 'mtime_ns': mtime_ns,
+            'partition': f'{name}.parquet', 'seqn': f'{name}.seqn.npy',
+            'rows': len(df),
+            'seqn_min': int(seqn[0]) if len(seqn) else None,
+            'seqn_max': int(seqn[-1]) if len(seqn) else None}
+        summary['rows'] += len(df)
+    _save_manifest(store_dir, component, manifest)
+
+    # The replaced partitions are only removed once the manifest no longer
+    # points at them
+    for entry in old_partitions:
+        for name in [entry['partition'], entry['seqn']]:
+            try:
+                os.remove(os.path.join(component_dir, name))
+            except FileNotFoundError:
+                pass
+    return summary
+
+
+def load_component(store_dir, component, columns=None):
+    '''
+    Reads a stored component back into one DataFrame indexed by SEQN, with
+    the partitions in the order they were added.
+
+    Args:
+        store_dir (str): Folder of the store.
+        component (str): Name of the component.
+        columns (list): Only these columns are read, all when None.
+
+    Returns:
+        DataFrame of the component.
+
+    Raises:
+        ValueError: If the component is not in the store.
+
+    Example:
+        demo_clean = load_component('clean_store', 'Demographics')
+    '''
+    manifest = component_manifest(store_dir, component)
+    if not manifest['files']:
+        raise ValueError(f'{component} is not in {store_dir}')
+
+    entries = sorted(manifest['files'].values(),
+                     key=lambda entry: entry['partition'])
+    frames = [pd.read_parquet(os.path.join(store_dir, component,
+                                           entry['partition']),
+                              columns=columns)
+              for entry in entries]
+    return pd.concat(frames)
@@ -0,0 +1,154 @@
+'''
+Functions for reading the NHANES .XPT component files into DataFrames. Files
+can be read in parallel across processes, projected down to only the columns
+that will be kept, and downcast to smaller dtypes while they are loaded.
+Decoded files can also be kept in an on-disk cache so they are only parsed
+once.'''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from project_functions.cache import (cache_path, load_cached, save_cached, 
+                                     evict_cache)
+
+
+# Largest whole number that float32 can hold without losing precision
+FLOAT32_EXACT_MAX = 2 ** 24
+
+# The SAS transport format stores some zeros as values around 5.4e-79
+SAS_ZERO = 1e-70
+
+
+def downcast_frame(df):
+    '''
+    Downcasts the numeric columns of a DataFrame to smaller dtypes without
+    losing any information. Whole number columns with no nulls become the
+    smallest integer type that holds them, whole number columns with nulls
+    become float32 when every value fits exactly, and columns with decimal
+    values are left as float64. The near zero values that SAS writes in place
+    of 0 are counted as 0.
+
+    Args:
+        df (DataFrame): DataFrame to downcast, it is modified in place.
+
+    Returns:
+        The same DataFrame with the downcast dtypes.
+
+    Example:
+        df = downcast_frame(pd.read_sas(file))
+    '''
+
+    for col in df.select_dtypes('float').columns:
+        values = df[col].to_numpy()
+        values = np.where(np.abs(values) < SAS_ZERO, 0.0, values)
+        not_null = values[~np.isnan(values)]
+
+        # Columns with decimals would lose information so they are kept
+        if (not_null != np.round(not_null)).any():
+            continue
+
+        if len(not_null) == len(values):
+            df[col] = pd.to_numeric(values, downcast='integer')
+        elif len(not_null) == 0 or np.abs(not_null).max() < FLOAT32_EXACT_MAX:
+            df[col] = values.astype('float32')
+    return df
+
+
+def read_xpt(file, columns=None, downcast=False, chunksize=None, 
+             cache_dir=None):
+    '''
+    Reads a single .XPT file into a DataFrame, keeping only the requested
+    columns. The SAS reader has no way to skip columns, so when a chunksize
+    is given the file is read in pieces and each piece is projected before
+    the next one is read, which keeps the unwanted columns from ever being
+    held for the whole file. When a cache folder is given the decoded file is
+    served from the cache if it is there and stored in it if it is not.
+
+    Args:
+        file (str): Location of the .XPT file.
+        columns (list): Columns to keep, columns missing from the file are
+            skipped. All columns are kept when None.
+        downcast (boolean): Whether to downcast the numeric columns.
+        chunksize (int): Number of rows to read at a time, the whole file is
+            read at once when None.
+        cache_dir (str): Folder of the on-disk cache, no cache when None.
+
+    Returns:
+        DataFrame of the file with only the requested columns.
+
+    Example:
+        df = read_xpt(r'Data/Demographics/DEMO_H.XPT', columns=['SEQN'])
+    '''
+
+    # A cache hit skips parsing the SAS file completely
+    if cache_dir is not None:
+        entry = cache_path(cache_dir, file, columns, downcast)
+        if os.path.exists(entry):
+            return load_cached(entry)
+
+    if chunksize is None:
+        chunks = [pd.read_sas(file, format='xport')]
+    else:
+        chunks = pd.read_sas(file, format='xport', chunksize=chunksize)
+
+    # Projecting each chunk down to the columns that are wanted
+    keep = None if columns is None else set(columns)
+    pieces = []
+    for chunk in chunks:
+        if keep is not None:
+            chunk = chunk.reindex(columns=[col for col in chunk.columns
+                                         if col in keep])
+        pieces.append(chunk)
+
+    df = pieces[0] if len(pieces) == 1 else pd.concat(pieces,
+                                                      ignore_index=True)
+    if downcast:
+        df = downcast_frame(df)
+    if cache_dir is not None:
+        save_cached(df, entry)
+    return df
+
+
+def read_xpt_files(files, columns=None, downcast=False, chunksize=None,
+                   n_jobs=1, cache_dir=None, max_cache_bytes=None):
+    '''
+    Reads a list of .XPT files into a list of DataFrames, using a pool of
+    processes when more than one job is requested. Once every file is read
+    the cache is trimmed back to its size limit.
+
+    Args:
+        files (list): Locations of the .XPT files.
+        columns (list): Columns to keep from each file, all when None.
+        downcast (boolean): Whether to downcast the numeric columns.
+        chunksize (int): Number of rows to read at a time from each file.
+        n_jobs (int): Number of processes to read with, -1 uses every core.
+        cache_dir (str): Folder of the on-disk cache, no cache when None.
+        max_cache_bytes (int): Size limit of the cache, no limit when None.
+
+    Returns:
+        List of DataFrames in the same order as the files.
+
+    Example:
+        df_files = read_xpt_files(files, columns=demo_tokeep, n_jobs=-1)
+    '''
+
+    if n_jobs is None or n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(files))
+
+    if n_jobs <= 1:
+        df_files = [read_xpt(file, columns, downcast, chunksize, cache_dir) 
+                    for file in files]
+    else:
+        # Each process reads whole files so only the projected frames are 
+        # sent back
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(read_xpt, file, columns, downcast,
+                                       chunksize, cache_dir) for file in files]
+            df_files = [future.result() for future in futures]
+
+    # Evicting here rather than in the workers so they never race each other
+    if cache_dir is not None and max_cache_bytes is not None:
+        evict_cache(cache_dir, max_cache_bytes)
+    return df_files
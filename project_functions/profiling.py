@@ -0,0 +1,158 @@
+'''
+A quick profile of every column of a DataFrame, to look over a component
+before cleaning it without displaying a value count for each column like
+val_counts does. Each column is counted once: categorical columns with a
+bincount of their codes, answer codes stored as small whole numbers with a
+bincount of the values and anything else with the pandas hash table. The
+null count, number of distinct values, minimum and maximum are then worked
+out from the counts and the few distinct values, and the results go into
+one summary DataFrame.'''
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+def _small_int_counts(array, limit=1024):
+    '''
+    Counts of a numeric column that only holds small whole numbers from 0 up,
+    like the survey answer codes, straight from a bincount without hashing.
+    Returns None for any other column.
+    '''
+    if array.dtype.kind not in 'biuf' or not len(array):
+        return None
+    finite = array
+    nulls = 0
+    if array.dtype.kind == 'f':
+        missing = np.isnan(array)
+        nulls = int(missing.sum())
+        if nulls:
+            finite = array[~missing]
+        if not len(finite):
+            return None
+    if finite.min() < 0 or finite.max() >= limit:
+        return None
+    whole = finite.astype('int64')
+    if array.dtype.kind == 'f' and (whole != finite).any():
+        return None
+    counts = np.bincount(whole)
+    present = np.flatnonzero(counts)
+    return present.astype(array.dtype), counts[present], nulls
+
+
+def _column_counts(values):
+    '''
+    Distinct values of a column, how many times each appears, sorted from
+    most to least common, and the number of nulls. Categorical columns
+    already have codes, small whole numbers are counted directly and any
+    other column goes through the pandas hash table once.
+    '''
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Nulls have the code -1, so shifting by one counts them first
+        counts = np.bincount(values.cat.codes.to_numpy() + 1,
+                             minlength=len(values.cat.categories) + 1)
+        nulls = int(counts[0])
+        present = np.flatnonzero(counts[1:])
+        uniques = pd.Categorical.from_codes(present, dtype=values.dtype)
+        counts = counts[1:][present]
+    else:
+        small = _small_int_counts(values.to_numpy())
+        if small is None:
+            counted = values.value_counts(sort=False, dropna=True)
+            uniques, counts = counted.index, counted.to_numpy()
+            nulls = int(values.isna().sum())
+        else:
+            uniques, counts, nulls = small
+    order = np.argsort(-counts, kind='stable')
+    return uniques.take(order), counts[order], nulls
+
+
+def _min_max(uniques):
+    '''
+    Smallest and largest of the distinct values, or None when they can not be
+    compared with each other.
+    '''
+    if not len(uniques):
+        return None, None
+    try:
+        ordered = pd.Index(uniques).sort_values()
+    except TypeError:
+        return None, None
+    return ordered[0], ordered[-1]
+
+
+def profile_column(values, top=5):
+    '''
+    Profiles one column.
+
+    Args:
+        values (Series): Column to profile.
+        top (int): Number of the most common values to list.
+
+    Returns:
+        Dictionary of the dtype, number of rows, nulls and percent null,
+        number of distinct values, minimum, maximum, the most common values
+        and the percent of rows they cover, and the full value counts.
+
+    Example:
+        profile_column(demo_df['DMDCITZN'])
+    '''
+    uniques, counts, nulls = _column_counts(values)
+    smallest, largest = _min_max(uniques)
+    rows = len(values)
+    return {'dtype': str(values.dtype),
+            'rows': rows,
+            'nulls': nulls,
+            'null_pct': round(100 * nulls / rows, 2) if rows else np.nan,
+            'unique': len(uniques),
+            'min': smallest,
+            'max': largest,
+            'top': ', '.join(f'{value}: {count}' for value, count
+                             in zip(uniques[:top], counts[:top])),
+            'top_pct': (round(100 * counts[:top].sum() / rows, 2) if rows
+                        else np.nan),
+            'counts': pd.Series(counts, index=uniques, name=values.name)}
+
+
+def profile_frame(df, top=5, n_jobs=1, counts=False):
+    '''
+    Profiles every column of a DataFrame in one pass per column, optionally
+    with a pool of threads across the columns, and puts the results in one
+    summary DataFrame instead of displaying each column's value counts.
+
+    Args:
+        df (DataFrame): DataFrame to profile.
+        top (int): Number of the most common values to list for each column.
+        n_jobs (int): Number of columns to profile at once, -1 uses every
+            core.
+        counts (boolean): Whether to also return every column's value counts.
+
+    Returns:
+        DataFrame with a row per column of the dtype, rows, nulls, percent
+        null, number of distinct values, minimum, maximum, most common values
+        and the percent of rows they cover. When counts is True, also a
+        dictionary of column name to its value counts with nulls left out.
+
+    Example:
+        summary = profile_frame(demo_df, n_jobs=-1)
+        summary.sort_values('null_pct', ascending=False).head(20)
+    '''
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    if n_jobs <= 1:
+        profiles = [profile_column(df[col], top) for col in df.columns]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            profiles = list(executor.map(lambda col: profile_column(df[col],
+                                                                    top),
+                                         df.columns))
+
+    value_counts = {col: profile.pop('counts')
+                    for col, profile in zip(df.columns, profiles)}
+    summary = pd.DataFrame(profiles, index=pd.Index(df.columns,
+                                                    name='column'))
+    if counts:
+        return summary, value_counts
+    return summary
@@ -0,0 +1,175 @@
+'''
+A declarative way to recode the numeric survey answer codes. Instead of a
+chain of replace, fillna and astype calls that each rewrite an object
+column, the recodes are written once as a spec and applied in one pass per
+column. Each column's distinct values are found with pd.factorize, the
+small set of distinct values is recoded, and the result is built straight
+into a Categorical or the smallest integer dtype.
+
+A spec is a dictionary of column name to rule, where a rule can have:
+
+    codes    dictionary of answer code to new value, codes not listed are
+             kept as they are like with replace
+    missing  list of codes that mean the answer is missing, such as the
+             7/9 and 77/99 refused and don't know codes
+    fill     value for nulls and missing codes, left null when not given
+    dtype    'category' for labels, 'int' for the smallest integer dtype
+             that fits, or any pandas dtype, including the nullable ones
+             like 'Int8'. 'int' picks the nullable integer dtype of that
+             size when nulls are left. When not given labels become
+             'category', whole numbers 'int' and other numbers 'float64'
+
+For example the notebook's citizenship cleaning is
+
+    {'citizenship': {'codes': {1: 'Citizen', 2: 'Not Citizen'},
+                     'missing': [7, 9], 'fill': 'Missing'}}
+'''
+
+import warnings
+import numpy as np
+import pandas as pd
+
+
+def _is_label(value):
+    '''
+    Whether a recoded value is a text label rather than a number.
+    '''
+    return isinstance(value, str)
+
+
+def recode_column(values, rule):
+    '''
+    Recodes one column with a rule from a spec.
+
+    Args:
+        values (Series): Column of answer codes.
+        rule (dict): Rule with the 'codes', 'missing', 'fill' and 'dtype'
+            keys described in the module docstring, all optional.
+
+    Returns:
+        Series of the recoded column with the same index.
+
+    Raises:
+        ValueError: If the 'int' dtype is asked for but some values are not
+            whole numbers.
+
+    Example:
+        recode_column(demo_clean['pregnant'],
+                      {'codes': {1: 'Yes', 2: 'No'}, 'missing': [3],
+                       'fill': 'Missing'})
+    '''
+    codes = rule.get('codes', {})
+    missing = set(rule.get('missing', []))
+    fill = rule.get('fill', np.nan)
+
+    # Recoding only the distinct values, not every row
+    positions, uniques = pd.factorize(values)
+    recoded = []
+    for value in uniques:
+        if value in missing:
+            recoded.append(fill)
+        else:
+            recoded.append(codes.get(value, value))
+    has_nulls = (positions == -1).any()
+
+    dtype = rule.get('dtype')
+    if dtype is None and any(_is_label(value) for value in recoded + [fill]):
+        dtype = 'category'
+
+    if dtype == 'category':
+        # Building the categories from the recoded values keeps equal labels,
+        # like 7 and 9 both becoming 'Missing', as one category
+        fill_null = not pd.isna(fill)
+        if fill_null and has_nulls:
+            recoded.append(fill)
+            positions = np.where(positions == -1, len(recoded) - 1, positions)
+        label_codes, categories = pd.factorize(pd.Series(recoded,
+                                                         dtype=object))
+        label_codes = np.append(label_codes, -1)
+        result = pd.Categorical.from_codes(label_codes[positions], categories)
+        return pd.Series(result, index=values.index, name=values.name)
+
+    recoded = np.array(recoded, dtype='float64')
+    if has_nulls:
+        recoded = np.append(recoded, fill)
+        positions = np.where(positions == -1, len(recoded) - 1, positions)
+
+    # Numbers stay floats unless every one of them is whole, like the
+    # chained replace and fillna left them
+    whole = np.isnan(recoded) | (recoded == np.round(recoded))
+    if dtype is None:
+        dtype = 'int' if whole.all() else 'float64'
+    if dtype == 'int' and not whole.all():
+        raise ValueError(f'{values.name} has values that are not whole '
+                         f'numbers, give a float dtype')
+
+    # Picking the dtype from the few distinct values, then filling the rows
+    recoded = pd.Series(recoded)
+    if dtype == 'int':
+        nulls = recoded.isna()
+        smallest = pd.to_numeric(recoded[~nulls].astype('int64'),
+                                 downcast='integer').dtype
+        if nulls.any():
+            # The nullable version of the same size, like Int8 for int8
+            recoded = recoded.astype(smallest.name.capitalize())
+        else:
+            recoded = recoded.astype(smallest)
+    else:
+        recoded = recoded.astype(dtype)
+    return pd.Series(recoded.array.take(positions), index=values.index,
+                     name=values.name)
+
+
+def apply_recodes(df, spec, copy=True):
+    '''
+    Recodes every column in a spec. Columns not in the spec are left alone.
+
+    Args:
+        df (DataFrame): DataFrame with the answer code columns.
+        spec (dict): Dictionary of column name to rule.
+        copy (boolean): Whether to recode a copy instead of df itself.
+
+    Returns:
+        DataFrame with the recoded columns.
+
+    Example:
+        demo_clean = apply_recodes(demo_clean, DEMO_RECODES)
+    '''
+    missing = [col for col in spec if col not in df.columns]
+    if missing:
+        warnings.warn(f'Columns not in the DataFrame were skipped: {missing}')
+
+    if copy:
+        df = df.copy()
+    for col, rule in spec.items():
+        if col in df.columns:
+            df[col] = recode_column(df[col], rule)
+    return df
+
+
+def memory_report(before, after):
+    '''
+    Compares the memory used by each column before and after recoding.
+
+    Args:
+        before (DataFrame): Columns as they were, such as the object columns
+            the chained replace calls make.
+        after (DataFrame): Columns after recoding.
+
+    Returns:
+        DataFrame with the dtype and MB of each column before and after and
+        how many times smaller it got, with a 'Total' row at the end.
+
+    Example:
+        memory_report(old_demo_clean, apply_recodes(demo_clean, spec))
+    '''
+    cols = [col for col in after.columns if col in before.columns]
+    report = pd.DataFrame({
+        'dtype_before': before[cols].dtypes.astype(str),
+        'dtype_after': after[cols].dtypes.astype(str),
+        'mb_before': before[cols].memory_usage(index=False, deep=True) / 1e6,
+        'mb_after': after[cols].memory_usage(index=False, deep=True) / 1e6})
+    report.loc['Total'] = ['', '', report['mb_before'].sum(),
+                           report['mb_after'].sum()]
+    report['times_smaller'] = report['mb_before'] / report['mb_after']
+    return report.round(3)
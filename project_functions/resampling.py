@@ -0,0 +1,251 @@
+'''
+The resampling stage of the notebooks, random undersampling of the majority
+class followed by SMOTENC style oversampling of the minority class, written
+with NumPy. New minority rows are placed between a row and one of its
+nearest minority neighbours on the continuous columns, with a neighbour
+index built once on the continuous columns only, and each categorical
+column takes the most common value among the neighbours, counted for every
+new row at once. The resampled X and y are saved together in one .npz file
+named after a fingerprint of the input and the settings, so later sessions
+load them instead of resampling again.'''
+
+import os
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+from project_functions.tuning import data_fingerprint
+
+# Changing how the rows are generated changes this, so old files are not used
+RESAMPLE_FORMAT = 1
+
+
+def _as_frame(X):
+    '''
+    The feature table as a DataFrame, arrays get numbered columns.
+    '''
+    if isinstance(X, pd.DataFrame):
+        return X
+    return pd.DataFrame(np.asarray(X))
+
+
+def _categorical_mask(X, categorical):
+    '''
+    Boolean mask of the categorical columns from a mask or a list of names.
+    '''
+    categorical = list(categorical)
+    is_mask = all(isinstance(flag, (bool, np.bool_)) for flag in categorical)
+    if is_mask and len(categorical) == X.shape[1]:
+        return np.array(categorical, dtype=bool)
+    missing = [col for col in categorical if col not in X.columns]
+    if missing:
+        raise ValueError(f'Categorical columns not in X: {missing[:10]}')
+    return X.columns.isin(categorical)
+
+
+def _class_counts(y):
+    '''
+    Labels of the minority and majority class and their counts.
+    '''
+    labels, counts = np.unique(y, return_counts=True)
+    if len(labels) != 2:
+        raise ValueError(f'y must have two classes, it has {len(labels)}')
+    minority, majority = np.argsort(counts, kind='stable')
+    return (labels[minority], counts[minority], labels[majority],
+            counts[majority])
+
+
+def undersample(X, y, sampling_strategy=.25, random_state=123):
+    '''
+    Randomly drops majority class rows until the minority class is the given
+    fraction of the majority class, like RandomUnderSampler.
+
+    Args:
+        X (dataframe or array): feature columns of the training set
+        y (series or array): target column of the training set
+        sampling_strategy (float): Minority rows per majority row to keep
+        random_state (int): Seed of the rows kept
+
+    Returns:
+        The kept rows of X as a DataFrame and of y as a Series, in their
+        original order and with a new index.
+
+    Example:
+        X_train_under, y_train_under = undersample(X_train_final, y_train)
+    '''
+    X = _as_frame(X)
+    y_values = np.asarray(y)
+    _, n_minority, majority, n_majority = _class_counts(y_values)
+    keep_majority = min(n_majority, int(n_minority / sampling_strategy))
+
+    # Picking the majority rows to keep and keeping every other row
+    rng = np.random.default_rng(random_state)
+    majority_rows = np.flatnonzero(y_values == majority)
+    dropped = rng.choice(majority_rows, n_majority - keep_majority,
+                         replace=False)
+    keep = np.ones(len(y_values), dtype=bool)
+    keep[dropped] = False
+
+    X_under = X[keep].reset_index(drop=True)
+    y_under = pd.Series(y_values[keep], name=getattr(y, 'name', None))
+    return X_under, y_under
+
+
+def _mode_of_neighbors(values, neighbors):
+    '''
+    Most common value among each new row's neighbours for one categorical
+    column, found with one bincount over the row and value codes. Ties go to
+    the value seen first, and nulls count as a value of their own.
+    '''
+    codes, uniques = pd.factorize(values)
+    nulls = codes == -1
+    if nulls.any():
+        # Giving nulls the code after the last value, since bincount cannot
+        # take the -1 factorize gives them
+        codes = np.where(nulls, len(uniques), codes)
+        uniques = np.append(uniques, values[nulls][:1])
+    neighbor_codes = codes[neighbors]
+    n_rows, n_values = len(neighbors), len(uniques)
+    counts = np.bincount((np.arange(n_rows)[:, None] * n_values
+                          + neighbor_codes).ravel(),
+                         minlength=n_rows * n_values)
+    return uniques.take(counts.reshape(n_rows, n_values).argmax(axis=1))
+
+
+def oversample(X, y, categorical, k_neighbors=5, random_state=123,
+               n_jobs=None):
+    '''
+    Adds synthetic minority class rows until both classes are the same size,
+    the way SMOTENC does. The nearest neighbours are searched for on the
+    continuous columns only, and each categorical column of a new row is
+    the most common value among its neighbours.
+
+    Args:
+        X (dataframe or array): feature columns of the training set
+        y (series or array): target column of the training set
+        categorical (list): Boolean mask of the categorical columns, like the
+            notebook's mask, or their names
+        k_neighbors (int): Number of neighbours of each minority row
+        random_state (int): Seed of the new rows
+        n_jobs (int): Number of jobs of the neighbour search, -1 uses every
+            core
+
+    Returns:
+        DataFrame of X with the new rows after the original ones and a
+        Series of y to match.
+
+    Raises:
+        ValueError: If every column is categorical, y does not have two
+            classes or the minority class has a single row.
+
+    Example:
+        X_train_smote, y_train_smote = oversample(X_train_final, y_train,
+                                                  mask)
+    '''
+    X = _as_frame(X)
+    y_values = np.asarray(y)
+    is_cat = _categorical_mask(X, categorical)
+    if is_cat.all():
+        raise ValueError('At least one column has to be continuous')
+    minority, n_minority, _, n_majority = _class_counts(y_values)
+    n_new = n_majority - n_minority
+    if n_minority < 2:
+        raise ValueError('The minority class needs at least 2 rows to have '
+                         'neighbours')
+
+    minority_X = X[y_values == minority]
+    continuous = minority_X.loc[:, ~is_cat].to_numpy(dtype='float64')
+
+    # Building the neighbour index once on the continuous columns, the first
+    # neighbour found for a row is the row itself
+    k_neighbors = min(k_neighbors, n_minority - 1)
+    index = NearestNeighbors(n_neighbors=k_neighbors + 1, n_jobs=n_jobs)
+    index.fit(continuous)
+    neighbors = index.kneighbors(continuous, return_distance=False)[:, 1:]
+
+    # Placing each new row a random step from a minority row towards one of
+    # its neighbours
+    rng = np.random.default_rng(random_state)
+    rows = rng.integers(0, n_minority, n_new)
+    picked = neighbors[rows, rng.integers(0, k_neighbors, n_new)]
+    steps = rng.random((n_new, 1))
+    new_continuous = (continuous[rows]
+                      + steps * (continuous[picked] - continuous[rows]))
+
+    new_rows = {}
+    continuous_cols = iter(range(continuous.shape[1]))
+    for col, cat in zip(X.columns, is_cat):
+        if cat:
+            new_rows[col] = _mode_of_neighbors(minority_X[col].to_numpy(),
+                                               neighbors[rows])
+        else:
+            new_rows[col] = new_continuous[:, next(continuous_cols)]
+    new_X = pd.DataFrame(new_rows).astype(X.dtypes.to_dict())
+
+    X_res = pd.concat([X, new_X], ignore_index=True)
+    y_res = pd.Series(np.concatenate([y_values,
+                                      np.full(n_new, minority,
+                                              dtype=y_values.dtype)]),
+                      name=getattr(y, 'name', None))
+    return X_res, y_res
+
+
+def resample(X, y, categorical, sampling_strategy=.25, k_neighbors=5,
+             random_state=123, cache_dir='.resample_cache', n_jobs=None):
+    '''
+    Runs the resampling stage, undersampling then oversampling, or loads its
+    output from the cache folder when the same input was resampled with the
+    same settings before. The output is saved as one .npz file of X, y and
+    the column dtypes.
+
+    Args:
+        X (dataframe or array): feature columns of the training set
+        y (series or array): target column of the training set
+        categorical (list): Boolean mask of the categorical columns or their
+            names
+        sampling_strategy (float): Minority rows per majority row to keep
+            when undersampling, no undersampling when None
+        k_neighbors (int): Number of neighbours of each minority row
+        random_state (int): Seed of both steps
+        cache_dir (str): Folder of the saved outputs, nothing is saved when
+            None
+        n_jobs (int): Number of jobs of the neighbour search, -1 uses every
+            core
+
+    Returns:
+        The resampled X as a DataFrame and y as a Series.
+
+    Example:
+        X_train_resample, y_train_resample = resample(X_train_final, y_train,
+                                                      mask)
+    '''
+    X = _as_frame(X)
+    mask = _categorical_mask(X, categorical)
+    settings = json.dumps([RESAMPLE_FORMAT, data_fingerprint(X, y),
+                           mask.tolist(), sampling_strategy, k_neighbors,
+                           random_state])
+    key = hashlib.sha1(settings.encode('utf-8')).hexdigest()[:24]
+    path = None if cache_dir is None else os.path.join(cache_dir,
+                                                       f'{key}.npz')
+
+    if path is not None and os.path.exists(path):
+        # Object columns are pickled inside the file, which is only ever
+        # written by this function
+        with np.load(path, allow_pickle=True) as saved:
+            X_res = pd.DataFrame(saved['X'], columns=X.columns)
+            X_res = X_res.astype(dict(zip(X.columns, saved['dtypes'])))
+            y_res = pd.Series(saved['y'], name=getattr(y, 'name', None))
+        return X_res, y_res
+
+    if sampling_strategy is not None:
+        X, y = undersample(X, y, sampling_strategy, random_state)
+    X_res, y_res = oversample(X, y, mask, k_neighbors, random_state, n_jobs)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(temp, X=X_res.to_numpy(), y=y_res.to_numpy(),
+                 dtypes=np.array([str(dtype) for dtype in X_res.dtypes]))
+        os.replace(temp, path)
+    return X_res, y_res
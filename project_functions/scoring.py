@@ -0,0 +1,284 @@
+'''
+Functions for scoring new patient records with the fitted preprocessing and
+model from the modeling notebook. A scoring pipeline is a dictionary holding
+the fitted OneHotEncoder for the text columns, the QuantileTransformer for
+the numerical columns including the Rx features, the KMeans model that adds
+the 'Cluster' column and the classifier, along with the column lists they
+were fitted on.'''
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import OneHotEncoder, QuantileTransformer
+
+
+def make_pipeline(encoder, transformer, kmeans, model, ohe_cols, scale_cols,
+                  threshold=.5, dtypes=None):
+    '''
+    Bundles already fitted preprocessing objects and a classifier, like the
+    ones in the modeling notebook, into a scoring pipeline.
+
+    Args:
+        encoder (OneHotEncoder): Encoder fitted on the text columns.
+        transformer (QuantileTransformer): Transformer fitted on the numerical
+            columns.
+        kmeans (KMeans): Cluster model fitted on the encoded and transformed
+            columns.
+        model (classifier): Classifier fitted on the final features.
+        ohe_cols (list): Text columns in the order the encoder was fitted on.
+        scale_cols (list): Numerical columns in the order the transformer was
+            fitted on.
+        threshold (float): Score at or above which a person is predicted to
+            be depressed.
+        dtypes (dict): Dtype of each input column as text, recorded when
+            the pipeline is saved.
+
+    Returns:
+        Dictionary of the scoring pipeline.
+
+    Example:
+        pipeline = make_pipeline(encoder, transformer, k_model, logreg_smote2,
+                                 ohe_cols, scale_cols)
+    '''
+    return {'encoder': encoder, 'transformer': transformer, 'kmeans': kmeans,
+            'model': model, 'ohe_cols': list(ohe_cols),
+            'scale_cols': list(scale_cols), 'threshold': threshold,
+            'dtypes': dtypes}
+
+
+def fit_pipeline(X_train, y_train, model, n_clusters=5, random_state=123,
+                 resampler=None):
+    '''
+    Fits the notebook's preprocessing and a classifier on training data and
+    bundles them into a scoring pipeline. Text columns are one hot encoded,
+    numerical columns are quantile transformed and a KMeans cluster column
+    is added before the classifier is fitted.
+
+    Args:
+        X_train (DataFrame): Training features, such as FullData.csv without
+            the target.
+        y_train (Series): Training labels, 1 for depressed.
+        model (classifier): Unfitted classifier.
+        n_clusters (int): Number of KMeans clusters.
+        random_state (int): Seed for the transformer and KMeans.
+        resampler (sampler): Optional sampler with a fit_resample method,
+            such as RandomUnderSampler, used on the final features before
+            the classifier is fitted.
+
+    Returns:
+        Dictionary of the scoring pipeline.
+
+    Example:
+        pipeline = fit_pipeline(X_train, y_train, LogisticRegression())
+    '''
+    ohe_cols = list(X_train.select_dtypes('O').columns)
+    scale_cols = list(X_train.select_dtypes('number').columns)
+
+    encoder = OneHotEncoder(handle_unknown='ignore').fit(X_train[ohe_cols])
+    transformer = QuantileTransformer(random_state=random_state)
+    transformer.fit(X_train[scale_cols])
+    dtypes = {col: str(X_train[col].dtype) for col in ohe_cols + scale_cols}
+    pipeline = make_pipeline(encoder, transformer, None, model, ohe_cols,
+                             scale_cols, dtypes=dtypes)
+
+    # The clusters are fitted on the encoded and transformed columns
+    X_tf = _encoded(pipeline, X_train)
+    pipeline['kmeans'] = KMeans(n_clusters, random_state=random_state,
+                                n_init=10).fit(X_tf)
+
+    X_final = np.column_stack([X_tf, pipeline['kmeans'].predict(X_tf)])
+    y_final = np.asarray(y_train)
+    if resampler is not None:
+        X_final, y_final = resampler.fit_resample(X_final, y_final)
+    model.fit(X_final, y_final)
+    return pipeline
+
+
+def feature_names(pipeline):
+    '''
+    Names of the final features in the order the classifier sees them.
+
+    Args:
+        pipeline (dict): Scoring pipeline.
+
+    Returns:
+        List of the feature names.
+
+    Example:
+        plot_top_features(pipeline['model'], feature_names(pipeline))
+    '''
+    encoder = pipeline['encoder']
+    if hasattr(encoder, 'get_feature_names_out'):
+        ohe_names = encoder.get_feature_names_out(pipeline['ohe_cols'])
+    else:
+        ohe_names = encoder.get_feature_names(pipeline['ohe_cols'])
+    return list(ohe_names) + pipeline['scale_cols'] + ['Cluster']
+
+
+def _dtype_kind(dtype):
+    '''
+    Kind of values a dtype holds: 'number' for numbers and booleans,
+    'datetime' for dates and 'text' for anything else, including category.
+    A dtype recorded as text that pandas does not know counts as text.
+    '''
+    try:
+        dtype = pd.api.types.pandas_dtype(dtype)
+    except TypeError:
+        return 'text'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if pd.api.types.is_bool_dtype(dtype) or \
+            pd.api.types.is_numeric_dtype(dtype):
+        return 'number'
+    return 'text'
+
+
+def _holds_text(values):
+    '''
+    Whether a text column only holds strings and nulls, since an object
+    column can hold numbers the encoder would silently ignore.
+    '''
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.categories
+    elif not pd.api.types.is_object_dtype(values):
+        return True
+    return pd.api.types.infer_dtype(values, skipna=True) in ('string',
+                                                             'empty')
+
+
+def check_schema(pipeline, df):
+    '''
+    Checks that a table has the columns the pipeline was fitted on with
+    compatible dtypes, so a file with a changed layout fails right away
+    instead of being scored wrong. Each column must hold the same kind of
+    values, text, numbers or dates, as the dtype recorded for it in
+    pipeline['dtypes'], and text columns must only hold strings. Integer
+    and float columns are compatible. Pipelines saved without dtypes only
+    check that text columns are not numerical and numerical columns are.
+    Extra columns, like the target, are allowed.
+
+    Args:
+        pipeline (dict): Scoring pipeline.
+        df (DataFrame): Table to check, such as FullData.csv.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If columns are missing or have the wrong kind of dtype.
+
+    Example:
+        check_schema(pipeline, pd.read_csv('FullData.csv', index_col='SEQN'))
+    '''
+    missing = [col for col in pipeline['ohe_cols'] + pipeline['scale_cols']
+               if col not in df.columns]
+    if missing:
+        raise ValueError(f'Missing {len(missing)} columns: {missing[:10]}')
+
+    # The recorded dtypes, over the kind each column list stands for
+    dtypes = {col: 'object' for col in pipeline['ohe_cols']}
+    dtypes.update({col: 'float64' for col in pipeline['scale_cols']})
+    dtypes.update(pipeline.get('dtypes') or {})
+
+    wrong = []
+    for col in pipeline['ohe_cols'] + pipeline['scale_cols']:
+        kind = _dtype_kind(dtypes[col])
+        if _dtype_kind(df[col].dtype) != kind:
+            wrong.append(f'{col} ({df[col].dtype}, expected {dtypes[col]})')
+        elif kind == 'text' and not _holds_text(df[col]):
+            wrong.append(f'{col} (not all text, expected {dtypes[col]})')
+    if wrong:
+        raise ValueError(f'Columns with the wrong dtype: {wrong[:10]}')
+
+
+def prepare_records(pipeline, records):
+    '''
+    Puts records into a DataFrame with the columns the pipeline was fitted
+    on, in order. Missing 'Rx_' columns mean the medication is not taken and
+    are filled with 0, any other missing column is an error.
+
+    Args:
+        pipeline (dict): Scoring pipeline.
+        records (DataFrame, dict or list): One record as a dictionary, a list
+            of them or a DataFrame.
+
+    Returns:
+        DataFrame with the pipeline's columns.
+
+    Raises:
+        ValueError: If a column other than an 'Rx_' column is missing.
+
+    Example:
+        X = prepare_records(pipeline, {'gender': 'Female', 'age': 40, ...})
+    '''
+    if isinstance(records, dict):
+        records = [records]
+    if not isinstance(records, pd.DataFrame):
+        records = pd.DataFrame.from_records(records)
+
+    columns = pipeline['ohe_cols'] + pipeline['scale_cols']
+    missing = [col for col in columns if col not in records.columns]
+    required = [col for col in missing if not col.startswith('Rx_')]
+    if required:
+        raise ValueError(f'Records are missing columns: {required}')
+    if missing:
+        records = records.assign(**{col: 0 for col in missing})
+    return records[columns]
+
+
+def _encoded(pipeline, X):
+    '''
+    Encoded text columns followed by the transformed numerical columns, the
+    features the cluster model was fitted on.
+    '''
+    ohe = pipeline['encoder'].transform(X[pipeline['ohe_cols']])
+    if sparse.issparse(ohe):
+        ohe = ohe.toarray()
+    scaled = pipeline['transformer'].transform(X[pipeline['scale_cols']])
+    return np.hstack([ohe, scaled])
+
+
+def transform_features(pipeline, X):
+    '''
+    Runs records through the preprocessing to get the features the classifier
+    takes: the one hot encoded text columns, the quantile transformed
+    numerical columns and the cluster.
+
+    Args:
+        pipeline (dict): Scoring pipeline.
+        X (DataFrame): Records with the pipeline's columns.
+
+    Returns:
+        Array of the final features, in the order of feature_names.
+
+    Example:
+        X_test_final = transform_features(pipeline, X_test)
+    '''
+    X_tf = _encoded(pipeline, X)
+    return np.column_stack([X_tf, pipeline['kmeans'].predict(X_tf)])
+
+
+def score_frame(pipeline, X):
+    '''
+    Scores records with the pipeline in one vectorized pass, after checking
+    them with check_schema.
+
+    Args:
+        pipeline (dict): Scoring pipeline.
+        X (DataFrame, dict or list): Records to score, see prepare_records.
+
+    Returns:
+        Array of the probability of depression for each record.
+
+    Raises:
+        ValueError: If columns are missing or have the wrong kind of dtype.
+
+    Example:
+        scores = score_frame(pipeline, X_test)
+        preds = scores >= pipeline['threshold']
+    '''
+    X = prepare_records(pipeline, X)
+    check_schema(pipeline, X)
+    features = transform_features(pipeline, X)
+    return pipeline['model'].predict_proba(features)[:, 1]
@@ -0,0 +1,326 @@
+'''
+A local HTTP service that scores patient records with a scoring pipeline
+kept in memory. Requests that arrive together are coalesced into one
+vectorized predict_proba call by a background thread, and the latency of
+every request is recorded so the p50 and p99 can be read from /metrics.
+Requests that fail are timed apart from the scored ones, so quick rejects
+do not pull the scoring percentiles down.
+
+    POST /score    a record, a list of records or {"records": [...]}
+    GET  /metrics  request count and latency percentiles in milliseconds
+    GET  /health   "ok" once the pipeline is loaded
+
+    python -m project_functions.serving artifacts/logreg --port 8000
+'''
+
+import argparse
+import json
+import queue
+import threading
+import sys
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from project_functions.scoring import (check_schema, prepare_records,
+                                       score_frame)
+from project_functions.artifact import load_artifact
+from project_functions.tracing import trace_package
+
+
+def new_metrics(window=10000):
+    '''
+    Creates the latency record for a server, keeping the most recent
+    requests.
+
+    Args:
+        window (int): Number of recent requests the percentiles cover.
+
+    Returns:
+        Dictionary of the latencies of scored and failed requests, batch
+        sizes, counts and a lock.
+
+    Example:
+        metrics = new_metrics()
+    '''
+    return {'latencies': deque(maxlen=window), 
+            'error_latencies': deque(maxlen=window),
+            'batch_rows': deque(maxlen=window),
+            'count': 0, 'errors': 0, 'lock': threading.Lock()}
+
+
+def record_latency(metrics, seconds, error=False):
+    '''
+    Adds the latency of one request to the metrics, to the failed requests'
+    series when it ended in an error.
+    '''
+    with metrics['lock']:
+        metrics['error_latencies' if error else 'latencies'].append(seconds)
+        metrics['count'] += 1
+        metrics['errors'] += int(error)
+
+
+def latency_summary(metrics):
+    '''
+    Summarizes the recorded requests.
+
+    Args:
+        metrics (dict): Metrics from new_metrics.
+
+    Returns:
+        Dictionary of the request and error counts, the p50, p99 and max
+        latency in milliseconds of the scored requests, the p50 and p99 of
+        the failed ones and the mean rows per model call.
+
+    Example:
+        latency_summary(server.metrics)
+    '''
+    with metrics['lock']:
+        latencies = np.array(metrics['latencies'])
+        error_latencies = np.array(metrics['error_latencies'])
+        batch_rows = np.array(metrics['batch_rows'])
+        summary = {'requests': metrics['count'], 'errors': metrics['errors']}
+
+    if len(latencies):
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        summary.update({'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3),
+                        'max_ms': round(latencies.max() * 1000, 3)})
+    if len(error_latencies):
+        p50, p99 = np.percentile(error_latencies, [50, 99]) * 1000
+        summary.update({'error_p50_ms': round(p50, 3),
+                        'error_p99_ms': round(p99, 3)})
+    if len(batch_rows):
+        summary['mean_batch_rows'] = round(batch_rows.mean(), 2)
+    return summary
+
+
+def _batch_worker(pipeline, requests, metrics, max_batch, max_wait):
+    '''
+    Takes waiting requests off the queue, up to max_batch rows or until
+    max_wait seconds after the first one arrived, scores them with one model
+    call and hands each request its scores.
+    '''
+    while True:
+        batch = [requests.get()]
+        rows = len(batch[0]['frame'])
+        deadline = time.perf_counter() + max_wait
+        while rows < max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item['frame'])
+
+        try:
+            frame = pd.concat([item['frame'] for item in batch],
+                              ignore_index=True)
+            scores = score_frame(pipeline, frame)
+            with metrics['lock']:
+                metrics['batch_rows'].append(rows)
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0]['error'] = error
+                batch[0]['done'].set()
+                continue
+            # Scoring the requests one at a time so only the ones that fail
+            # on their own get an error
+            for item in batch:
+                try:
+                    item['scores'] = score_frame(pipeline, item['frame'])
+                except Exception as item_error:
+                    item['error'] = item_error
+                item['done'].set()
+            continue
+
+        # Splitting the scores back up in the order the requests came in
+        start = 0
+        for item in batch:
+            item['scores'] = scores[start:start + len(item['frame'])]
+            start += len(item['frame'])
+            item['done'].set()
+
+
+def _numeric_records(pipeline, frame):
+    '''
+    Turns the numerical columns of a request's records into floats, so a
+    request with text in one of them fails on its own before it joins a
+    batch.
+    '''
+    scale_cols = pipeline['scale_cols']
+    try:
+        values = frame[scale_cols].to_numpy(dtype='float64')
+    except (ValueError, TypeError):
+        # Finding the column to name in the error
+        for col in scale_cols:
+            try:
+                frame[col].to_numpy(dtype='float64')
+            except (ValueError, TypeError) as error:
+                raise ValueError(f'{col} must be numerical: {error}')
+        raise
+    numbers = pd.DataFrame(values, columns=scale_cols, index=frame.index)
+    return pd.concat([frame[pipeline['ohe_cols']], numbers], axis=1)
+
+
+def submit(server, records):
+    '''
+    Queues records for the batch worker and waits for their scores.
+
+    Args:
+        server (HTTPServer): Server from make_server.
+        records (dict or list): One record or a list of records.
+
+    Returns:
+        Array of the probability of depression for each record.
+
+    Example:
+        scores = submit(server, [record_1, record_2])
+    '''
+    # Checking the columns, numbers and dtypes here so one bad request
+    # cannot fail its batch
+    frame = _numeric_records(server.pipeline,
+                             prepare_records(server.pipeline, records))
+    check_schema(server.pipeline, frame)
+    item = {'frame': frame, 'done': threading.Event(), 'scores': None,
+            'error': None}
+    server.requests.put(item)
+    item['done'].wait()
+    if item['error'] is not None:
+        raise item['error']
+    return item['scores']
+
+
+class _ScoringHandler(BaseHTTPRequestHandler):
+    '''
+    Handles the /score, /metrics and /health requests.
+    '''
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, latency_summary(self.server.metrics))
+        elif self.path == '/health':
+            self._send(200, 'ok')
+        else:
+            self._send(404, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send(404, {'error': f'Unknown path {self.path}'})
+            return
+
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            records = json.loads(self.rfile.read(length))
+            if isinstance(records, dict) and 'records' in records:
+                records = records['records']
+            scores = submit(self.server, records)
+        except (ValueError, TypeError, KeyError) as error:
+            record_latency(self.server.metrics, time.perf_counter() - start,
+                           error=True)
+            self._send(400, {'error': str(error)})
+            return
+        except Exception as error:
+            record_latency(self.server.metrics, time.perf_counter() - start,
+                           error=True)
+            self._send(500, {'error': repr(error)})
+            return
+
+        threshold = self.server.pipeline['threshold']
+        self._send(200, {'scores': scores.tolist(),
+                         'predictions': (scores >= threshold).astype(int)
+                                                             .tolist()})
+        record_latency(self.server.metrics, time.perf_counter() - start)
+
+    def log_message(self, format, *args):
+        # Logging every request would dominate the latency under load
+        pass
+
+
+class _ScoringServer(ThreadingHTTPServer):
+    '''
+    Threaded server with a listen backlog deep enough for bursts of clients.
+    '''
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_server(pipeline, host='127.0.0.1', port=8000, max_batch=256,
+                max_wait=.002):
+    '''
+    Creates the scoring server and starts its batch worker. The server is
+    not started, call serve_forever on it or use serve.
+
+    Args:
+        pipeline (dict): Scoring pipeline from project_functions.scoring.
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 picks a free one.
+        max_batch (int): Most rows scored in one model call.
+        max_wait (float): Seconds the worker waits for more requests to join
+            a batch after the first one arrives.
+
+    Returns:
+        Threaded HTTP server with the pipeline, request queue and metrics
+        attached.
+
+    Example:
+        server = make_server(pipeline, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    '''
+    server = _ScoringServer((host, port), _ScoringHandler)
+    server.pipeline = pipeline
+    server.requests = queue.Queue()
+    server.metrics = new_metrics()
+    threading.Thread(target=_batch_worker, daemon=True,
+                     args=(pipeline, server.requests, server.metrics,
+                           max_batch, max_wait)).start()
+    return server
+
+
+def serve(pipeline, host='127.0.0.1', port=8000, max_batch=256,
+          max_wait=.002):
+    '''
+    Runs the scoring server until it is interrupted.
+
+    Example:
+        serve(pipeline, port=8000)
+    '''
+    server = make_server(pipeline, host, port, max_batch, max_wait)
+    print(f'Scoring on http://{host}:{server.server_address[1]}/score')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# The package is traced before this module is loaded, so it traces itself,
+# except record_latency which runs on every request
+trace_package(sys.modules[__name__], skip=['record_latency'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('artifact', help='artifact folder from save_artifact')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait', type=float, default=.002)
+    args = parser.parse_args()
+
+    pipeline = load_artifact(args.artifact)
+    serve(pipeline, args.host, args.port, args.max_batch, args.max_wait)
@@ -0,0 +1,159 @@
+'''
+Builds the depression target from the PHQ-9 questionnaire (the DPQ010 to
+DPQ090 answers of the NHANES mental health component) the way the notebook
+does: people who refused, did not know (7 and 9) or skipped any of the nine
+questions are left out, and a total score of 10 or more is depression.
+DPQ100 is only asked when an answer is above 0, so it is not used. The
+answers are turned into one int8 matrix and everything is worked out from
+it in a single pass, and chunks of a large extract can be fed through one
+at a time.'''
+
+import glob, os
+import numpy as np
+import pandas as pd
+
+# The nine PHQ-9 questions, answered from 0 (not at all) to 3 (nearly every
+# day)
+PHQ9_ITEMS = ['DPQ010', 'DPQ020', 'DPQ030', 'DPQ040', 'DPQ050', 'DPQ060',
+              'DPQ070', 'DPQ080', 'DPQ090']
+
+
+def phq9_codes(df, items=PHQ9_ITEMS):
+    '''
+    Turns the PHQ-9 answers into an int8 matrix. The SAS reader gives tiny
+    floats like 5.4e-79 for 0, so answers are rounded, and skipped answers
+    become -1.
+
+    Args:
+        df (DataFrame): DataFrame with the PHQ-9 answer columns.
+        items (list): Answer columns, the nine PHQ-9 questions by default.
+
+    Returns:
+        Numpy array of int8 with a row per person and a column per question.
+
+    Raises:
+        ValueError: If an answer column is missing.
+
+    Example:
+        codes = phq9_codes(df_target)
+    '''
+    missing = [col for col in items if col not in df.columns]
+    if missing:
+        raise ValueError(f'PHQ-9 columns are missing: {missing}')
+
+    values = df[items].to_numpy(dtype='float64', copy=True)
+    np.rint(values, out=values)
+    np.nan_to_num(values, copy=False, nan=-1)
+    np.clip(values, -1, 127, out=values)
+    return values.astype('int8')
+
+
+def phq9_target(df, items=PHQ9_ITEMS, cutoff=10, labels=False):
+    '''
+    Builds the depression target for everyone who answered all of the PHQ-9
+    questions with 0 to 3.
+
+    Args:
+        df (DataFrame): DataFrame with the PHQ-9 answer columns, indexed by
+            SEQN or with a SEQN column.
+        items (list): Answer columns, the nine PHQ-9 questions by default.
+        cutoff (int): Lowest total score counted as depression.
+        labels (boolean): Whether to label the target 'Depressed' and 'Not
+            Depressed' like the notebook instead of 1 and 0.
+
+    Returns:
+        Series named depression indexed by SEQN, int8 or categorical labels.
+
+    Raises:
+        ValueError: If an answer column is missing.
+
+    Example:
+        target_clean = phq9_target(pf.glob_concat('Data/Target', '*.XPT'),
+                                   labels=True).to_frame()
+    '''
+    codes = phq9_codes(df, items)
+
+    # Skipped answers are -1, which is 255 as uint8, so one comparison finds
+    # every answer outside 0 to 3
+    answered = (codes.view('uint8') <= 3).all(axis=1)
+    total = codes[answered].sum(axis=1, dtype='int16')
+    depression = (total >= cutoff).astype('int8')
+
+    if 'SEQN' in df.columns:
+        seqn = df['SEQN'].to_numpy()[answered].astype('int64')
+        index = pd.Index(seqn, name='SEQN')
+    else:
+        index = df.index[answered]
+    if labels:
+        depression = pd.Categorical.from_codes(depression,
+                                               ['Not Depressed', 'Depressed'])
+    return pd.Series(depression, index=index, name='depression')
+
+
+def phq9_target_chunks(chunks, items=PHQ9_ITEMS, cutoff=10, labels=False):
+    '''
+    Builds the depression target one chunk at a time, so only a chunk of the
+    answers and the small target are in memory at once.
+
+    Args:
+        chunks (iterable): DataFrames with the PHQ-9 answer columns, such as
+            the chunks of pd.read_sas or iter_chunks.
+        items (list): Answer columns, the nine PHQ-9 questions by default.
+        cutoff (int): Lowest total score counted as depression.
+        labels (boolean): Whether to label the target 'Depressed' and 'Not
+            Depressed' instead of 1 and 0.
+
+    Returns:
+        Series named depression indexed by SEQN.
+
+    Raises:
+        ValueError: If an answer column is missing or a SEQN is repeated.
+
+    Example:
+        target = phq9_target_chunks(iter_chunks('dpq.parquet', 500000))
+    '''
+    pieces = [phq9_target(chunk, items, cutoff, labels) for chunk in chunks]
+    if not pieces:
+        return pd.Series([], dtype='int8', name='depression',
+                         index=pd.Index([], dtype='int64', name='SEQN'))
+    target = pd.concat(pieces)
+    if labels:
+        target = target.astype(pieces[0].dtype)
+    if not target.index.is_unique:
+        repeated = target.index[target.index.duplicated()].unique()
+        raise ValueError(f'Index has duplicate keys: {list(repeated[:10])}')
+    return target
+
+
+def target_from_files(path, file_str='*.XPT', chunksize=100000,
+                      items=PHQ9_ITEMS, cutoff=10, labels=False):
+    '''
+    Builds the depression target straight from the .XPT files of the target
+    component, reading each file in chunks instead of combining them with
+    glob_concat first.
+
+    Args:
+        path (str): Folder with the target component's .XPT files.
+        file_str (str): Search query of which files to find.
+        chunksize (int): Number of rows to read at a time.
+        items (list): Answer columns, the nine PHQ-9 questions by default.
+        cutoff (int): Lowest total score counted as depression.
+        labels (boolean): Whether to label the target 'Depressed' and 'Not
+            Depressed' instead of 1 and 0.
+
+    Returns:
+        Series named depression indexed by SEQN.
+
+    Example:
+        target_clean = target_from_files(r'Data/Target', labels=True)
+    '''
+    files = sorted(glob.glob(os.path.join(path, file_str)))
+    columns = ['SEQN'] + list(items)
+
+    def chunks():
+        for file in files:
+            for chunk in pd.read_sas(file, format='xport',
+                                     chunksize=chunksize):
+                yield chunk[[col for col in columns if col in chunk.columns]]
+
+    return phq9_target_chunks(chunks(), items, cutoff, labels)
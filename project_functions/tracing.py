@@ -0,0 +1,348 @@
+'''
+Opt-in timing of the public functions of project_functions. Every public
+function is wrapped once when the package is imported, and the wrapper only
+checks one flag until enable_tracing is called, so a normal run costs next
+to nothing. While tracing is on, each call writes a line to a JSONL trace
+with its wall seconds, the CPU seconds of the thread that made it, how much
+it grew the process's high-water mark of resident memory and the rows and
+columns of its input and output. The high-water mark only grows, so a call
+that stays under an earlier peak shows no growth even if it used memory. Calls made inside other
+traced calls are written too, with their depth and parent, and the time
+spent in them is taken out of the parent's self time so trace_summary can
+rank the stages without counting anything twice.'''
+
+import contextlib
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The open trace, None while tracing is off
+_trace = None
+
+# The calls being timed on each thread, innermost last
+_local = threading.local()
+
+
+def _peak_rss_mb():
+    '''
+    Highest resident memory of this process so far in MB, or None where the
+    resource module is not available.
+    '''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def _shape(value):
+    '''
+    Rows and columns of a DataFrame, Series, array or sparse matrix, or of
+    the first one in a tuple or list. None for anything else.
+    '''
+    if isinstance(value, (tuple, list)):
+        for item in value:
+            shape = _shape(item)
+            if shape is not None:
+                return shape
+        return None
+    shape = getattr(value, 'shape', None)
+    if not isinstance(shape, tuple) or not shape:
+        return None
+    return int(shape[0]), int(shape[1]) if len(shape) > 1 else 1
+
+
+def _input_shape(args, kwargs):
+    '''
+    Shape of the first argument that has one, which is the data the
+    function works on for the functions of this package.
+    '''
+    for value in list(args) + list(kwargs.values()):
+        shape = _shape(value)
+        if shape is not None:
+            return shape
+    return None
+
+
+def _stack():
+    '''
+    Calls being timed on this thread.
+    '''
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _write(record):
+    '''
+    Writes one record to the trace under its lock, so threads never mix
+    their lines.
+    '''
+    trace = _trace
+    if trace is None:
+        return
+    with trace['lock']:
+        trace['file'].write(json.dumps(record, default=str) + '\n')
+
+
+def _begin(name):
+    '''
+    Starts timing a call and puts it on this thread's stack.
+    '''
+    stack = _stack()
+    frame = {'name': name,
+             'parent': stack[-1]['name'] if stack else None,
+             'child_seconds': 0.,
+             'peak': _peak_rss_mb(),
+             'cpu': time.thread_time(),
+             'start': time.perf_counter()}
+    stack.append(frame)
+    return frame
+
+
+def _end(frame, inputs, result=None, error=None):
+    '''
+    Stops timing a call, adds its time to its parent's children and writes
+    its record to the trace.
+    '''
+    seconds = time.perf_counter() - frame['start']
+    cpu_seconds = time.thread_time() - frame['cpu']
+    peak = _peak_rss_mb()
+    stack = _stack()
+    stack.pop()
+    if stack:
+        stack[-1]['child_seconds'] += seconds
+
+    out_shape = _shape(result)
+    _write({'function': frame['name'],
+            'start': time.time() - seconds,
+            'wall_seconds': seconds,
+            'self_seconds': seconds - frame['child_seconds'],
+            'cpu_seconds': cpu_seconds,
+            'peak_rss_growth_mb': (None if peak is None
+                                   else peak - frame['peak']),
+            'in_rows': inputs[0] if inputs else None,
+            'in_cols': inputs[1] if inputs else None,
+            'out_rows': out_shape[0] if out_shape else None,
+            'out_cols': out_shape[1] if out_shape else None,
+            'depth': len(stack),
+            'parent': frame['parent'],
+            'thread': threading.current_thread().name,
+            'error': error})
+
+
+def _tracing():
+    '''
+    Whether tracing is on in this process. Worker processes started with
+    fork inherit the trace but do not write to it.
+    '''
+    return _trace is not None and _trace['pid'] == os.getpid()
+
+
+def traced(func):
+    '''
+    Wraps a function so its calls are written to the trace while tracing is
+    on. When it is off the wrapper only checks one flag and calls the
+    function.
+
+    Args:
+        func (function): Function to wrap.
+
+    Returns:
+        The wrapped function.
+
+    Example:
+        @traced
+        def clean_demographics(df):
+            ...
+    '''
+    if getattr(func, '__traced__', False):
+        return func
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _trace is None or _trace['pid'] != os.getpid():
+            return func(*args, **kwargs)
+        frame = _begin(name)
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            _end(frame, _input_shape(args, kwargs), error=type(e).__name__)
+            raise
+        _end(frame, _input_shape(args, kwargs), result)
+        return result
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def trace_package(package, skip=()):
+    '''
+    Wraps every public function defined in a package and its loaded
+    submodules with traced, in place, so calls between the modules are
+    traced too. Generator functions are left alone, since only creating
+    the generator would be timed.
+
+    Args:
+        package (module): Package to trace.
+        skip (list): Names of functions to leave alone, such as ones that
+            are applied to every row.
+
+    Returns:
+        None
+
+    Example:
+        trace_package(sys.modules[__name__],
+                      skip=['first_cancer_count'])
+    '''
+    prefix = package.__name__ + '.'
+    modules = [package] + [module for name, module in list(sys.modules.items())
+                           if name.startswith(prefix) and module is not None
+                           and name != __name__]
+
+    # Wrapping each function in the module that defines it
+    wrapped = {}
+    for module in modules:
+        for name, value in list(vars(module).items()):
+            if (inspect.isfunction(value) and not name.startswith('_')
+                    and value.__module__ == module.__name__
+                    and name not in skip
+                    and not inspect.isgeneratorfunction(value)):
+                wrapped[value] = traced(value)
+
+    # Pointing every module's names at the wrapped functions, which also
+    # covers the names imported into the package
+    for module in modules:
+        for name, value in list(vars(module).items()):
+            if inspect.isfunction(value) and value in wrapped:
+                setattr(module, name, wrapped[value])
+
+
+def enable_tracing(path):
+    '''
+    Starts writing a record of every traced call to a JSONL file, adding
+    to it when it already exists.
+
+    Args:
+        path (str): Location of the trace.
+
+    Returns:
+        None
+
+    Example:
+        enable_tracing('traces/run.jsonl')
+        demo_df = glob_concat(r'Data/Demographics', '*.XPT')
+        disable_tracing()
+        trace_summary('traces/run.jsonl')
+    '''
+    global _trace
+    disable_tracing()
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    _trace = {'file': open(path, 'a', buffering=1), 'lock': threading.Lock(),
+              'pid': os.getpid(), 'path': path}
+
+
+def disable_tracing():
+    '''
+    Stops tracing and closes the trace file.
+
+    Returns:
+        None
+
+    Example:
+        disable_tracing()
+    '''
+    global _trace
+    trace, _trace = _trace, None
+    if trace is not None:
+        with trace['lock']:
+            trace['file'].close()
+
+
+@contextlib.contextmanager
+def trace_stage(name, data=None):
+    '''
+    Times a block of code as one stage of the trace, for steps of the
+    notebooks that are not a function, like cleaning a component. Nothing
+    is timed while tracing is off.
+
+    Args:
+        name (str): Name of the stage in the trace.
+        data (dataframe or array): Input of the stage, for its row and column
+            counts.
+
+    Returns:
+        Context manager.
+
+    Example:
+        with trace_stage('clean demographics', demo_df):
+            demo_df = demo_df.dropna(subset=['DMDCITZN'])
+    '''
+    if not _tracing():
+        yield
+        return
+    frame = _begin(name)
+    try:
+        yield
+    except BaseException as e:
+        _end(frame, _shape(data), error=type(e).__name__)
+        raise
+    _end(frame, _shape(data))
+
+
+def trace_summary(path, top=None):
+    '''
+    Ranks the functions and stages of a trace by the seconds spent in them,
+    not counting the traced calls they made.
+
+    Args:
+        path (str): Location of the trace.
+        top (int): Number of the hottest to keep, all of them when None.
+
+    Returns:
+        DataFrame with a row per function or stage of the number of calls,
+        total, self and calling thread CPU seconds, the percent of all self
+        seconds, the mean seconds per call, the largest growth of the
+        resident memory high-water mark, the input rows per second and the
+        number of calls that raised an error.
+
+    Example:
+        trace_summary('traces/run.jsonl', top=10)
+    '''
+    with open(path) as f:
+        records = pd.DataFrame([json.loads(line) for line in f
+                                if line.strip()])
+    if records.empty:
+        return pd.DataFrame()
+
+    grouped = records.groupby('function')
+    summary = pd.DataFrame({
+        'calls': grouped.size(),
+        'wall_seconds': grouped['wall_seconds'].sum(),
+        'self_seconds': grouped['self_seconds'].sum(),
+        'cpu_seconds': grouped['cpu_seconds'].sum(),
+        'peak_rss_growth_mb': grouped['peak_rss_growth_mb'].max(),
+        'in_rows': grouped['in_rows'].sum(min_count=1),
+        'errors': grouped['error'].count()})
+    summary['self_pct'] = (100 * summary['self_seconds']
+                           / summary['self_seconds'].sum()).round(2)
+    summary['mean_seconds'] = summary['wall_seconds'] / summary['calls']
+    summary['rows_per_second'] = summary['in_rows'] / summary['wall_seconds']
+    summary = summary[['calls', 'wall_seconds', 'self_seconds', 'self_pct',
+                       'mean_seconds', 'cpu_seconds', 'peak_rss_growth_mb',
+                       'in_rows', 'rows_per_second', 'errors']]
+    summary = summary.sort_values('self_seconds', ascending=False)
+    return summary if top is None else summary.head(top)
@@ -0,0 +1,328 @@
+'''
+Hyperparameter search by successive halving. Every candidate is first
+cross validated on a small stratified subset of the training data, only the
+best third go on to a subset three times larger, and so on until the last
+few are scored on all of it. Each fold score is saved to a cache folder
+under a key built from a fingerprint of the data, the estimator and its
+parameters, the subset size and the fold, so a search that is stopped and
+run again, or extended with more candidates, never refits a fold it has
+already scored.'''
+
+import os
+import hashlib
+import json
+import math
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse
+import sklearn.metrics as metrics
+from sklearn.base import clone
+from sklearn.model_selection import (ParameterGrid, StratifiedKFold,
+                                     train_test_split)
+
+# The scorer the notebooks tune with
+f2_scorer = metrics.make_scorer(metrics.fbeta_score, beta=2)
+
+# The data of a worker process, set once per round when the worker starts
+_worker_data = None
+
+
+def data_fingerprint(X, y):
+    '''
+    Hash of the values, column names and dtypes of a feature table and its
+    target, which changes whenever the training data does.
+
+    Args:
+        X (dataframe, array or sparse matrix): Feature columns.
+        y (series or array): Target column.
+
+    Returns:
+        String of the hash.
+
+    Example:
+        data_fingerprint(X_train_final, y_train)
+    '''
+    digest = hashlib.sha1()
+    for data in (X, y):
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            frame = data.to_frame() if isinstance(data, pd.Series) else data
+            digest.update(repr(list(frame.columns)).encode('utf-8'))
+            digest.update(repr(list(frame.dtypes)).encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(data, index=False)
+                          .to_numpy().tobytes())
+        elif sparse.issparse(data):
+            data = data.tocsr()
+            digest.update(str((data.shape, data.dtype)).encode('utf-8'))
+            for part in (data.data, data.indices, data.indptr):
+                digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            data = np.ascontiguousarray(data)
+            digest.update(str((data.shape, data.dtype)).encode('utf-8'))
+            digest.update(data.tobytes())
+    return digest.hexdigest()
+
+
+def _scorer_name(scoring):
+    '''
+    Name of a scorer that stays the same between sessions. Functions are
+    named by their module and qualified name, anything else by its repr
+    without memory addresses.
+    '''
+    name = getattr(scoring, '__qualname__', None)
+    if name is not None:
+        return f"{getattr(scoring, '__module__', '')}.{name}"
+    return re.sub(r' at 0x[0-9a-fA-F]+', '', repr(scoring))
+
+
+def _fold_key(fingerprint, estimator, params, scoring, rows, fold, cv,
+              random_state):
+    '''
+    Cache key of one fold score. The estimator's own settings are part of it,
+    so changing a setting that is not being searched starts fresh.
+    '''
+    settings = clone(estimator).set_params(**params).get_params(deep=False)
+    key = json.dumps([fingerprint, type(estimator).__name__, settings,
+                      _scorer_name(scoring), rows, fold, cv, random_state],
+                     sort_keys=True, default=repr)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _read_score(cache_dir, key):
+    '''
+    Cached fold result, or None when the fold has not been scored.
+    '''
+    path = os.path.join(cache_dir, f'{key}.json')
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_score(cache_dir, key, result):
+    '''
+    Writes a fold result to a temporary file and renames it into place, so a
+    stopped search never leaves half a file behind.
+    '''
+    path = os.path.join(cache_dir, f'{key}.json')
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'w') as f:
+        json.dump(result, f)
+    os.replace(temp, path)
+
+
+def _rows(data, index):
+    '''
+    Rows of a DataFrame, Series, array or sparse matrix by position.
+    '''
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return data.iloc[index]
+    return data[index]
+
+
+def _init_worker(X, y):
+    '''
+    Keeps the round's training subset in a worker process so each fold only
+    sends its parameters and row positions.
+    '''
+    global _worker_data
+    _worker_data = X, y
+
+
+def _fit_fold(estimator, params, train_index, test_index, scoring, data=None):
+    '''
+    Fits a copy of the estimator with the parameters on one fold and returns
+    its score on the held out rows and the seconds the fit took.
+    '''
+    X, y = data or _worker_data
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    model.fit(_rows(X, train_index), _rows(y, train_index))
+    seconds = time.perf_counter() - start
+    score = scoring(model, _rows(X, test_index), _rows(y, test_index))
+    return {'score': float(score), 'fit_seconds': seconds}
+
+
+def halving_schedule(n_candidates, n_rows, factor=3, min_rows=None,
+                     floor=1):
+    '''
+    Number of candidates and rows in each round of successive halving.
+
+    Args:
+        n_candidates (int): Number of parameter combinations.
+        n_rows (int): Number of training rows.
+        factor (int): How many times fewer candidates and more rows each
+            round has.
+        min_rows (int): Rows in the first round, the rows of the last round
+            divided by factor once per round when None.
+        floor (int): Fewest rows any round gets.
+
+    Returns:
+        List of (candidates, rows) pairs.
+
+    Example:
+        halving_schedule(30, 40000)
+    '''
+    n_rounds = max(1, math.ceil(math.log(max(n_candidates, 1), factor)) + 1)
+    schedule = []
+    candidates = n_candidates
+    for i in range(n_rounds):
+        # Counting down from every row keeps the subset sizes the same when
+        # candidates are added, so their cached folds are still used
+        if min_rows is None or i == n_rounds - 1:
+            rows = n_rows // factor ** (n_rounds - 1 - i)
+        else:
+            rows = min(n_rows, min_rows * factor ** i)
+        rows = min(n_rows, max(rows, floor))
+        schedule.append((candidates, rows))
+        if candidates == 1 or rows == n_rows:
+            break
+        candidates = max(1, math.ceil(candidates / factor))
+    return schedule
+
+
+def successive_halving(estimator, params, X, y, cv=3, factor=3, min_rows=None,
+                       scoring=f2_scorer, cache_dir='.tuning_cache', n_jobs=1,
+                       random_state=123, refit=True):
+    '''
+    Searches a parameter grid with successive halving, cross validating each
+    round's candidates on a stratified subset of the training data and
+    keeping the best scoring ones for the next, larger subset. Fold scores are
+    read from and saved to the cache folder, so only folds that were never
+    scored are fit.
+
+    Args:
+        estimator (classification model): SKlearn compatable model
+        params (dict or list): Parameter grid like GridSearchCV takes
+        X (dataframe, array or sparse matrix): feature columns of the
+            training set
+        y (series or array): target column of the training set
+        cv (int): Number of stratified folds
+        factor (int): How many times fewer candidates and more rows each
+            round has
+        min_rows (int): Rows in the first round, the rows of the last round
+            divided by factor once per round when None
+        scoring (scorer): Scorer called with the model, X and y, F2 by
+            default. Cached scores are found by its name, so a custom scorer
+            should be renamed when what it computes changes
+        cache_dir (str): Folder of the fold scores, nothing is cached when
+            None
+        n_jobs (int): Number of processes to fit folds with, -1 uses every
+            core
+        random_state (int): Seed of the subsets and the folds
+        refit (boolean): Whether to fit the best candidate on all the data
+
+    Returns:
+        Dictionary of the best parameters, their mean score, the model refit
+        with them when refit is True, a DataFrame with a row per candidate
+        and round, and the number of folds fit and read from the cache.
+
+    Example:
+        search = successive_halving(LogisticRegression(class_weight='balanced',
+                                                       random_state=123),
+                                    {'solver': ['newton-cg', 'lbfgs'],
+                                     'C': Cs_list},
+                                    X_train_final, y_train, n_jobs=-1)
+        search['best_params']
+    '''
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    candidates = list(ParameterGrid(params))
+    fingerprint = data_fingerprint(X, y)
+    y_values = np.asarray(y)
+
+    # Giving every round enough rows for each fold to hold 2 rows of the
+    # smallest class, which small first rounds of many candidates can miss
+    _, class_counts = np.unique(y_values, return_counts=True)
+    floor = max(cv * 2 * len(class_counts),
+                math.ceil(cv * 2 * len(y_values) / class_counts.min()))
+    schedule = halving_schedule(len(candidates), len(y_values), factor,
+                                min_rows, floor)
+
+    history = []
+    fits = cached = 0
+    for round_number, (_, rows) in enumerate(schedule):
+        # The same seed gives the same subset of each size every time, which
+        # is what lets the fold scores be cached
+        if rows < len(y_values):
+            subset, _ = train_test_split(np.arange(len(y_values)),
+                                         train_size=rows, stratify=y_values,
+                                         random_state=random_state)
+            subset = np.sort(subset)
+            X_round, y_round = _rows(X, subset), _rows(y, subset)
+        else:
+            X_round, y_round = X, y
+        folds = list(StratifiedKFold(cv, shuffle=True,
+                                     random_state=random_state)
+                     .split(np.zeros(rows), np.asarray(y_round)))
+
+        # Reading the folds that were already scored
+        results = {}
+        todo = []
+        for i, candidate in enumerate(candidates):
+            for fold in range(cv):
+                key = _fold_key(fingerprint, estimator, candidate, scoring,
+                                rows, fold, cv, random_state)
+                result = (_read_score(cache_dir, key)
+                          if cache_dir is not None else None)
+                if result is None:
+                    todo.append((i, fold, key))
+                else:
+                    results[i, fold] = result
+                    cached += 1
+
+        # Fitting the rest, saving each score as soon as it is done
+        if n_jobs <= 1 or len(todo) <= 1:
+            for i, fold, key in todo:
+                results[i, fold] = _fit_fold(estimator, candidates[i],
+                                             *folds[fold], scoring,
+                                             (X_round, y_round))
+                if cache_dir is not None:
+                    _write_score(cache_dir, key, results[i, fold])
+        else:
+            with ProcessPoolExecutor(n_jobs, initializer=_init_worker,
+                                     initargs=(X_round, y_round)) as executor:
+                futures = {executor.submit(_fit_fold, estimator,
+                                           candidates[i], *folds[fold],
+                                           scoring): (i, fold, key)
+                           for i, fold, key in todo}
+                for future, (i, fold, key) in futures.items():
+                    results[i, fold] = future.result()
+                    if cache_dir is not None:
+                        _write_score(cache_dir, key, results[i, fold])
+        fits += len(todo)
+
+        scores = []
+        for i, candidate in enumerate(candidates):
+            fold_scores = [results[i, fold]['score'] for fold in range(cv)]
+            scores.append(np.mean(fold_scores))
+            history.append({'round': round_number, 'rows': rows,
+                            'params': candidate,
+                            'mean_score': np.mean(fold_scores),
+                            'std_score': np.std(fold_scores),
+                            'fit_seconds': sum(results[i, fold]['fit_seconds']
+                                               for fold in range(cv))})
+
+        # Keeping the best candidates for the next round
+        if round_number + 1 < len(schedule):
+            keep = schedule[round_number + 1][0]
+            best = np.argsort(scores, kind='stable')[::-1][:keep]
+            candidates = [candidates[i] for i in sorted(best)]
+
+    best = int(np.argmax(scores))
+    search = {'best_params': candidates[best],
+              'best_score': scores[best],
+              'best_model': None,
+              'history': pd.DataFrame(history),
+              'fits': fits,
+              'cached': cached}
+    if refit:
+        search['best_model'] = clone(estimator).set_params(**candidates[best])
+        search['best_model'].fit(X, y)
+    return search